@@ -0,0 +1,156 @@
+from bisect import bisect_left, bisect_right
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+import uuid
+from ingestion.realtime import publish, group_name
+from .models import Alert
+
+ALERT_VERSION_KEY = 'alerts:version'
+
+# Which observed metric each alert type compares against its threshold, and how.
+# volume_spike and price_movement are per symbol: their symbol_pair holds the symbol.
+ALERT_RULES = {
+    'zscore_high': ('z_score', 'above'),
+    'zscore_low': ('z_score', 'below'),
+    'correlation_break': ('correlation', 'below'),
+    'volume_spike': ('volume_ratio', 'above'),
+    'price_movement': ('price_change_pct', 'abs_above'),
+}
+
+
+def bump_alert_version():
+    cache.set(ALERT_VERSION_KEY, uuid.uuid4().hex, None)
+
+
+@receiver(post_save, sender=Alert)
+@receiver(post_delete, sender=Alert)
+def _alert_changed(sender, **kwargs):
+    bump_alert_version()
+
+
+class ThresholdIndex:
+    """Active alerts for one (symbol_pair, alert_type), sorted by threshold."""
+
+    __slots__ = ('thresholds', 'alert_ids')
+
+    def __init__(self, entries):
+        entries.sort()
+        self.thresholds = [threshold for threshold, _ in entries]
+        self.alert_ids = [alert_id for _, alert_id in entries]
+
+    def match(self, value, direction):
+        if direction == 'above':
+            # value >= threshold
+            return self.alert_ids[:bisect_right(self.thresholds, value)]
+        if direction == 'below':
+            # value <= threshold
+            return self.alert_ids[bisect_left(self.thresholds, value):]
+        return self.alert_ids[:bisect_right(self.thresholds, abs(value))]
+
+    def remove(self, alert_ids):
+        keep = [(t, a) for t, a in zip(self.thresholds, self.alert_ids) if a not in alert_ids]
+        self.thresholds = [t for t, _ in keep]
+        self.alert_ids = [a for _, a in keep]
+
+
+class AlertEngine:
+    """
+    Per-process view of active alerts, indexed by (symbol_pair, alert_type)
+    so each observation is matched with a bisect instead of a scan. The
+    index is rebuilt whenever the shared alert version changes.
+    """
+
+    def __init__(self):
+        self.version = None
+        self.index = {}
+
+    def refresh(self):
+        version = cache.get(ALERT_VERSION_KEY)
+        if version is not None and version == self.version:
+            return
+
+        entries = {}
+        active = Alert.objects.filter(status='active').values_list('id', 'symbol_pair', 'alert_type', 'condition')
+        for alert_id, symbol_pair, alert_type, condition in active:
+            if alert_type not in ALERT_RULES:
+                continue
+            try:
+                threshold = float(condition['threshold'])
+            except (KeyError, TypeError, ValueError):
+                print(f"Skipping alert {alert_id}: condition has no numeric threshold")
+                continue
+            entries.setdefault((symbol_pair, alert_type), []).append((threshold, alert_id))
+
+        self.index = {key: ThresholdIndex(values) for key, values in entries.items()}
+        if version is None:
+            bump_alert_version()
+            version = cache.get(ALERT_VERSION_KEY)
+        self.version = version
+
+    def evaluate(self, observations):
+        """
+        ``observations`` is an iterable of (symbol_pair, metrics) where metrics
+        maps metric names (z_score, correlation, volume_ratio,
+        price_change_pct) to floats. Matching alerts are marked triggered
+        with one bulk update. Returns the number triggered.
+        """
+        self.refresh()
+        if not self.index:
+            return 0
+
+        now = timezone.now()
+        triggered = {}
+        notifications = []
+        for symbol_pair, metrics in observations:
+            for alert_type, (metric, direction) in ALERT_RULES.items():
+                thresholds = self.index.get((symbol_pair, alert_type))
+                value = metrics.get(metric)
+                if thresholds is None or value is None:
+                    continue
+                matched = thresholds.match(value, direction)
+                for alert_id in matched:
+                    triggered[alert_id] = Alert(
+                        id=alert_id, status='triggered', triggered_at=now, trigger_value=value
+                    )
+                    notifications.append({
+                        'id': alert_id,
+                        'alert_type': alert_type,
+                        'symbol_pair': symbol_pair,
+                        'status': 'triggered',
+                        'triggered_at': now,
+                        'trigger_value': value,
+                    })
+                if matched:
+                    # Drop them locally so later observations in this batch cannot re-trigger
+                    thresholds.remove(set(matched))
+
+        if not triggered:
+            return 0
+
+        with transaction.atomic():
+            # The index can be stale: only alerts still active now are
+            # triggered, so one disabled or deleted meanwhile is left alone
+            still_active = set(
+                Alert.objects.select_for_update()
+                .filter(pk__in=list(triggered), status='active')
+                .values_list('id', flat=True)
+            )
+            Alert.objects.bulk_update(
+                [alert for alert_id, alert in triggered.items() if alert_id in still_active],
+                ['status', 'triggered_at', 'trigger_value']
+            )
+        # bulk_update skips post_save, so tell the other processes directly
+        bump_alert_version()
+        notifications = [n for n in notifications if n['id'] in still_active]
+        for n in notifications:
+            metric = ALERT_RULES[n['alert_type']][0]
+            print(f"Alert triggered: {n['alert_type']} for {n['symbol_pair']}, {metric}={n['trigger_value']}")
+        if notifications:
+            publish(group_name('alerts'), 'alerts', notifications)
+        return len(still_active)
+
+
+alert_engine = AlertEngine()
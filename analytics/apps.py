@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class AnalyticsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "analytics"
+
+    def ready(self):
+        from . import alerts  # noqa: F401  registers the alert change signals
+        from . import scheduling  # noqa: F401  subscribes analytics to closed bars
@@ -0,0 +1,49 @@
+from django.conf import settings
+from django.core.cache import cache
+from statsmodels.tsa.stattools import adfuller
+import time
+
+ADF_CACHE_KEY = 'adf:{symbol_pair}:{timeframe}:{window}'
+
+
+def run_adf(spread_values):
+    try:
+        result = adfuller(spread_values)
+        return float(result[0]), float(result[1])
+    except Exception:
+        return None
+
+
+def cointegration_fields(adf_result):
+    return {
+        'adf_statistic': adf_result[0] if adf_result else None,
+        'adf_pvalue': adf_result[1] if adf_result else None,
+        'is_cointegrated': bool(adf_result and adf_result[1] < 0.05)
+    }
+
+
+def cached_adf(symbol_pair, timeframe, window, last_ts, get_spreads):
+    """
+    ADF result for the spread window ending at ``last_ts`` (epoch seconds),
+    reusing the previous result unless it is due for a recompute.
+
+    The cached result is reused while the window it was computed on ends
+    within ADF_RECOMPUTE_SECONDS of ``last_ts`` and it was computed less than
+    ADF_MAX_STALENESS_SECONDS ago. ``get_spreads`` is only called when the
+    test actually runs.
+    """
+    key = ADF_CACHE_KEY.format(symbol_pair=symbol_pair, timeframe=timeframe, window=window)
+    recompute_after = getattr(settings, 'ADF_RECOMPUTE_SECONDS', 300)
+    max_staleness = getattr(settings, 'ADF_MAX_STALENESS_SECONDS', 900)
+
+    entry = cache.get(key)
+    now = time.time()
+    if entry is not None:
+        fresh = now - entry['computed_at'] < max_staleness
+        if fresh and 0 <= last_ts - entry['last_ts'] < recompute_after:
+            return entry['result']
+
+    spreads = get_spreads()
+    result = run_adf(spreads) if len(spreads) >= window else None
+    cache.set(key, {'last_ts': last_ts, 'computed_at': now, 'result': result}, max_staleness)
+    return result
@@ -0,0 +1,33 @@
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+from ingestion.realtime import group_name
+
+
+class StreamConsumer(AsyncJsonWebsocketConsumer):
+    """
+    Read-only WebSocket feed for one group: bars.{symbol}.{tf},
+    spread.{pair}.{tf} or alerts. The producing tasks publish only new or
+    changed rows, so each client receives deltas on top of its initial
+    REST snapshot.
+    """
+
+    def __init__(self, *args, kind='alerts', **kwargs):
+        super().__init__(*args, **kwargs)
+        self.kind = kind
+
+    async def connect(self):
+        kwargs = self.scope['url_route']['kwargs']
+        if self.kind == 'bars':
+            self.group = group_name('bars', kwargs['symbol'], kwargs['timeframe'])
+        elif self.kind == 'spread':
+            self.group = group_name('spread', kwargs['symbol_pair'], kwargs['timeframe'])
+        else:
+            self.group = group_name('alerts')
+
+        await self.channel_layer.group_add(self.group, self.channel_name)
+        await self.accept()
+
+    async def disconnect(self, code):
+        await self.channel_layer.group_discard(self.group, self.channel_name)
+
+    async def stream_rows(self, event):
+        await self.send_json({'type': event['kind'], 'rows': event['rows']})
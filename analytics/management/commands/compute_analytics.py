@@ -1,5 +1,5 @@
 from django.core.management.base import BaseCommand
-from analytics.tasks import compute_spread_analytics, compute_price_stats
+from analytics.tasks import compute_spread_analytics, compute_price_stats, compute_spread_universe
 
 class Command(BaseCommand):
     help = 'Manually trigger analytics computation'
@@ -9,6 +9,7 @@ class Command(BaseCommand):
         parser.add_argument('--symbol2', type=str, default='ETHUSDT')
         parser.add_argument('--timeframe', type=str, default='1s')
         parser.add_argument('--window', type=int, default=60)
+        parser.add_argument('--universe', type=str, default=None, help='Comma-separated symbols; computes every pair in one pass')
 
     def handle(self, *args, **options):
         symbol1 = options['symbol1']
@@ -16,6 +17,13 @@ class Command(BaseCommand):
         timeframe = options['timeframe']
         window = options['window']
         
+        if options['universe']:
+            symbols = [s.strip().upper() for s in options['universe'].split(',') if s.strip()]
+            self.stdout.write(f'Computing spread analytics for all pairs of {symbols}...')
+            result = compute_spread_universe(symbols, timeframe, window)
+            self.stdout.write(self.style.SUCCESS(f'Created {result} analytics records'))
+            return
+        
         self.stdout.write(f'Computing spread analytics for {symbol1}/{symbol2}...')
         result = compute_spread_analytics(symbol1, symbol2, timeframe, window)
         self.stdout.write(self.style.SUCCESS(f'Created {result} analytics records'))
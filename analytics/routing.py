@@ -0,0 +1,8 @@
+from django.urls import path
+from . import consumers
+
+websocket_urlpatterns = [
+    path('ws/bars/<str:symbol>/<str:timeframe>/', consumers.StreamConsumer.as_asgi(kind='bars')),
+    path('ws/spread/<str:symbol_pair>/<str:timeframe>/', consumers.StreamConsumer.as_asgi(kind='spread')),
+    path('ws/alerts/', consumers.StreamConsumer.as_asgi(kind='alerts')),
+]
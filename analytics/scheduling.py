@@ -0,0 +1,27 @@
+from django.conf import settings
+from django.dispatch import receiver
+from ingestion.scheduling import bars_closed, trigger
+from .tasks import compute_price_stats, update_spread_analytics
+
+
+@receiver(bars_closed)
+def schedule_analytics(sender, symbol, timeframe, **kwargs):
+    """
+    Closed bars for a symbol trigger its price stats and the spread of every
+    configured pair it belongs to. A pair is triggered by both legs, which
+    coalesce into one run.
+    """
+    if timeframe not in settings.ANALYTICS_TIMEFRAMES:
+        return
+
+    delay = settings.ANALYTICS_TRIGGER_DELAY_SECONDS
+    lookback = settings.ANALYTICS_LOOKBACK_MINUTES
+    trigger(compute_price_stats, [symbol, timeframe, lookback], delay)
+
+    for symbol1, symbol2 in settings.ANALYTICS_PAIRS:
+        if symbol in (symbol1, symbol2):
+            trigger(
+                update_spread_analytics,
+                [symbol1, symbol2, timeframe, settings.ANALYTICS_SPREAD_WINDOW, lookback],
+                delay
+            )
@@ -0,0 +1,193 @@
+from collections import deque
+import math
+
+# Re-add the window from scratch every so often so add/subtract drift cannot accumulate
+RESYNC_EVERY = 1000
+
+
+class RollingMoments:
+    """
+    Running sums (Σx, Σy, Σxy, Σx², Σy²) over the last ``size`` points.
+    Values are stored relative to the first point seen, which keeps the
+    variance terms accurate for large prices.
+    """
+
+    def __init__(self, size, x0=None, y0=None):
+        self.size = size
+        self.x0 = x0
+        self.y0 = y0
+        self.points = deque()
+        self.updates = 0
+        self._reset_sums()
+
+    def _reset_sums(self):
+        self.sx = self.sy = self.sxx = self.syy = self.sxy = 0.0
+
+    def push(self, x, y):
+        if self.x0 is None:
+            self.x0, self.y0 = x, y
+        dx = x - self.x0
+        dy = y - self.y0
+        self.points.append((dx, dy))
+        self._add(dx, dy, 1.0)
+        if len(self.points) > self.size:
+            old_x, old_y = self.points.popleft()
+            self._add(old_x, old_y, -1.0)
+
+        self.updates += 1
+        if self.updates % RESYNC_EVERY == 0:
+            self._resync()
+
+    def _add(self, dx, dy, sign):
+        self.sx += sign * dx
+        self.sy += sign * dy
+        self.sxx += sign * dx * dx
+        self.syy += sign * dy * dy
+        self.sxy += sign * dx * dy
+
+    def _resync(self):
+        # Re-centre on the current window so the offsets track drifting prices
+        if self.points:
+            shift_x = sum(dx for dx, _ in self.points) / len(self.points)
+            shift_y = sum(dy for _, dy in self.points) / len(self.points)
+            self.x0 += shift_x
+            self.y0 += shift_y
+            self.points = deque((dx - shift_x, dy - shift_y) for dx, dy in self.points)
+        self._reset_sums()
+        for dx, dy in self.points:
+            self._add(dx, dy, 1.0)
+
+    @property
+    def n(self):
+        return len(self.points)
+
+    def means(self):
+        return self.x0 + self.sx / self.n, self.y0 + self.sy / self.n
+
+    def covariances(self):
+        """Sample (ddof=1) var(x), var(y) and cov(x, y)."""
+        n = self.n
+        var_x = (self.sxx - self.sx * self.sx / n) / (n - 1)
+        var_y = (self.syy - self.sy * self.sy / n) / (n - 1)
+        cov_xy = (self.sxy - self.sx * self.sy / n) / (n - 1)
+        return max(var_x, 0.0), max(var_y, 0.0), cov_xy
+
+    def values(self):
+        return [(self.x0 + dx, self.y0 + dy) for dx, dy in self.points]
+
+    def to_state(self):
+        return {'size': self.size, 'x0': self.x0, 'y0': self.y0, 'points': list(self.points)}
+
+    @classmethod
+    def from_state(cls, state):
+        moments = cls(state['size'], state['x0'], state['y0'])
+        moments.points = deque(tuple(point) for point in state['points'])
+        moments._resync()
+        return moments
+
+
+class SpreadEngine:
+    """
+    Streaming version of the batch spread computation. Each aligned bar
+    (close_1, close_2) updates, in constant time:
+
+    - the OLS hedge ratio of close_1 on close_2 over ``regression_window`` bars
+    - the spread, its rolling mean/std and z-score over ``window`` bars,
+      evaluated with the current hedge ratio
+    - the rolling correlation over ``window`` bars
+
+    The latest row matches the batch computation over the same bars within
+    floating-point tolerance.
+    """
+
+    def __init__(self, window, regression_window):
+        self.window = window
+        self.regression_window = regression_window
+        self.stats = RollingMoments(window)
+        self.regression = RollingMoments(regression_window)
+        self.last_ts = None
+        self.last_close_1 = None
+        self.last_close_2 = None
+
+    def update(self, ts, close_1=None, close_2=None):
+        """
+        Feed one timestamp. A missing close carries the previous value
+        forward, like the batch forward-fill alignment. Returns the analytics
+        row for ``ts`` or None while the windows are still filling.
+        """
+        if close_1 is not None:
+            self.last_close_1 = close_1
+        if close_2 is not None:
+            self.last_close_2 = close_2
+        self.last_ts = ts
+        if self.last_close_1 is None or self.last_close_2 is None:
+            return None
+
+        y, x = self.last_close_1, self.last_close_2
+        self.regression.push(x, y)
+        self.stats.push(x, y)
+
+        if self.stats.n < self.window or self.regression.n < 2:
+            return None
+
+        reg_var_x, _, reg_cov = self.regression.covariances()
+        if reg_var_x == 0:
+            return None
+        hedge_ratio = reg_cov / reg_var_x
+
+        mean_x, mean_y = self.stats.means()
+        var_x, var_y, cov_xy = self.stats.covariances()
+        spread = y - hedge_ratio * x
+        rolling_mean = mean_y - hedge_ratio * mean_x
+        rolling_std = math.sqrt(max(var_y - 2 * hedge_ratio * cov_xy + hedge_ratio ** 2 * var_x, 0.0))
+        if rolling_std == 0:
+            return None
+
+        denom = math.sqrt(var_x * var_y)
+        correlation = cov_xy / denom if denom > 0 else None
+
+        return {
+            'timestamp': ts,
+            'symbol1_price': y,
+            'symbol2_price': x,
+            'hedge_ratio': hedge_ratio,
+            'spread': spread,
+            'z_score': (spread - rolling_mean) / rolling_std,
+            'rolling_mean': rolling_mean,
+            'rolling_std': rolling_std,
+            'correlation': correlation,
+        }
+
+    def hedge_ratio(self):
+        if self.regression.n < 2:
+            return None
+        var_x, _, cov_xy = self.regression.covariances()
+        return cov_xy / var_x if var_x else None
+
+    def window_spreads(self):
+        """Spread values over the stats window using the current hedge ratio."""
+        hedge_ratio = self.hedge_ratio()
+        if hedge_ratio is None:
+            return []
+        return [y - hedge_ratio * x for x, y in self.stats.values()]
+
+    def to_state(self):
+        return {
+            'window': self.window,
+            'regression_window': self.regression_window,
+            'stats': self.stats.to_state(),
+            'regression': self.regression.to_state(),
+            'last_ts': self.last_ts,
+            'last_close_1': self.last_close_1,
+            'last_close_2': self.last_close_2,
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        engine = cls(state['window'], state['regression_window'])
+        engine.stats = RollingMoments.from_state(state['stats'])
+        engine.regression = RollingMoments.from_state(state['regression'])
+        engine.last_ts = state['last_ts']
+        engine.last_close_1 = state['last_close_1']
+        engine.last_close_2 = state['last_close_2']
+        return engine
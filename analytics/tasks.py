@@ -1,45 +1,42 @@
 from celery import shared_task
 from django.utils import timezone
-from datetime import timedelta
-from decimal import Decimal
+from django.core.cache import cache
+from datetime import datetime, timedelta, timezone as dt_timezone
 import pandas as pd
 import numpy as np
 from scipy import stats
-from statsmodels.tsa.stattools import adfuller
-from django.db import transaction
+from ingestion.upsert import bulk_upsert
+from ingestion.realtime import publish, group_name
+from ingestion.latest import cache_latest
+from analytics.alerts import alert_engine
+from analytics.cointegration import cached_adf, cointegration_fields
 
-@shared_task
+SPREAD_UNIQUE_FIELDS = ['symbol_pair', 'timeframe', 'timestamp']
+SPREAD_UPDATE_FIELDS = [
+    'symbol1_price', 'symbol2_price', 'hedge_ratio', 'spread', 'z_score',
+    'rolling_mean', 'rolling_std', 'correlation', 'adf_statistic', 'adf_pvalue',
+    'is_cointegrated'
+]
+SPREAD_ENGINE_KEY = 'spread:engine:{symbol_pair}:{timeframe}:{window}:{regression_window}'
+SPREAD_STREAM_LAG_SECONDS = 2
+SPREAD_ROWS_PER_RUN = 50
+STATS_UNIQUE_FIELDS = ['symbol', 'timeframe', 'timestamp']
+STATS_UPDATE_FIELDS = ['returns', 'volatility', 'volume_ma', 'price_change_pct', 'high_low_range']
+
+@shared_task(acks_late=True)
 def compute_spread_analytics(symbol1, symbol2, timeframe='1s', window=60, lookback_minutes=10):
     try:
-        from ingestion.models import ProcessedBar
+        from ingestion.barstore import load_bars
         from analytics.models import SpreadAnalytics
         
         from_time = timezone.now() - timedelta(minutes=lookback_minutes)
         
-        bars1 = ProcessedBar.objects.filter(
-            symbol=symbol1,
-            timeframe=timeframe,
-            timestamp__gte=from_time
-        ).order_by('timestamp').values('timestamp', 'close')
-        
-        bars2 = ProcessedBar.objects.filter(
-            symbol=symbol2,
-            timeframe=timeframe,
-            timestamp__gte=from_time
-        ).order_by('timestamp').values('timestamp', 'close')
-        
-        df1 = pd.DataFrame(list(bars1))
-        df2 = pd.DataFrame(list(bars2))
+        df1 = load_bars(symbol1, timeframe, from_time, ['close'])
+        df2 = load_bars(symbol2, timeframe, from_time, ['close'])
         
         if len(df1) < window or len(df2) < window:
             return 0
         
-        df1['close'] = df1['close'].astype(float)
-        df2['close'] = df2['close'].astype(float)
-        
-        df1['timestamp'] = pd.to_datetime(df1['timestamp'])
-        df2['timestamp'] = pd.to_datetime(df2['timestamp'])
-        
         df1.set_index('timestamp', inplace=True)
         df2.set_index('timestamp', inplace=True)
         
@@ -72,63 +69,42 @@ def compute_spread_analytics(symbol1, symbol2, timeframe='1s', window=60, lookba
         
         correlation = merged['close_1'].rolling(window=window).corr(merged['close_2'])
         
-        adf_result = None
-        is_cointegrated = False
-        if len(spread) >= window:
-            try:
-                adf_result = adfuller(spread.dropna()[-window:])
-                is_cointegrated = adf_result[1] < 0.05
-            except:
-                pass
-        
         symbol_pair = f"{symbol1}_{symbol2}"
-        analytics_to_create = []
+        adf_result = cached_adf(
+            symbol_pair, timeframe, window,
+            int(merged.index[-1].timestamp()),
+            lambda: spread.dropna()[-window:]
+        )
+        
+        analytics_rows = []
         
         for idx, row in merged.iloc[-50:].iterrows():
             if pd.isna(z_score.loc[idx]):
                 continue
                 
-            analytics_to_create.append(SpreadAnalytics(
-                symbol_pair=symbol_pair,
-                timestamp=idx,
-                timeframe=timeframe,
-                symbol1_price=Decimal(str(row['close_1'])),
-                symbol2_price=Decimal(str(row['close_2'])),
-                hedge_ratio=Decimal(str(hedge_ratio)),
-                spread=Decimal(str(spread.loc[idx])),
-                z_score=Decimal(str(z_score.loc[idx])),
-                rolling_mean=Decimal(str(rolling_mean.loc[idx])),
-                rolling_std=Decimal(str(rolling_std.loc[idx])),
-                correlation=Decimal(str(correlation.loc[idx])) if not pd.isna(correlation.loc[idx]) else None,
-                adf_statistic=Decimal(str(adf_result[0])) if adf_result else None,
-                adf_pvalue=Decimal(str(adf_result[1])) if adf_result else None,
-                is_cointegrated=is_cointegrated
-            ))
-        
-        with transaction.atomic():
-            for analytics in analytics_to_create:
-                SpreadAnalytics.objects.update_or_create(
-                    symbol_pair=analytics.symbol_pair,
-                    timeframe=analytics.timeframe,
-                    timestamp=analytics.timestamp,
-                    defaults={
-                        'symbol1_price': analytics.symbol1_price,
-                        'symbol2_price': analytics.symbol2_price,
-                        'hedge_ratio': analytics.hedge_ratio,
-                        'spread': analytics.spread,
-                        'z_score': analytics.z_score,
-                        'rolling_mean': analytics.rolling_mean,
-                        'rolling_std': analytics.rolling_std,
-                        'correlation': analytics.correlation,
-                        'adf_statistic': analytics.adf_statistic,
-                        'adf_pvalue': analytics.adf_pvalue,
-                        'is_cointegrated': analytics.is_cointegrated
-                    }
-                )
-        
-        check_alerts.delay(symbol_pair, timeframe)
-        
-        return len(analytics_to_create)
+            analytics_rows.append({
+                'symbol_pair': symbol_pair,
+                'timestamp': idx.to_pydatetime(),
+                'timeframe': timeframe,
+                'symbol1_price': float(row['close_1']),
+                'symbol2_price': float(row['close_2']),
+                'hedge_ratio': float(hedge_ratio),
+                'spread': float(spread.loc[idx]),
+                'z_score': float(z_score.loc[idx]),
+                'rolling_mean': float(rolling_mean.loc[idx]),
+                'rolling_std': float(rolling_std.loc[idx]),
+                'correlation': float(correlation.loc[idx]) if not pd.isna(correlation.loc[idx]) else None,
+                **cointegration_fields(adf_result)
+            })
+        
+        bulk_upsert(SpreadAnalytics, analytics_rows, SPREAD_UNIQUE_FIELDS, SPREAD_UPDATE_FIELDS)
+        
+        if analytics_rows:
+            cache_latest('spread', (symbol_pair, timeframe), analytics_rows)
+            publish(group_name('spread', symbol_pair, timeframe), 'spread', analytics_rows)
+            alert_engine.evaluate([spread_observation(analytics_rows[-1])])
+        
+        return len(analytics_rows)
         
     except Exception as e:
         print(f"ERROR in compute_spread_analytics: {e}")
@@ -136,30 +112,183 @@ def compute_spread_analytics(symbol1, symbol2, timeframe='1s', window=60, lookba
         traceback.print_exc()
         return 0
 
-@shared_task
+@shared_task(acks_late=True)
+def update_spread_analytics(symbol1, symbol2, timeframe='1s', window=60, lookback_minutes=10):
+    """
+    Streaming counterpart of compute_spread_analytics: feeds only bars closed
+    since the last run into a checkpointed SpreadEngine instead of
+    recomputing the whole lookback window.
+    """
+    try:
+        from ingestion.barstore import load_bars
+        from ingestion.bars import TIMEFRAME_SECONDS
+        from analytics.models import SpreadAnalytics
+        from analytics.spread_engine import SpreadEngine
+        
+        tf_seconds = TIMEFRAME_SECONDS[timeframe]
+        regression_window = max(lookback_minutes * 60 // tf_seconds, window)
+        symbol_pair = f"{symbol1}_{symbol2}"
+        state_key = SPREAD_ENGINE_KEY.format(
+            symbol_pair=symbol_pair, timeframe=timeframe, window=window, regression_window=regression_window
+        )
+        
+        now = timezone.now()
+        state = cache.get(state_key)
+        if state is None:
+            engine = SpreadEngine(window, regression_window)
+            from_time = now - timedelta(minutes=lookback_minutes)
+        else:
+            engine = SpreadEngine.from_state(state)
+            from_time = datetime.fromtimestamp(engine.last_ts + 1, tz=dt_timezone.utc)
+        
+        # Open bars still change as ticks arrive, so only closed ones are fed in
+        closed_before = int(now.timestamp()) - SPREAD_STREAM_LAG_SECONDS - tf_seconds
+        
+        df1 = load_bars(symbol1, timeframe, from_time, ['close'])
+        df2 = load_bars(symbol2, timeframe, from_time, ['close'])
+        closes_1 = dict(zip(df1['timestamp'].astype('int64') // 10**9, df1['close']))
+        closes_2 = dict(zip(df2['timestamp'].astype('int64') // 10**9, df2['close']))
+        # A leg whose bars are not written yet must not be carried forward
+        # over them, so stop before the older of the two legs' latest bars
+        legs_until = min(max(closes_1), max(closes_2)) if closes_1 and closes_2 else None
+        
+        analytics_rows = []
+        for ts in sorted(set(closes_1) | set(closes_2)):
+            if ts > closed_before or legs_until is None or ts >= legs_until:
+                break
+            row = engine.update(int(ts), closes_1.get(ts), closes_2.get(ts))
+            if row is not None:
+                analytics_rows.append(row)
+        
+        analytics_rows = analytics_rows[-SPREAD_ROWS_PER_RUN:]
+        if analytics_rows:
+            adf_result = cached_adf(symbol_pair, timeframe, window, engine.last_ts, engine.window_spreads)
+            coint = cointegration_fields(adf_result)
+            for row in analytics_rows:
+                row.update(coint)
+                row['symbol_pair'] = symbol_pair
+                row['timeframe'] = timeframe
+                row['timestamp'] = datetime.fromtimestamp(row['timestamp'], tz=dt_timezone.utc)
+            bulk_upsert(SpreadAnalytics, analytics_rows, SPREAD_UNIQUE_FIELDS, SPREAD_UPDATE_FIELDS)
+        
+        cache.set(state_key, engine.to_state(), None)
+        
+        if analytics_rows:
+            cache_latest('spread', (symbol_pair, timeframe), analytics_rows)
+            publish(group_name('spread', symbol_pair, timeframe), 'spread', analytics_rows)
+            alert_engine.evaluate([spread_observation(analytics_rows[-1])])
+        
+        return len(analytics_rows)
+        
+    except Exception as e:
+        print(f"ERROR in update_spread_analytics: {e}")
+        import traceback
+        traceback.print_exc()
+        return 0
+
+@shared_task(acks_late=True)
+def compute_spread_universe(symbols, timeframe='1s', window=60, lookback_minutes=10, pairs=None):
+    """
+    Spread analytics for a whole symbol universe in one pass: every symbol's
+    bars are loaded once into an aligned close matrix and all requested
+    pairs (default: every combination) are computed vectorised and written
+    with a single bulk upsert.
+    """
+    try:
+        from ingestion.barstore import load_bars
+        from analytics.models import SpreadAnalytics
+        from analytics.universe import align_closes, pair_indices, universe_spreads
+        
+        from_time = timezone.now() - timedelta(minutes=lookback_minutes)
+        frames = {symbol: load_bars(symbol, timeframe, from_time, ['close']) for symbol in symbols}
+        frames = {symbol: df for symbol, df in frames.items() if len(df)}
+        
+        index, prices = align_closes(frames) if frames else ([], None)
+        if len(index) < window:
+            return 0
+        
+        available = list(frames)
+        requested = pairs or None
+        if requested is not None:
+            requested = [pair for pair in requested if pair[0] in frames and pair[1] in frames]
+        pair_list, I, J = pair_indices(available, requested)
+        if not pair_list:
+            return 0
+        
+        result = universe_spreads(prices, I, J, window, SPREAD_ROWS_PER_RUN)
+        timestamps = [ts.to_pydatetime() for ts in index[-result['z_score'].shape[0]:]]
+        last_ts = int(index[-1].timestamp())
+        
+        analytics_rows = []
+        latest_rows = []
+        pair_updates = []
+        for k, (symbol1, symbol2) in enumerate(pair_list):
+            hedge_ratio = result['hedge_ratio'][k]
+            spread_window = result['spread_window'][:, k]
+            # A leg that started trading less than a window ago has no rows yet
+            if not np.isfinite(hedge_ratio) or np.isnan(spread_window).any():
+                continue
+            
+            symbol_pair = f"{symbol1}_{symbol2}"
+            coint = cointegration_fields(
+                cached_adf(symbol_pair, timeframe, window, last_ts, lambda: spread_window)
+            )
+            
+            pair_rows = 0
+            for r, ts in enumerate(timestamps):
+                z_score = result['z_score'][r, k]
+                if not np.isfinite(z_score):
+                    continue
+                correlation = result['correlation'][r, k]
+                analytics_rows.append({
+                    'symbol_pair': symbol_pair,
+                    'timestamp': ts,
+                    'timeframe': timeframe,
+                    'symbol1_price': float(result['symbol1_price'][r, k]),
+                    'symbol2_price': float(result['symbol2_price'][r, k]),
+                    'hedge_ratio': float(hedge_ratio),
+                    'spread': float(result['spread'][r, k]),
+                    'z_score': float(z_score),
+                    'rolling_mean': float(result['rolling_mean'][r, k]),
+                    'rolling_std': float(result['rolling_std'][r, k]),
+                    'correlation': float(correlation) if np.isfinite(correlation) else None,
+                    **coint
+                })
+                pair_rows += 1
+            if pair_rows:
+                latest_rows.append(analytics_rows[-1])
+                pair_updates.append((symbol_pair, analytics_rows[-pair_rows:]))
+        
+        bulk_upsert(SpreadAnalytics, analytics_rows, SPREAD_UNIQUE_FIELDS, SPREAD_UPDATE_FIELDS)
+        
+        for symbol_pair, rows in pair_updates:
+            cache_latest('spread', (symbol_pair, timeframe), rows)
+            publish(group_name('spread', symbol_pair, timeframe), 'spread', rows)
+        
+        alert_engine.evaluate([spread_observation(row) for row in latest_rows])
+        
+        print(f"Computed {len(latest_rows)} pairs across {len(available)} symbols, {len(analytics_rows)} rows")
+        return len(analytics_rows)
+        
+    except Exception as e:
+        print(f"ERROR in compute_spread_universe: {e}")
+        import traceback
+        traceback.print_exc()
+        return 0
+
+@shared_task(acks_late=True)
 def compute_price_stats(symbol, timeframe='1s', lookback_minutes=10):
     try:
-        from ingestion.models import ProcessedBar
+        from ingestion.barstore import load_bars
         from analytics.models import PriceStats
         
         from_time = timezone.now() - timedelta(minutes=lookback_minutes)
         
-        bars = ProcessedBar.objects.filter(
-            symbol=symbol,
-            timeframe=timeframe,
-            timestamp__gte=from_time
-        ).order_by('timestamp').values('timestamp', 'close', 'high', 'low', 'volume')
-        
-        df = pd.DataFrame(list(bars))
+        df = load_bars(symbol, timeframe, from_time, ['close', 'high', 'low', 'volume'])
         
         if len(df) < 2:
             return 0
         
-        df['close'] = df['close'].astype(float)
-        df['high'] = df['high'].astype(float)
-        df['low'] = df['low'].astype(float)
-        df['volume'] = df['volume'].astype(float)
-        
         df['returns'] = df['close'].pct_change()
         df['volatility'] = df['returns'].rolling(window=20).std()
         df['volume_ma'] = df['volume'].rolling(window=20).mean()
@@ -168,35 +297,28 @@ def compute_price_stats(symbol, timeframe='1s', lookback_minutes=10):
         
         df = df.dropna()
         
-        stats_to_create = []
-        for idx, row in df.iterrows():
-            stats_to_create.append(PriceStats(
-                symbol=symbol,
-                timeframe=timeframe,
-                timestamp=row['timestamp'],
-                returns=Decimal(str(row['returns'])),
-                volatility=Decimal(str(row['volatility'])),
-                volume_ma=Decimal(str(row['volume_ma'])),
-                price_change_pct=Decimal(str(row['price_change_pct'])),
-                high_low_range=Decimal(str(row['high_low_range']))
-            ))
-        
-        with transaction.atomic():
-            for stat in stats_to_create:
-                PriceStats.objects.update_or_create(
-                    symbol=stat.symbol,
-                    timeframe=stat.timeframe,
-                    timestamp=stat.timestamp,
-                    defaults={
-                        'returns': stat.returns,
-                        'volatility': stat.volatility,
-                        'volume_ma': stat.volume_ma,
-                        'price_change_pct': stat.price_change_pct,
-                        'high_low_range': stat.high_low_range
-                    }
-                )
-        
-        return len(stats_to_create)
+        stats_rows = [{
+            'symbol': symbol,
+            'timeframe': timeframe,
+            'timestamp': row['timestamp'],
+            'returns': float(row['returns']),
+            'volatility': float(row['volatility']),
+            'volume_ma': float(row['volume_ma']),
+            'price_change_pct': float(row['price_change_pct']),
+            'high_low_range': float(row['high_low_range'])
+        } for row in df.to_dict('records')]
+        
+        bulk_upsert(PriceStats, stats_rows, STATS_UNIQUE_FIELDS, STATS_UPDATE_FIELDS)
+        cache_latest('stats', (symbol, timeframe), stats_rows)
+        
+        if stats_rows:
+            latest = df.iloc[-1]
+            alert_engine.evaluate([(symbol, {
+                'price_change_pct': float(latest['price_change_pct']),
+                'volume_ratio': float(latest['volume'] / latest['volume_ma']) if latest['volume_ma'] > 0 else None
+            })])
+        
+        return len(stats_rows)
         
     except Exception as e:
         print(f"ERROR in compute_price_stats: {e}")
@@ -204,47 +326,30 @@ def compute_price_stats(symbol, timeframe='1s', lookback_minutes=10):
         traceback.print_exc()
         return 0
 
+def spread_observation(row):
+    return (row['symbol_pair'], {
+        'z_score': row['z_score'],
+        'correlation': row['correlation']
+    })
+
 @shared_task
 def check_alerts(symbol_pair, timeframe):
     try:
-        from analytics.models import SpreadAnalytics, Alert
+        from analytics.models import SpreadAnalytics
         
         latest = SpreadAnalytics.objects.filter(
             symbol_pair=symbol_pair,
             timeframe=timeframe
-        ).order_by('-timestamp').first()
+        ).order_by('-timestamp').values('symbol_pair', 'z_score', 'correlation').first()
         
         if not latest:
             return 0
         
-        active_alerts = Alert.objects.filter(
-            symbol_pair=symbol_pair,
-            status='active'
-        )
-        
-        triggered_count = 0
-        
-        for alert in active_alerts:
-            condition = alert.condition
-            triggered = False
-            
-            if alert.alert_type == 'zscore_high':
-                if latest.z_score >= Decimal(str(condition['threshold'])):
-                    triggered = True
-                    
-            elif alert.alert_type == 'zscore_low':
-                if latest.z_score <= Decimal(str(condition['threshold'])):
-                    triggered = True
-            
-            if triggered:
-                alert.status = 'triggered'
-                alert.triggered_at = timezone.now()
-                alert.trigger_value = latest.z_score
-                alert.save()
-                triggered_count += 1
-                print(f"Alert triggered: {alert.alert_type} for {symbol_pair}, z-score={latest.z_score}")
-        
-        return triggered_count
+        return alert_engine.evaluate([spread_observation({
+            'symbol_pair': latest['symbol_pair'],
+            'z_score': float(latest['z_score']),
+            'correlation': float(latest['correlation']) if latest['correlation'] is not None else None
+        })])
         
     except Exception as e:
         print(f"ERROR in check_alerts: {e}")
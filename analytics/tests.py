@@ -1,3 +1,156 @@
+from django.core.cache import cache
 from django.test import TestCase
+from django.utils import timezone
+from datetime import datetime, timezone as dt_timezone
+import numpy as np
+import pandas as pd
+import random
+from ingestion.models import ProcessedBar
+from .alerts import AlertEngine, ALERT_VERSION_KEY
+from .models import Alert
+from .spread_engine import SpreadEngine, RESYNC_EVERY
+from .tasks import update_spread_analytics, SPREAD_ENGINE_KEY
+from .universe import align_closes, pair_indices, universe_spreads
 
-# Create your tests here.
+
+def batch_row(close_1, close_2, window, regression_window):
+    """The latest spread row computed from scratch over the trailing windows."""
+    y = np.array(close_1[-regression_window:])
+    x = np.array(close_2[-regression_window:])
+    hedge_ratio = np.linalg.lstsq(np.column_stack([np.ones(len(x)), x]), y, rcond=None)[0][1]
+    window_1 = np.array(close_1[-window:])
+    window_2 = np.array(close_2[-window:])
+    spread = window_1 - hedge_ratio * window_2
+    return {
+        'hedge_ratio': hedge_ratio,
+        'spread': spread[-1],
+        'rolling_mean': spread.mean(),
+        'rolling_std': spread.std(ddof=1),
+        'z_score': (spread[-1] - spread.mean()) / spread.std(ddof=1),
+        'correlation': np.corrcoef(window_1, window_2)[0, 1],
+    }
+
+
+class UniverseSpreadTests(TestCase):
+    def test_late_symbol_does_not_cut_the_history_of_the_others(self):
+        window = 60
+        rng = random.Random(5)
+        index = pd.date_range('2026-01-01', periods=600, freq='s', tz='UTC')
+        closes = {'A': [], 'B': [], 'C': []}
+        for _ in index:
+            base = rng.uniform(-1, 1)
+            for k, symbol in enumerate(closes):
+                closes[symbol].append(100 * (k + 1) + (k + 1) * base + rng.gauss(0, 0.3) + len(closes[symbol]) * 0.01)
+        frames = {symbol: pd.DataFrame({'timestamp': index, 'close': values}) for symbol, values in closes.items()}
+        frames['D'] = pd.DataFrame({'timestamp': index[-20:], 'close': [5.0 + i for i in range(20)]})
+
+        aligned_index, prices = align_closes(frames)
+        self.assertEqual(len(aligned_index), 600)
+        pairs, I, J = pair_indices(list(frames))
+        result = universe_spreads(prices, I, J, window)
+
+        expected = batch_row(closes['A'], closes['B'], window, 600)
+        k = pairs.index(('A', 'B'))
+        self.assertAlmostEqual(result['hedge_ratio'][k], expected['hedge_ratio'], places=8)
+        for field in ('spread', 'rolling_mean', 'rolling_std', 'z_score', 'correlation'):
+            self.assertAlmostEqual(result[field][-1, k], expected[field], places=6, msg=field)
+        # D has fewer bars than a window, so its pairs have no rows yet
+        for k, pair in enumerate(pairs):
+            self.assertEqual(np.isfinite(result['z_score'][:, k]).any(), 'D' not in pair, pair)
+
+
+class SpreadEngineTests(TestCase):
+    def test_streaming_rows_match_batch_computation(self):
+        window, regression_window = 30, 120
+        rng = random.Random(3)
+        engine = SpreadEngine(window, regression_window)
+        close_1, close_2 = [], []
+        price_2 = 3000.0
+        # Large prices and enough points to pass several drift resyncs
+        for i in range(RESYNC_EVERY * 2 + 300):
+            price_2 += rng.uniform(-2, 2)
+            price_1 = 40000 + 14.2 * (price_2 - 3000) + rng.gauss(0, 5)
+            close_1.append(price_1)
+            close_2.append(price_2)
+            row = engine.update(i, price_1, price_2)
+            if i % 250 == 0:
+                # Engines are cached between runs
+                engine = SpreadEngine.from_state(engine.to_state())
+            if len(close_1) < regression_window:
+                continue
+
+            expected = batch_row(close_1, close_2, window, regression_window)
+            self.assertIsNotNone(row)
+            for field, value in expected.items():
+                self.assertAlmostEqual(row[field], value, delta=1e-6 * max(1.0, abs(value)), msg=f'{field} at {i}')
+
+    def test_missing_close_carries_forward(self):
+        engine = SpreadEngine(3, 3)
+        engine.update(0, 10.0, 1.0)
+        engine.update(1, 12.0, None)
+        self.assertEqual(engine.stats.values()[-1], (1.0, 12.0))
+
+    def test_no_row_while_windows_fill(self):
+        engine = SpreadEngine(5, 5)
+        self.assertIsNone(engine.update(0, 1.0, None))
+        self.assertIsNone(engine.update(1, 2.0, 1.0))
+
+
+class StreamingSpreadTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.start = int(timezone.now().timestamp()) - 100
+
+    def add_bars(self, symbol, seconds, price):
+        ProcessedBar.objects.bulk_create([
+            ProcessedBar(symbol=symbol, timeframe='1s', timestamp=datetime.fromtimestamp(self.start + s, tz=dt_timezone.utc),
+                         open=price + s, high=price + s, low=price + s, close=price + s, volume=1, tick_count=1)
+            for s in seconds
+        ])
+
+    def engine(self):
+        return SpreadEngine.from_state(cache.get(SPREAD_ENGINE_KEY.format(
+            symbol_pair='A_B', timeframe='1s', window=3, regression_window=300
+        )))
+
+    def test_lagging_leg_holds_back_the_stream(self):
+        self.add_bars('A', range(10), 100)
+        self.add_bars('B', range(5), 10)
+        update_spread_analytics('A', 'B', window=3, lookback_minutes=5)
+        # B's bar at +4 may still be open and its later bars are not written yet
+        self.assertEqual(self.engine().last_ts, self.start + 3)
+
+        self.add_bars('B', range(5, 10), 10)
+        self.add_bars('A', range(10, 12), 100)
+        update_spread_analytics('A', 'B', window=3, lookback_minutes=5)
+        engine = self.engine()
+        self.assertEqual(engine.last_ts, self.start + 8)
+        # B's late bars were used, not its carried-forward close
+        self.assertEqual(engine.stats.values(), [(16.0, 106.0), (17.0, 107.0), (18.0, 108.0)])
+
+
+class AlertEngineTests(TestCase):
+    def test_only_alerts_active_at_update_time_trigger(self):
+        alerts = [
+            Alert.objects.create(alert_type='zscore_high', symbol_pair='BTCUSDT_ETHUSDT', condition={'threshold': t})
+            for t in (1.0, 2.0, 3.0)
+        ]
+        engine = AlertEngine()
+        engine.refresh()
+        # Changed behind the loaded index's back
+        Alert.objects.filter(id=alerts[0].id).update(status='expired')
+        alerts[1].delete()
+        engine.version = cache.get(ALERT_VERSION_KEY)
+
+        self.assertEqual(engine.evaluate([('BTCUSDT_ETHUSDT', {'z_score': 5.0})]), 1)
+        self.assertEqual(Alert.objects.get(id=alerts[0].id).status, 'expired')
+        self.assertFalse(Alert.objects.filter(id=alerts[1].id).exists())
+        self.assertEqual(Alert.objects.get(id=alerts[2].id).status, 'triggered')
+
+    def test_thresholds_respect_direction(self):
+        Alert.objects.create(alert_type='zscore_low', symbol_pair='A_B', condition={'threshold': -2.0})
+        Alert.objects.create(alert_type='zscore_high', symbol_pair='A_B', condition={'threshold': 2.0})
+        engine = AlertEngine()
+        self.assertEqual(engine.evaluate([('A_B', {'z_score': -2.5})]), 1)
+        self.assertEqual(Alert.objects.get(alert_type='zscore_low').status, 'triggered')
+        self.assertEqual(Alert.objects.get(alert_type='zscore_high').status, 'active')
@@ -0,0 +1,98 @@
+from itertools import combinations
+import numpy as np
+import pandas as pd
+
+
+def align_closes(frames):
+    """
+    Align per-symbol close frames (timestamp, close) into one T x N matrix on
+    the union of their timestamps, forward-filling gaps. A symbol's rows
+    before its first bar stay NaN, so one late symbol does not cut the
+    history of the others.
+    """
+    series = {symbol: df.set_index('timestamp')['close'] for symbol, df in frames.items()}
+    matrix = pd.DataFrame(series).sort_index().ffill()
+    return matrix.index, matrix.to_numpy(dtype=np.float64)
+
+
+def pair_indices(symbols, pairs=None):
+    """Column indices (I, J) for each (symbol1, symbol2) pair; all combinations by default."""
+    position = {symbol: i for i, symbol in enumerate(symbols)}
+    if pairs is None:
+        pairs = list(combinations(symbols, 2))
+    pairs = [tuple(pair) for pair in pairs]
+    I = np.array([position[symbol1] for symbol1, _ in pairs], dtype=np.int64)
+    J = np.array([position[symbol2] for _, symbol2 in pairs], dtype=np.int64)
+    return pairs, I, J
+
+
+def _rolling_sum(values, window):
+    cumulative = np.cumsum(values, axis=0)
+    cumulative = np.vstack([np.zeros((1, values.shape[1])), cumulative])
+    return cumulative[window:] - cumulative[:-window]
+
+
+def universe_spreads(prices, I, J, window, tail=50):
+    """
+    Vectorised spread analytics for every pair at once.
+
+    ``prices`` is the aligned T x N close matrix, NaN where a symbol has no
+    price yet. The hedge ratio of column I on column J is estimated over the
+    rows where both have a price; spread, rolling mean/std, z-score and
+    correlation are returned for the last ``tail`` rows as arrays of shape
+    (rows, pairs), NaN where a pair's window is not complete.
+    """
+    y_all = prices[:, I]
+    x_all = prices[:, J]
+    both = ~(np.isnan(x_all) | np.isnan(y_all))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        count = both.sum(axis=0)
+        xc = np.where(both, x_all - np.where(both, x_all, 0.0).sum(axis=0) / count, 0.0)
+        yc = np.where(both, y_all - np.where(both, y_all, 0.0).sum(axis=0) / count, 0.0)
+        var_j = (xc * xc).sum(axis=0)
+        hedge_ratio = np.where(var_j > 0, (xc * yc).sum(axis=0) / var_j, np.nan)
+
+    recent = slice(-(tail + window - 1), None)
+    y = y_all[recent]
+    x = x_all[recent]
+    valid = both[recent]
+    complete = _rolling_sum(valid.astype(np.float64), window) == window
+    spread = y - hedge_ratio * x
+
+    # Shift before summing squares so the variance terms do not cancel out
+    with np.errstate(divide='ignore', invalid='ignore'):
+        center = np.where(valid, spread, 0.0).sum(axis=0) / valid.sum(axis=0)
+    shifted = np.where(valid, spread - center, 0.0)
+    s1 = _rolling_sum(shifted, window)
+    s2 = _rolling_sum(shifted * shifted, window)
+    rolling_mean = np.where(complete, s1 / window + center, np.nan)
+    rolling_var = np.maximum((s2 - s1 * s1 / window) / (window - 1), 0.0)
+    rolling_std = np.where(complete, np.sqrt(rolling_var), np.nan)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        xc = np.where(valid, x - np.where(valid, x, 0.0).sum(axis=0) / valid.sum(axis=0), 0.0)
+        yc = np.where(valid, y - np.where(valid, y, 0.0).sum(axis=0) / valid.sum(axis=0), 0.0)
+    sx = _rolling_sum(xc, window)
+    sy = _rolling_sum(yc, window)
+    sxx = _rolling_sum(xc * xc, window) - sx * sx / window
+    syy = _rolling_sum(yc * yc, window) - sy * sy / window
+    sxy = _rolling_sum(xc * yc, window) - sx * sy / window
+
+    rows = rolling_mean.shape[0]
+    current = spread[-rows:]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        z_score = np.where(rolling_std > 0, (current - rolling_mean) / rolling_std, np.nan)
+        denom = np.sqrt(np.maximum(sxx, 0.0) * np.maximum(syy, 0.0))
+        correlation = np.where(complete & (denom > 0), sxy / denom, np.nan)
+
+    return {
+        'hedge_ratio': hedge_ratio,
+        'symbol1_price': y[-rows:],
+        'symbol2_price': x[-rows:],
+        'spread': current,
+        'rolling_mean': rolling_mean,
+        'rolling_std': rolling_std,
+        'z_score': z_score,
+        'correlation': np.clip(correlation, -1.0, 1.0),
+        'spread_window': spread[-window:],
+    }
@@ -5,6 +5,16 @@ import json
 from .tasks import compute_spread_analytics, compute_price_stats
 from .models import SpreadAnalytics, PriceStats, Alert
 from django.shortcuts import render
+from ingestion.pagination import paginate, encode_cursor, PaginationError
+from ingestion.latest import wants_latest, get_latest
+from ingestion.export import export_request, ExportError
+
+SPREAD_RESPONSE_FIELDS = [
+    'timestamp', 'symbol1_price', 'symbol2_price', 'hedge_ratio', 'spread', 'z_score',
+    'rolling_mean', 'rolling_std', 'correlation', 'adf_statistic', 'adf_pvalue',
+    'is_cointegrated'
+]
+STATS_RESPONSE_FIELDS = ['timestamp', 'returns', 'volatility', 'volume_ma', 'price_change_pct', 'high_low_range']
 
 def dashboard(request):
     return render(request, 'dashboard.html')
@@ -53,12 +63,24 @@ def get_spread_analytics(request):
     symbol2 = request.GET.get('symbol2', 'ETHUSDT')
     symbol_pair = f"{symbol1}_{symbol2}"
     timeframe = request.GET.get('timeframe', '1s')
-    limit = int(request.GET.get('limit', 100))
     
-    analytics = SpreadAnalytics.objects.filter(
+    if wants_latest(request):
+        latest = get_latest('spread', symbol_pair, timeframe)
+        if latest is not None:
+            return JsonResponse({
+                'analytics': [{key: latest[key] for key in SPREAD_RESPONSE_FIELDS}],
+                'count': 1,
+                'next_cursor': encode_cursor(latest['timestamp'], None, 'desc')
+            })
+    
+    query = SpreadAnalytics.objects.filter(
         symbol_pair=symbol_pair,
         timeframe=timeframe
-    ).order_by('-timestamp')[:limit]
+    )
+    try:
+        analytics, next_cursor, order = paginate(query, request)
+    except PaginationError as e:
+        return JsonResponse({'error': str(e)}, status=400)
     
     data = [{
         'timestamp': a.timestamp.isoformat(),
@@ -75,18 +97,34 @@ def get_spread_analytics(request):
         'is_cointegrated': a.is_cointegrated
     } for a in analytics]
     
-    return JsonResponse({'analytics': data[::-1], 'count': len(data)})
+    # Pages are always returned oldest-first for charting
+    if order == 'desc':
+        data = data[::-1]
+    
+    return JsonResponse({'analytics': data, 'count': len(data), 'next_cursor': next_cursor})
 
 @require_http_methods(["GET"])
 def get_price_stats(request):
     symbol = request.GET.get('symbol', 'BTCUSDT')
     timeframe = request.GET.get('timeframe', '1s')
-    limit = int(request.GET.get('limit', 100))
     
-    stats = PriceStats.objects.filter(
+    if wants_latest(request):
+        latest = get_latest('stats', symbol, timeframe)
+        if latest is not None:
+            return JsonResponse({
+                'stats': [{key: latest[key] for key in STATS_RESPONSE_FIELDS}],
+                'count': 1,
+                'next_cursor': encode_cursor(latest['timestamp'], None, 'desc')
+            })
+    
+    query = PriceStats.objects.filter(
         symbol=symbol,
         timeframe=timeframe
-    ).order_by('-timestamp')[:limit]
+    )
+    try:
+        stats, next_cursor, order = paginate(query, request)
+    except PaginationError as e:
+        return JsonResponse({'error': str(e)}, status=400)
     
     data = [{
         'timestamp': s.timestamp.isoformat(),
@@ -97,7 +135,34 @@ def get_price_stats(request):
         'high_low_range': float(s.high_low_range)
     } for s in stats]
     
-    return JsonResponse({'stats': data[::-1], 'count': len(data)})
+    if order == 'desc':
+        data = data[::-1]
+    
+    return JsonResponse({'stats': data, 'count': len(data), 'next_cursor': next_cursor})
+
+@require_http_methods(["GET"])
+def export_spread_analytics(request):
+    symbol1 = request.GET.get('symbol1', 'BTCUSDT')
+    symbol2 = request.GET.get('symbol2', 'ETHUSDT')
+    symbol_pair = f"{symbol1}_{symbol2}"
+    timeframe = request.GET.get('timeframe', '1s')
+    
+    query = SpreadAnalytics.objects.filter(symbol_pair=symbol_pair, timeframe=timeframe)
+    try:
+        return export_request(request, query, f'spread_{symbol_pair}_{timeframe}')
+    except (ExportError, PaginationError) as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+@require_http_methods(["GET"])
+def export_price_stats(request):
+    symbol = request.GET.get('symbol', 'BTCUSDT')
+    timeframe = request.GET.get('timeframe', '1s')
+    
+    query = PriceStats.objects.filter(symbol=symbol, timeframe=timeframe)
+    try:
+        return export_request(request, query, f'stats_{symbol}_{timeframe}')
+    except (ExportError, PaginationError) as e:
+        return JsonResponse({'error': str(e)}, status=400)
 
 @csrf_exempt
 @require_http_methods(["POST"])
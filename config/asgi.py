@@ -7,9 +7,11 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
 django_asgi_app = get_asgi_application()
 
+from analytics.routing import websocket_urlpatterns  # noqa: E402  needs the app registry
+
 application = ProtocolTypeRouter({
     "http": django_asgi_app,
     "websocket": AuthMiddlewareStack(
-        URLRouter([])
+        URLRouter(websocket_urlpatterns)
     ),
 })
\ No newline at end of file
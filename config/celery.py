@@ -7,6 +7,38 @@ app = Celery('config')
 app.config_from_object('django.conf:settings', namespace='CELERY')
 app.autodiscover_tasks()
 
-# # Explicit imports to ensure tasks are discovered
-# from analytics import tasks as analytics_tasks  # noqa
-# from ingestion import tasks as ingestion_tasks  # noqa
\ No newline at end of file
+# Workloads get their own queues so a backfill or a slow ADF run cannot sit in
+# front of live ticks; see "Worker Profiles" in the Readme for how each is consumed
+INGEST_QUEUE = 'ingest'
+BARS_QUEUE = 'bars'
+ANALYTICS_QUEUE = 'analytics'
+ALERTS_QUEUE = 'alerts'
+BACKFILL_QUEUE = 'backfill'
+
+TASK_QUEUES = {
+    'ingestion.tasks.ingest_tick_batch': INGEST_QUEUE,
+    'ingestion.tasks.maintain_tick_partitions': INGEST_QUEUE,
+    'ingestion.tasks.process_ticks_to_bars': BARS_QUEUE,
+    'ingestion.tasks.rollup_bars': BARS_QUEUE,
+    'ingestion.tasks.rebuild_bars': BARS_QUEUE,
+    'analytics.tasks.compute_spread_analytics': ANALYTICS_QUEUE,
+    'analytics.tasks.update_spread_analytics': ANALYTICS_QUEUE,
+    'analytics.tasks.compute_spread_universe': ANALYTICS_QUEUE,
+    'analytics.tasks.compute_price_stats': ANALYTICS_QUEUE,
+    'analytics.tasks.check_alerts': ALERTS_QUEUE,
+    'ingestion.tasks.process_ndjson_file': BACKFILL_QUEUE,
+    'ingestion.tasks.log_trade_gap': BACKFILL_QUEUE,
+    'ingestion.tasks.recover_trade_gap': BACKFILL_QUEUE,
+}
+
+
+def route_task(name, args, kwargs, options, task=None, **kw):
+    # Triggered runs travel as run_triggered(key, task_name, args) and belong
+    # on the queue of the task they wrap
+    if name == 'ingestion.scheduling.run_triggered' and args and len(args) > 1:
+        name = args[1]
+    queue = TASK_QUEUES.get(name)
+    return {'queue': queue} if queue else None
+
+
+app.conf.task_routes = (route_task,)
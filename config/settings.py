@@ -72,6 +72,10 @@ USE_I18N = True
 USE_TZ = True
 
 STATIC_URL = 'static/'
+MEDIA_ROOT = BASE_DIR / 'media'
+
+# Uploads above this size are spooled to a temporary file rather than kept in memory
+FILE_UPLOAD_MAX_MEMORY_SIZE = 2621440
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 CELERY_BROKER_URL = 'redis://localhost:6379/0'
@@ -81,6 +85,51 @@ CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = TIME_ZONE
 CELERY_BEAT_SCHEDULER = 'django_celery_beat.schedulers:DatabaseScheduler'
+# Tasks are routed to per-workload queues in config/celery.py. Workers take one
+# task at a time by default so a long task never holds others hostage in its
+# prefetch buffer; a task acknowledged late is redelivered if its worker dies
+CELERY_WORKER_PREFETCH_MULTIPLIER = 1
+CELERY_TASK_REJECT_ON_WORKER_LOST = True
+
+# Stream tick batches into raw_ticks with COPY FROM STDIN when on PostgreSQL
+INGEST_USE_COPY = True
+
+# raw_ticks is range-partitioned by day once migrated with partition_raw_ticks;
+# partitions are created this many days ahead and dropped after the retention period
+RAW_TICK_PARTITION_DAYS_AHEAD = 3
+RAW_TICK_RETENTION_DAYS = 30
+
+# Analytics run when bars close rather than on fixed intervals. Stats are kept for every
+# symbol, spreads for the pairs below; triggers for the same job within
+# ANALYTICS_TRIGGER_DELAY_SECONDS are coalesced into one run
+ANALYTICS_PAIRS = [('BTCUSDT', 'ETHUSDT')]
+ANALYTICS_TIMEFRAMES = ['1s']
+ANALYTICS_SPREAD_WINDOW = 60
+ANALYTICS_LOOKBACK_MINUTES = 5
+ANALYTICS_TRIGGER_DELAY_SECONDS = 3
+
+# Optional memory-mapped cache of closed bars used by the analytics tasks
+BAR_STORE_ENABLED = False
+BAR_STORE_DIR = BASE_DIR / 'media' / 'barstore'
+BAR_STORE_SETTLE_SECONDS = 120
+
+# Cointegration (ADF) results are reused until the spread window has moved
+# ADF_RECOMPUTE_SECONDS of bar time, and never once older than ADF_MAX_STALENESS_SECONDS
+ADF_RECOMPUTE_SECONDS = 300
+ADF_MAX_STALENESS_SECONDS = 900
+
+# Trades missed across producer disconnects are logged in trade_gaps and
+# refilled from this source; the default reads NDJSON trade events under
+# TRADE_ARCHIVE_DIR (see ingestion/history.py)
+TRADE_HISTORY_SOURCE = 'ingestion.history.NDJSONArchiveSource'
+TRADE_ARCHIVE_DIR = BASE_DIR / 'media' / 'archive'
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': 'redis://localhost:6379/1',
+    }
+}
 
 CHANNEL_LAYERS = {
     'default': {
@@ -0,0 +1,66 @@
+from datetime import datetime, timedelta
+from django.db import connections
+from .ndjson import iter_shard_lines, iter_ndjson_batches, ParseProgress
+from .tickstore import write_ticks
+from .bars import bucket_start, to_epoch_ms, from_epoch_seconds
+
+BACKFILL_BATCH_SIZE = 20000
+BAR_REBUILD_WINDOW = timedelta(days=1)
+
+
+def backfill_shard(path, start, end, batch_size=BACKFILL_BATCH_SIZE):
+    """
+    Parse one byte range of an NDJSON file and write its ticks straight to
+    raw_ticks. Runs inside a pool process. Returns parse counters, the number
+    of ticks inserted and the inserted time range per symbol.
+    """
+    progress = ParseProgress()
+    inserted = 0
+    ranges = {}
+
+    try:
+        for batch in iter_ndjson_batches(iter_shard_lines(path, start, end), batch_size, progress):
+            rows = []
+            for tick in batch:
+                try:
+                    ts = datetime.fromisoformat(tick['ts'].replace('Z', '+00:00'))
+                    rows.append((tick['symbol'], ts, tick['price'], tick['size'], tick.get('trade_id')))
+                except (KeyError, TypeError, ValueError):
+                    progress.parse_errors += 1
+
+            for symbol, ts, _, _, _ in write_ticks(rows):
+                inserted += 1
+                low, high = ranges.get(symbol, (ts, ts))
+                ranges[symbol] = (min(low, ts), max(high, ts))
+            progress.batches_dispatched += 1
+    finally:
+        connections.close_all()
+
+    return {
+        'progress': progress.to_dict(),
+        'inserted': inserted,
+        'ranges': ranges,
+    }
+
+
+def merge_ranges(results):
+    ranges = {}
+    for result in results:
+        for symbol, (low, high) in result['ranges'].items():
+            if symbol in ranges:
+                low = min(low, ranges[symbol][0])
+                high = max(high, ranges[symbol][1])
+            ranges[symbol] = (low, high)
+    return ranges
+
+
+def iter_rebuild_windows(low, high, timeframe, window=BAR_REBUILD_WINDOW):
+    """
+    Yield (start, end) windows covering [low, high] on bar boundaries, so a
+    long backfilled range is resampled a day at a time.
+    """
+    start = from_epoch_seconds(bucket_start(to_epoch_ms(low), timeframe))
+    while start <= high:
+        end = start + window
+        yield start, end
+        start = end
@@ -0,0 +1,220 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+import pandas as pd
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+TIMEFRAME_SECONDS = {
+    '1s': 1,
+    '1m': 60,
+    '5m': 300,
+    '15m': 900,
+    '1h': 3600,
+    '1d': 86400,
+}
+
+# pandas reads '1m' as month-end, so timeframes are mapped to explicit offsets
+PANDAS_FREQ = {
+    '1s': '1s',
+    '1m': '1min',
+    '5m': '5min',
+    '15m': '15min',
+    '1h': '1h',
+    '1d': '1D',
+}
+
+# Every timeframe above 1s is rolled up from the next finer one, never from ticks
+ROLLUP_SOURCE = {
+    '1m': '1s',
+    '5m': '1m',
+    '15m': '5m',
+    '1h': '15m',
+    '1d': '1h',
+}
+ROLLUP_TIMEFRAMES = list(ROLLUP_SOURCE)
+
+
+def to_epoch_ms(ts):
+    return int(ts.timestamp() * 1000)
+
+
+def from_epoch_seconds(seconds):
+    return datetime.fromtimestamp(seconds, tz=dt_timezone.utc)
+
+
+def from_epoch_ms(epoch_ms):
+    # timedelta keeps whole milliseconds exact where float seconds could round
+    return EPOCH + timedelta(milliseconds=epoch_ms)
+
+
+def bucket_start(epoch_ms, timeframe):
+    seconds = TIMEFRAME_SECONDS[timeframe]
+    epoch_s = epoch_ms // 1000
+    return epoch_s - epoch_s % seconds
+
+
+def resample_ticks(tick_list, timeframe):
+    """Batch OHLCV resample of tick dicts with timestamp/price/size keys."""
+    df = pd.DataFrame(tick_list)
+    df['timestamp'] = pd.to_datetime(df['timestamp'], utc=True)
+    df.set_index('timestamp', inplace=True)
+    df['price'] = df['price'].astype(float)
+    df['size'] = df['size'].astype(float)
+
+    freq = PANDAS_FREQ.get(timeframe, timeframe)
+    bars = df['price'].resample(freq).ohlc()
+    bars['volume'] = df['size'].resample(freq).sum()
+    bars['tick_count'] = df['price'].resample(freq).count()
+    return bars.dropna()
+
+
+def aggregate_bars(bars, timeframe):
+    """
+    Roll timestamp-ordered bar dicts of a finer timeframe up into
+    ``timeframe`` buckets: first open, max high, min low, last close and
+    summed volume and tick_count.
+    """
+    rolled = {}
+    for bar in bars:
+        bucket = bucket_start(to_epoch_ms(bar['timestamp']), timeframe)
+        current = rolled.get(bucket)
+        if current is None:
+            rolled[bucket] = {
+                'timestamp': from_epoch_seconds(bucket),
+                'open': bar['open'],
+                'high': bar['high'],
+                'low': bar['low'],
+                'close': bar['close'],
+                'volume': bar['volume'],
+                'tick_count': bar['tick_count'],
+            }
+            continue
+        if bar['high'] > current['high']:
+            current['high'] = bar['high']
+        if bar['low'] < current['low']:
+            current['low'] = bar['low']
+        current['close'] = bar['close']
+        current['volume'] += bar['volume']
+        current['tick_count'] += bar['tick_count']
+    return [rolled[bucket] for bucket in sorted(rolled)]
+
+
+class OpenBar:
+    __slots__ = ('open', 'high', 'low', 'close', 'volume', 'tick_count', 'first_ms', 'last_ms')
+
+    def __init__(self, open, high, low, close, volume, tick_count, first_ms, last_ms):
+        self.open = open
+        self.high = high
+        self.low = low
+        self.close = close
+        self.volume = volume
+        self.tick_count = tick_count
+        self.first_ms = first_ms
+        self.last_ms = last_ms
+
+    def add(self, epoch_ms, price, size):
+        # Ties keep the first tick as open and the last tick as close, the
+        # same as resampling a timestamp-ordered frame.
+        if epoch_ms < self.first_ms:
+            self.open = price
+            self.first_ms = epoch_ms
+        if epoch_ms >= self.last_ms:
+            self.close = price
+            self.last_ms = epoch_ms
+        if price > self.high:
+            self.high = price
+        if price < self.low:
+            self.low = price
+        self.volume += size
+        self.tick_count += 1
+
+    def to_list(self):
+        return [self.open, self.high, self.low, self.close, self.volume,
+                self.tick_count, self.first_ms, self.last_ms]
+
+
+class IncrementalBarBuilder:
+    """
+    Keeps the most recent bars for one symbol/timeframe and folds new ticks
+    into them, so only the bars touched by a batch have to be written.
+
+    Buckets older than ``floor`` are not owned by the builder (they were
+    evicted, or predate a cold start); ticks landing there are returned as
+    late so the caller can rebuild that range from the database.
+    """
+
+    def __init__(self, timeframe='1s', max_bars=120, floor=None):
+        self.timeframe = timeframe
+        self.max_bars = max_bars
+        self.floor = floor
+        self.watermark = None
+        self.bars = {}
+
+    def add_ticks(self, ticks):
+        """
+        Fold (timestamp, price, size) tuples into the open bars.
+        Returns (changed bar dicts, late ticks).
+        """
+        changed = set()
+        late = []
+
+        for ts, price, size in ticks:
+            epoch_ms = to_epoch_ms(ts)
+            bucket = bucket_start(epoch_ms, self.timeframe)
+
+            if self.floor is not None and bucket < self.floor:
+                late.append((ts, price, size))
+                continue
+
+            price = float(price)
+            size = float(size)
+            bar = self.bars.get(bucket)
+            if bar is None:
+                self.bars[bucket] = OpenBar(price, price, price, price, size, 1, epoch_ms, epoch_ms)
+            else:
+                bar.add(epoch_ms, price, size)
+            changed.add(bucket)
+
+            if self.watermark is None or epoch_ms > self.watermark:
+                self.watermark = epoch_ms
+
+        # Collect before evicting: a batch spanning more than max_bars buckets
+        # still has to write the bars it pushed out
+        result = [self.bar_dict(bucket) for bucket in sorted(changed)]
+        self._evict()
+        return result, late
+
+    def _evict(self):
+        if len(self.bars) <= self.max_bars:
+            return
+        buckets = sorted(self.bars)
+        for bucket in buckets[:-self.max_bars]:
+            del self.bars[bucket]
+        self.floor = buckets[-self.max_bars]
+
+    def bar_dict(self, bucket):
+        bar = self.bars[bucket]
+        return {
+            'timestamp': from_epoch_seconds(bucket),
+            'open': bar.open,
+            'high': bar.high,
+            'low': bar.low,
+            'close': bar.close,
+            'volume': bar.volume,
+            'tick_count': bar.tick_count,
+        }
+
+    def to_state(self):
+        return {
+            'timeframe': self.timeframe,
+            'max_bars': self.max_bars,
+            'floor': self.floor,
+            'watermark': self.watermark,
+            'bars': {bucket: bar.to_list() for bucket, bar in self.bars.items()},
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        builder = cls(state['timeframe'], state['max_bars'], state['floor'])
+        builder.watermark = state['watermark']
+        builder.bars = {bucket: OpenBar(*values) for bucket, values in state['bars'].items()}
+        return builder
@@ -0,0 +1,192 @@
+from django.conf import settings
+from django.utils import timezone
+from contextlib import contextmanager
+from pathlib import Path
+import fcntl
+import os
+import numpy as np
+import pandas as pd
+from .models import ProcessedBar
+from .bars import TIMEFRAME_SECONDS
+
+BAR_COLUMNS = ('open', 'high', 'low', 'close', 'volume', 'tick_count')
+COLUMN_DTYPES = {
+    'timestamp': np.int64,
+    'open': np.float64,
+    'high': np.float64,
+    'low': np.float64,
+    'close': np.float64,
+    'volume': np.float64,
+    'tick_count': np.int64,
+}
+
+
+class ColumnarBarStore:
+    """
+    Append-only on-disk columns of closed bars for one symbol/timeframe.
+    Each column is a flat little-endian file of int64/float64 values read
+    through np.memmap, so range slices are views rather than copies.
+    Timestamps are epoch seconds of the bar start.
+    """
+
+    def __init__(self, root, symbol, timeframe):
+        self.path = Path(root) / f'{symbol}_{timeframe}'
+
+    def _file(self, column):
+        return self.path / f'{column}.bin'
+
+    def __len__(self):
+        # A crash mid-append can leave columns uneven; the shortest one wins
+        sizes = []
+        for column in COLUMN_DTYPES:
+            try:
+                sizes.append(os.path.getsize(self._file(column)) // 8)
+            except FileNotFoundError:
+                return 0
+        return min(sizes)
+
+    def column(self, name, count=None):
+        count = len(self) if count is None else count
+        if count == 0:
+            return np.empty(0, dtype=COLUMN_DTYPES[name])
+        return np.memmap(self._file(name), dtype=COLUMN_DTYPES[name], mode='r', shape=(count,))
+
+    def bounds(self):
+        count = len(self)
+        if count == 0:
+            return None
+        ts = self.column('timestamp', count)
+        return int(ts[0]), int(ts[-1])
+
+    @contextmanager
+    def lock(self):
+        self.path.mkdir(parents=True, exist_ok=True)
+        with open(self.path / '.lock', 'w') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def append(self, columns):
+        """Append arrays keyed by column name, keeping only bars newer than the last stored one."""
+        with self.lock():
+            count = len(self)
+            self._truncate_to(count)
+            ts = np.asarray(columns['timestamp'], dtype=np.int64)
+            if count:
+                last = self.column('timestamp', count)[-1]
+                keep = ts > last
+                ts = ts[keep]
+                columns = {name: np.asarray(values)[keep] for name, values in columns.items()}
+            if len(ts) == 0:
+                return 0
+            # Timestamps are written last so readers never see a bar before its values
+            for name in BAR_COLUMNS + ('timestamp',):
+                with open(self._file(name), 'ab') as f:
+                    f.write(np.asarray(columns[name], dtype=COLUMN_DTYPES[name]).tobytes())
+            return len(ts)
+
+    def slice(self, start=None, end=None, columns=BAR_COLUMNS):
+        """Views of [start, end) in epoch seconds for the requested columns."""
+        count = len(self)
+        ts = self.column('timestamp', count)
+        lo = 0 if start is None else int(np.searchsorted(ts, start, side='left'))
+        hi = count if end is None else int(np.searchsorted(ts, end, side='left'))
+        result = {'timestamp': ts[lo:hi]}
+        for name in columns:
+            result[name] = self.column(name, count)[lo:hi]
+        return result
+
+    def truncate(self, start):
+        """Drop every bar at or after ``start`` (epoch seconds), e.g. after a rebuild."""
+        with self.lock():
+            count = len(self)
+            if count == 0:
+                return
+            ts = self.column('timestamp', count)
+            self._truncate_to(int(np.searchsorted(ts, start, side='left')))
+
+    def _truncate_to(self, count):
+        for column in COLUMN_DTYPES:
+            path = self._file(column)
+            if path.exists() and os.path.getsize(path) > count * 8:
+                os.truncate(path, count * 8)
+
+
+def store_enabled():
+    return getattr(settings, 'BAR_STORE_ENABLED', False)
+
+
+def get_store(symbol, timeframe):
+    return ColumnarBarStore(settings.BAR_STORE_DIR, symbol, timeframe)
+
+
+def _query_bars(symbol, timeframe, start=None, end=None, columns=BAR_COLUMNS):
+    query = ProcessedBar.objects.filter(symbol=symbol, timeframe=timeframe)
+    if start is not None:
+        query = query.filter(timestamp__gte=pd.Timestamp(start, unit='s', tz='UTC').to_pydatetime())
+    if end is not None:
+        query = query.filter(timestamp__lt=pd.Timestamp(end, unit='s', tz='UTC').to_pydatetime())
+    rows = list(query.order_by('timestamp').values_list('timestamp', *columns))
+
+    result = {'timestamp': np.array([int(row[0].timestamp()) for row in rows], dtype=np.int64)}
+    for i, name in enumerate(columns, start=1):
+        result[name] = np.array([row[i] for row in rows], dtype=COLUMN_DTYPES[name])
+    return result
+
+
+def _concat(parts, columns):
+    parts = [part for part in parts if len(part['timestamp'])]
+    if len(parts) == 1:
+        return parts[0]
+    if not parts:
+        return {name: np.empty(0, dtype=COLUMN_DTYPES[name]) for name in ('timestamp',) + tuple(columns)}
+    return {name: np.concatenate([part[name] for part in parts]) for name in ('timestamp',) + tuple(columns)}
+
+
+def sync_store(store, symbol, timeframe, columns=BAR_COLUMNS, since=None):
+    """
+    Append bars that have closed and settled since the last cached one, and
+    return the newer bars that are not cached yet (still open or settling).
+    """
+    bounds = store.bounds()
+    start = bounds[1] + 1 if bounds else since
+    tail = _query_bars(symbol, timeframe, start, None, BAR_COLUMNS)
+
+    settle = getattr(settings, 'BAR_STORE_SETTLE_SECONDS', 120)
+    cutoff = int(timezone.now().timestamp()) - settle - TIMEFRAME_SECONDS.get(timeframe, 1)
+    settled = tail['timestamp'] <= cutoff
+    if settled.any():
+        store.append({name: values[settled] for name, values in tail.items()})
+
+    return {name: tail[name][~settled] for name in ('timestamp',) + tuple(columns)}
+
+
+def load_bars(symbol, timeframe, from_time, columns=('close',)):
+    """
+    Bars for ``symbol`` since ``from_time`` as a DataFrame with a UTC
+    ``timestamp`` column and float/int value columns. Served from the
+    columnar store when BAR_STORE_ENABLED is on, querying PostgreSQL only for
+    bars the store does not hold yet.
+    """
+    start = int(np.ceil(from_time.timestamp()))
+    columns = tuple(columns)
+
+    if not store_enabled():
+        data = _query_bars(symbol, timeframe, start, None, columns)
+    else:
+        store = get_store(symbol, timeframe)
+        tail = sync_store(store, symbol, timeframe, columns, since=start)
+        bounds = store.bounds()
+        if bounds is None:
+            data = tail
+        else:
+            head = _query_bars(symbol, timeframe, start, bounds[0], columns) if start < bounds[0] else None
+            cached = store.slice(start, None, columns)
+            data = _concat([part for part in (head, cached, tail) if part is not None], columns)
+
+    frame = {'timestamp': pd.to_datetime(data['timestamp'], unit='s', utc=True)}
+    for name in columns:
+        frame[name] = data[name]
+    return pd.DataFrame(frame)
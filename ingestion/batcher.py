@@ -0,0 +1,110 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from celery import current_app
+from kombu.exceptions import ChannelError
+
+BATCH_SIZE = 100
+MAX_BATCH_SIZE = 5000
+MAX_LATENCY_SECONDS = 0.25
+# Broker depth is sampled at most this often; each sample is a Redis round trip
+DEPTH_POLL_SECONDS = 1.0
+# Batches waiting on the ingest queue above which the batch size doubles, and
+# below which it halves back towards the configured size
+DEPTH_HIGH = 20
+DEPTH_LOW = 2
+
+
+def broker_queue_depth(queue):
+    """Messages waiting on ``queue``, or None if the broker cannot be asked."""
+    try:
+        with current_app.connection_for_read() as conn:
+            return conn.default_channel.queue_declare(queue=queue, passive=True).message_count
+    except ChannelError:
+        # The Redis transport reports an empty queue as missing
+        return 0
+    except Exception as e:
+        print(f"Could not read depth of queue {queue}: {e}")
+        return None
+
+
+class TickBatcher:
+    """
+    Shared batch for every symbol the producer follows. A batch is dispatched
+    when it reaches the current size target or when its oldest tick has
+    waited ``max_latency`` seconds, whichever comes first. While the ingest
+    queue is backed up the size target doubles, up to ``max_batch_size``, so
+    workers get fewer and larger tasks; it halves back once they catch up.
+
+    A plain ``dispatch`` runs on a single worker thread so batches reach the
+    broker in order without blocking the event loop; a coroutine is awaited
+    directly. Either way add() waits for a full batch to be handed over,
+    which slows the readers when the consumer of the batches is slow.
+    """
+
+    def __init__(self, dispatch, queue, batch_size=BATCH_SIZE, max_batch_size=MAX_BATCH_SIZE,
+                 max_latency=MAX_LATENCY_SECONDS, depth=broker_queue_depth):
+        self.dispatch = dispatch
+        self.queue = queue
+        self.min_batch_size = batch_size
+        self.max_batch_size = max(batch_size, max_batch_size)
+        self.batch_size = batch_size
+        self.max_latency = max_latency
+        self.depth = depth
+        self.batch = []
+        self.oldest = None
+        self.last_depth = None
+        self.last_poll = 0.0
+        self.dispatched_batches = 0
+        self.dispatched_ticks = 0
+        self.executor = ThreadPoolExecutor(max_workers=1)
+
+    async def add(self, tick):
+        if not self.batch:
+            self.oldest = time.monotonic()
+        self.batch.append(tick)
+        if len(self.batch) >= self.batch_size:
+            await self.flush()
+
+    async def run(self):
+        """Flush batches whose oldest tick has waited ``max_latency``; runs until cancelled."""
+        try:
+            while True:
+                await asyncio.sleep(self.max_latency / 4)
+                if self.batch and time.monotonic() - self.oldest >= self.max_latency:
+                    await self.flush()
+        finally:
+            if self.batch:
+                await self.flush()
+            self.executor.shutdown(wait=True)
+
+    async def flush(self):
+        batch, self.batch = self.batch, []
+        loop = asyncio.get_running_loop()
+        if asyncio.iscoroutinefunction(self.dispatch):
+            await self.dispatch(batch)
+        else:
+            await loop.run_in_executor(self.executor, self.dispatch, batch)
+        self.dispatched_batches += 1
+        self.dispatched_ticks += len(batch)
+
+        if time.monotonic() - self.last_poll >= DEPTH_POLL_SECONDS:
+            self.last_poll = time.monotonic()
+            self.last_depth = await loop.run_in_executor(self.executor, self.depth, self.queue)
+            self.resize(self.last_depth)
+
+    def resize(self, depth):
+        if depth is None:
+            return
+        if depth > DEPTH_HIGH:
+            self.batch_size = min(self.batch_size * 2, self.max_batch_size)
+        elif depth < DEPTH_LOW:
+            self.batch_size = max(self.batch_size // 2, self.min_batch_size)
+
+    def stats(self):
+        return {
+            'batches': self.dispatched_batches,
+            'ticks': self.dispatched_ticks,
+            'batch_size': self.batch_size,
+            'queue_depth': self.last_depth,
+        }
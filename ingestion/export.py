@@ -0,0 +1,215 @@
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.db import models
+from django.http import StreamingHttpResponse
+from decimal import Decimal
+from itertools import islice
+import csv
+import io
+import json
+from .pagination import parse_time
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+EXPORT_CHUNK_SIZE = 5000
+
+CONTENT_TYPES = {
+    'arrow': 'application/vnd.apache.arrow.stream',
+    'parquet': 'application/vnd.apache.parquet',
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+
+class ExportError(ValueError):
+    pass
+
+
+def export_columns(model):
+    return [f.name for f in model._meta.concrete_fields if f.name not in ('id', 'created_at')]
+
+
+def _chunks(queryset, fields):
+    # values_list().iterator() reads through a server-side cursor on PostgreSQL,
+    # so only one chunk of rows is held in memory at a time
+    rows = queryset.values_list(*fields).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    while True:
+        chunk = list(islice(rows, EXPORT_CHUNK_SIZE))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _plain(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return value
+
+
+def _stream_ndjson(queryset, fields):
+    for chunk in _chunks(queryset, fields):
+        yield ''.join(json.dumps(dict(zip(fields, map(_plain, row)))) + '\n' for row in chunk)
+
+
+def _stream_csv(queryset, fields):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+    for chunk in _chunks(queryset, fields):
+        writer.writerows([_plain(value) for value in row] for row in chunk)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+class _ChunkSink:
+    """Write-only file object that hands back whatever pyarrow wrote since the last drain."""
+
+    closed = False
+
+    def __init__(self):
+        self.parts = []
+        self.position = 0
+
+    def write(self, data):
+        data = bytes(data)
+        self.parts.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def writable(self):
+        return True
+
+    def drain(self):
+        data = b''.join(self.parts)
+        self.parts = []
+        return data
+
+
+def _arrow_schema(model, fields):
+    columns = []
+    for name in fields:
+        field = model._meta.get_field(name)
+        if isinstance(field, models.DateTimeField):
+            arrow_type = pa.timestamp('us', tz='UTC')
+        elif isinstance(field, models.DecimalField):
+            arrow_type = pa.float64()
+        elif isinstance(field, models.BooleanField):
+            arrow_type = pa.bool_()
+        elif isinstance(field, (models.IntegerField, models.BigIntegerField)):
+            arrow_type = pa.int64()
+        else:
+            arrow_type = pa.string()
+        columns.append(pa.field(name, arrow_type))
+    return pa.schema(columns)
+
+
+def _record_batches(queryset, fields, schema):
+    for chunk in _chunks(queryset, fields):
+        columns = []
+        for values, field in zip(zip(*chunk), schema):
+            if pa.types.is_floating(field.type):
+                values = [None if v is None else float(v) for v in values]
+            columns.append(pa.array(values, type=field.type))
+        yield pa.RecordBatch.from_arrays(columns, schema=schema)
+
+
+def _stream_arrow(queryset, fields, schema):
+    sink = _ChunkSink()
+    with pa.ipc.new_stream(sink, schema) as writer:
+        for batch in _record_batches(queryset, fields, schema):
+            writer.write_batch(batch)
+            yield sink.drain()
+    yield sink.drain()
+
+
+def _stream_parquet(queryset, fields, schema):
+    # One row group per chunk; the footer is written when the writer closes
+    sink = _ChunkSink()
+    with pq.ParquetWriter(sink, schema, compression='zstd') as writer:
+        for batch in _record_batches(queryset, fields, schema):
+            writer.write_batch(batch)
+            yield sink.drain()
+    yield sink.drain()
+
+
+async def _stream_async(content):
+    # An ASGI server collects a sync iterator in full before sending it, so
+    # pull each encoded chunk through sync_to_async instead. The calls share
+    # one thread, and with it the database cursor.
+    next_part = sync_to_async(next)
+    while True:
+        part = await next_part(content, None)
+        if part is None:
+            return
+        yield part
+
+
+def export_response(queryset, fields, fmt, filename, asynchronous=False):
+    """
+    Stream ``fields`` of ``queryset`` as Arrow IPC, Parquet (both need
+    pyarrow), NDJSON or CSV. Rows are pulled from the database and encoded
+    one chunk at a time, so memory stays bounded regardless of export size.
+    Pass ``asynchronous`` when serving under ASGI.
+    """
+    model = queryset.model
+    allowed = export_columns(model)
+    unknown = [name for name in fields if name not in allowed]
+    if unknown:
+        raise ExportError(f"Unknown fields: {', '.join(unknown)}. Available: {', '.join(allowed)}")
+    if fmt not in CONTENT_TYPES:
+        raise ExportError(f"format must be one of: {', '.join(CONTENT_TYPES)}")
+
+    if fmt in ('arrow', 'parquet'):
+        if pa is None:
+            raise ExportError(f'{fmt} export requires pyarrow; use ndjson or csv')
+        schema = _arrow_schema(model, fields)
+        stream_format = _stream_arrow if fmt == 'arrow' else _stream_parquet
+        content = stream_format(queryset, fields, schema)
+    elif fmt == 'ndjson':
+        content = _stream_ndjson(queryset, fields)
+    else:
+        content = _stream_csv(queryset, fields)
+    if asynchronous:
+        content = _stream_async(content)
+
+    response = StreamingHttpResponse(content, content_type=CONTENT_TYPES[fmt])
+    response['Content-Disposition'] = f'attachment; filename="{filename}.{fmt}"'
+    return response
+
+
+def export_request(request, queryset, filename):
+    """Apply the ``fields``, ``start``/``end`` and ``format`` query parameters and stream the result."""
+    fields_param = request.GET.get('fields')
+    if fields_param:
+        fields = [name.strip() for name in fields_param.split(',') if name.strip()]
+    else:
+        fields = export_columns(queryset.model)
+
+    start = parse_time(request, 'start')
+    end = parse_time(request, 'end')
+    if start:
+        queryset = queryset.filter(timestamp__gte=start)
+    if end:
+        queryset = queryset.filter(timestamp__lt=end)
+
+    fmt = request.GET.get('format') or ('arrow' if pa is not None else 'ndjson')
+    return export_response(queryset.order_by('timestamp'), fields, fmt, filename,
+                           asynchronous=isinstance(request, ASGIRequest))
@@ -0,0 +1,61 @@
+from django.conf import settings
+from django.utils.module_loading import import_string
+import os
+from .ticks import decode_trade, SYMBOL, EPOCH_MS, TRADE_ID
+from .bars import to_epoch_ms
+
+
+class TradeHistorySource:
+    """
+    Where recover_trade_gap() looks for trades the live stream missed.
+    Select an implementation with settings.TRADE_HISTORY_SOURCE.
+    """
+
+    def fetch(self, symbol, first_trade_id, last_trade_id, start, end):
+        """
+        Compact ticks (see ingestion/ticks.py) of ``symbol`` with trade ids in
+        first_trade_id..last_trade_id. ``start`` and ``end`` bound their trade
+        times and may be used to narrow the search.
+        """
+        raise NotImplementedError
+
+
+class NDJSONArchiveSource(TradeHistorySource):
+    """
+    Trade events archived as NDJSON under a directory (searched recursively),
+    e.g. files written by ``django_producer --record`` on another host, or
+    Binance trade events exported from elsewhere.
+    """
+
+    def __init__(self, directory=None):
+        self.directory = str(directory or settings.TRADE_ARCHIVE_DIR)
+
+    def fetch(self, symbol, first_trade_id, last_trade_id, start, end):
+        start_ms = to_epoch_ms(start)
+        ticks = {}
+        for path in self.files():
+            # A file last written before the gap began cannot hold its trades
+            if os.path.getmtime(path) * 1000 < start_ms:
+                continue
+            with open(path) as f:
+                for line in f:
+                    if symbol not in line:
+                        continue
+                    try:
+                        tick = decode_trade(line)
+                    except (ValueError, KeyError, TypeError):
+                        continue
+                    if (tick is not None and tick[SYMBOL] == symbol
+                            and first_trade_id <= tick[TRADE_ID] <= last_trade_id):
+                        ticks[tick[TRADE_ID]] = tick
+        return sorted(ticks.values(), key=lambda tick: (tick[EPOCH_MS], tick[TRADE_ID]))
+
+    def files(self):
+        for root, _, names in os.walk(self.directory):
+            for name in sorted(names):
+                if name.endswith('.ndjson'):
+                    yield os.path.join(root, name)
+
+
+def get_history_source():
+    return import_string(settings.TRADE_HISTORY_SOURCE)()
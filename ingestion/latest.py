@@ -0,0 +1,115 @@
+from django.core.cache import cache
+from django.db import connection
+from .realtime import serialize_rows
+
+LATEST_KEY = 'latest:{kind}:{key}'
+# Redis set of the symbols that have ticks, kept up to date by ingestion
+SYMBOLS_KEY = 'stats:symbols'
+
+
+def latest_key(kind, *parts):
+    return LATEST_KEY.format(kind=kind, key=':'.join(parts))
+
+
+def cache_latest(kind, parts, rows):
+    """
+    Write-through of the newest row for one bars/spread/stats series, stored
+    JSON-ready so read views can return it without touching the database.
+    Range rebuilds may write older rows after newer ones, so the cached row
+    only moves forward in time.
+    """
+    if not rows:
+        return
+    row = serialize_rows([max(rows, key=lambda r: r['timestamp'])])[0]
+    key = latest_key(kind, *parts)
+    current = cache.get(key)
+    if current is None or current['timestamp'] <= row['timestamp']:
+        cache.set(key, row, None)
+
+
+def get_latest(kind, *parts):
+    return cache.get(latest_key(kind, *parts))
+
+
+def wants_latest(request):
+    """True for the plain "newest row" query that dashboards poll."""
+    params = request.GET
+    return (
+        params.get('limit') == '1'
+        and not any(params.get(name) for name in ('start', 'end', 'cursor'))
+        and params.get('order', 'desc') == 'desc'
+    )
+
+
+def _symbol_set():
+    """Redis client and key of the symbol set, or (None, None) on other cache backends."""
+    client = getattr(cache, '_cache', None)
+    if not hasattr(client, 'get_client'):
+        return None, None
+    key = cache.make_and_validate_key(SYMBOLS_KEY)
+    return client.get_client(key, write=True), key
+
+
+def stored_symbols():
+    from .models import RawTick
+    # Clear Meta.ordering, or the DISTINCT would also cover the timestamp
+    return set(RawTick.objects.order_by().values_list('symbol', flat=True).distinct())
+
+
+def add_symbols(symbols):
+    """
+    Add freshly ingested symbols to the symbol set. The first call after the
+    set was lost seeds it with every symbol raw_ticks holds.
+    """
+    symbols = set(symbols)
+    if not symbols:
+        return
+    client, key = _symbol_set()
+    if client is not None:
+        if not client.exists(key):
+            symbols |= stored_symbols()
+        client.sadd(key, *symbols)
+        return
+    known = cache.get(SYMBOLS_KEY)
+    if known is None or not symbols <= set(known):
+        known = stored_symbols() if known is None else set(known)
+        cache.set(SYMBOLS_KEY, sorted(known | symbols), None)
+
+
+def remove_symbols(symbols):
+    symbols = set(symbols)
+    if not symbols:
+        return
+    client, key = _symbol_set()
+    if client is not None:
+        client.srem(key, *symbols)
+    else:
+        cache.set(SYMBOLS_KEY, sorted(set(cache.get(SYMBOLS_KEY) or []) - symbols), None)
+
+
+def known_symbols():
+    client, key = _symbol_set()
+    if client is not None:
+        return sorted(member.decode() for member in client.smembers(key))
+    return list(cache.get(SYMBOLS_KEY) or [])
+
+
+def estimated_count(model):
+    """
+    Row count from the planner statistics (pg_class.reltuples, refreshed by
+    autovacuum/ANALYZE) instead of a COUNT(*) scan. For a partitioned table
+    the partitions' estimates are summed. Falls back to COUNT(*) on other
+    backends or for tables that have never been analyzed.
+    """
+    if connection.vendor == 'postgresql':
+        table = model._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT SUM(reltuples)::bigint FROM pg_class WHERE reltuples >= 0 AND ("
+                "oid = %s::regclass OR oid IN (SELECT inhrelid FROM pg_inherits WHERE inhparent = %s::regclass))",
+                [table, table]
+            )
+            row = cursor.fetchone()
+        if row and row[0] is not None:
+            return row[0]
+    return model.objects.count()
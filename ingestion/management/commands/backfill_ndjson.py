@@ -0,0 +1,83 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+import os
+import time
+from ingestion.backfill import backfill_shard, merge_ranges, iter_rebuild_windows, BACKFILL_BATCH_SIZE
+from ingestion.ndjson import shard_offsets
+from ingestion.latest import add_symbols
+from ingestion.tasks import process_ticks_to_bars, rollup_bars
+from ingestion.bars import TIMEFRAME_SECONDS, ROLLUP_SOURCE
+
+class Command(BaseCommand):
+    help = 'Backfill raw ticks from NDJSON files in parallel, then build bars for the backfilled range'
+
+    def add_arguments(self, parser):
+        parser.add_argument('files', nargs='+', help='NDJSON files to backfill')
+        parser.add_argument('--workers', type=int, default=os.cpu_count(), help='Parser processes')
+        parser.add_argument('--shards-per-file', type=int, default=None, help='Byte-range shards per file (default: workers)')
+        parser.add_argument('--batch-size', type=int, default=BACKFILL_BATCH_SIZE, help='Ticks per insert batch')
+        parser.add_argument('--timeframes', type=str, default='1s,1m,5m', help='Comma-separated timeframes to build')
+        parser.add_argument('--skip-bars', action='store_true', help='Only load ticks, do not build bars')
+
+    def handle(self, *args, **options):
+        workers = options['workers']
+        shards_per_file = options['shards_per_file'] or workers
+        batch_size = options['batch_size']
+
+        jobs = []
+        for path in options['files']:
+            if not os.path.exists(path):
+                raise CommandError(f'File not found: {path}')
+            for start, end in shard_offsets(path, shards_per_file):
+                jobs.append((path, start, end))
+
+        self.stdout.write(f'Backfilling {len(options["files"])} file(s) as {len(jobs)} shards on {workers} workers...')
+
+        # Forked workers must open their own database connections
+        connections.close_all()
+        started = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(backfill_shard, path, start, end, batch_size) for path, start, end in jobs]
+            results = [future.result() for future in futures]
+        elapsed = time.perf_counter() - started
+
+        lines = sum(r['progress']['lines_parsed'] for r in results)
+        errors = sum(r['progress']['parse_errors'] for r in results)
+        inserted = sum(r['inserted'] for r in results)
+        self.stdout.write(self.style.SUCCESS(
+            f'Parsed {lines} lines ({errors} errors), inserted {inserted} ticks '
+            f'in {elapsed:.1f}s ({lines / max(elapsed, 1e-9):,.0f} lines/sec)'
+        ))
+
+        if options['skip_bars']:
+            return
+
+        # Only 1s bars are built from ticks; higher timeframes roll up from the
+        # next finer one, so every step of the chain below a requested timeframe is built
+        timeframes = set()
+        for timeframe in options['timeframes'].split(','):
+            timeframe = timeframe.strip()
+            while timeframe:
+                if timeframe not in TIMEFRAME_SECONDS:
+                    raise CommandError(f'Unknown timeframe: {timeframe}')
+                timeframes.add(timeframe)
+                timeframe = ROLLUP_SOURCE.get(timeframe)
+        rollups = sorted(timeframes - {'1s'}, key=TIMEFRAME_SECONDS.get)
+
+        ranges = merge_ranges(results)
+        add_symbols(ranges)
+        for symbol, (low, high) in sorted(ranges.items()):
+            bar_count = 0
+            for start, end in iter_rebuild_windows(low, high, '1s'):
+                bar_count += process_ticks_to_bars(
+                    symbol, '1s', start=start.isoformat(), end=end.isoformat(), rollup=False
+                )
+            self.stdout.write(f'{symbol} 1s: built {bar_count} bars from {low} to {high}')
+
+            if rollups:
+                end = high + timedelta(seconds=1)
+                counts = rollup_bars(symbol, rollups, start=low.isoformat(), end=end.isoformat())
+                for timeframe in rollups:
+                    self.stdout.write(f'{symbol} {timeframe}: rolled up {counts[timeframe]} bars')
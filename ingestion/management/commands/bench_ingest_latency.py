@@ -0,0 +1,109 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from datetime import datetime, timedelta, timezone as dt_timezone
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+from config.celery import BACKFILL_QUEUE
+from ingestion.models import RawTick, ProcessedBar
+from ingestion.tasks import ingest_tick_batch, process_ndjson_file
+
+class Command(BaseCommand):
+    help = (
+        'Measure live ingest latency (dispatch to task completion) on its own and '
+        'while an NDJSON backfill runs. Needs running workers on the same host clock.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--duration', type=int, default=20, help='Seconds of live traffic per phase')
+        parser.add_argument('--rate', type=float, default=10, help='Live batches dispatched per second')
+        parser.add_argument('--batch-size', type=int, default=100, help='Ticks per live batch')
+        parser.add_argument('--backfill-lines', type=int, default=500000, help='Ticks in the synthetic backfill file')
+        parser.add_argument('--backfill-queue', type=str, default=BACKFILL_QUEUE,
+                            help='Queue the backfill batches go to; pass "ingest" to see the shared-queue behaviour')
+        parser.add_argument('--symbol', type=str, default='BENCHUSDT', help='Throwaway symbol for live ticks')
+        parser.add_argument('--backfill-symbol', type=str, default='BENCHBFUSDT', help='Throwaway symbol for backfill ticks')
+
+    def handle(self, *args, **options):
+        symbols = [options['symbol'], options['backfill_symbol']]
+        self.cleanup(symbols)
+        self.trade_id = int(time.time() * 1000)
+
+        baseline = self.run_phase(options)
+        self.report('live only', baseline)
+
+        path = self.write_backfill(options['backfill_symbol'], options['backfill_lines'])
+        try:
+            backfill = process_ndjson_file.apply_async((path,), {'queue': options['backfill_queue']})
+            self.stdout.write(f"Started backfill of {options['backfill_lines']} ticks on queue '{options['backfill_queue']}'")
+            loaded = self.run_phase(options)
+            self.report('during backfill', loaded)
+            self.stdout.write(
+                f'Backfill dispatch state: {backfill.state}; its batches keep draining in the background. '
+                f'Remove {path} once they have'
+            )
+        finally:
+            self.cleanup([options['symbol']])
+
+    def run_phase(self, options):
+        sent = []
+        interval = 1 / options['rate']
+        deadline = time.monotonic() + options['duration']
+        next_send = time.monotonic()
+        while time.monotonic() < deadline:
+            batch = self.live_batch(options['symbol'], options['batch_size'])
+            sent.append((time.time(), ingest_tick_batch.delay(batch)))
+            next_send += interval
+            time.sleep(max(0, next_send - time.monotonic()))
+
+        latencies = []
+        for sent_at, result in sent:
+            result.get(timeout=300)
+            # Eager results carry no completion time; the collection time bounds it
+            done = result.date_done.timestamp() if result.date_done else time.time()
+            latencies.append(done - sent_at)
+        return latencies
+
+    def live_batch(self, symbol, size):
+        now = datetime.now(dt_timezone.utc)
+        batch = []
+        for _ in range(size):
+            self.trade_id += 1
+            batch.append({
+                'symbol': symbol,
+                'ts': now.isoformat(),
+                'price': 100 + random.uniform(-1, 1),
+                'size': random.uniform(0, 2),
+                'trade_id': self.trade_id
+            })
+        return batch
+
+    def write_backfill(self, symbol, lines):
+        os.makedirs(settings.MEDIA_ROOT, exist_ok=True)
+        start = datetime.now(dt_timezone.utc) - timedelta(days=1)
+        fd, path = tempfile.mkstemp(prefix='bench-backfill-', suffix='.ndjson', dir=settings.MEDIA_ROOT)
+        with os.fdopen(fd, 'w') as f:
+            for i in range(lines):
+                f.write(json.dumps({
+                    'symbol': symbol,
+                    'ts': (start + timedelta(milliseconds=i * 10)).isoformat(),
+                    'price': 100 + random.uniform(-1, 1),
+                    'size': random.uniform(0, 2),
+                    'trade_id': i
+                }) + '\n')
+        return path
+
+    def report(self, label, latencies):
+        latencies = sorted(latencies)
+        ms = lambda q: latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000
+        self.stdout.write(
+            f'{label:>16}: {len(latencies)} batches, p50 {ms(0.5):.1f}ms, p95 {ms(0.95):.1f}ms, '
+            f'p99 {ms(0.99):.1f}ms, max {latencies[-1] * 1000:.1f}ms, mean {statistics.mean(latencies) * 1000:.1f}ms'
+        )
+
+    def cleanup(self, symbols):
+        RawTick.objects.filter(symbol__in=symbols).delete()
+        ProcessedBar.objects.filter(symbol__in=symbols).delete()
@@ -0,0 +1,120 @@
+from django.core.management.base import BaseCommand, CommandError
+from channels.layers import get_channel_layer
+import asyncio
+import random
+import statistics
+import time
+from config.celery import INGEST_QUEUE
+from ingestion.bars import from_epoch_seconds
+from ingestion.batcher import TickBatcher, broker_queue_depth
+from ingestion.models import RawTick, ProcessedBar
+from ingestion.pipeline import TickPipeline
+from ingestion.realtime import group_name
+from ingestion.tasks import ingest_tick_batch
+
+class Command(BaseCommand):
+    help = (
+        'Measure tick-to-bar latency of the Celery path and the in-process pipeline. A tick '
+        'counts as delivered when a published 1s bar for its second includes it. The Celery '
+        'mode needs running ingest workers and a shared (Redis) channel layer.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--mode', choices=['both', 'celery', 'pipeline'], default='both')
+        parser.add_argument('--duration', type=int, default=20, help='Seconds of synthetic ticks per mode')
+        parser.add_argument('--rate', type=int, default=500, help='Ticks per second')
+        parser.add_argument('--batch-size', type=int, default=100, help='Producer batch size')
+        parser.add_argument('--max-latency-ms', type=int, default=250, help='Producer flush latency')
+        parser.add_argument('--symbol', type=str, default='BENCHUSDT', help='Throwaway symbol for benchmark ticks')
+
+    def handle(self, *args, **options):
+        if get_channel_layer() is None:
+            raise CommandError('A channel layer is required to observe published bars')
+        modes = ['celery', 'pipeline'] if options['mode'] == 'both' else [options['mode']]
+        try:
+            for mode in modes:
+                self.cleanup(options['symbol'])
+                latencies, missing = asyncio.run(self.run_mode(mode, options))
+                self.report(mode, latencies, missing)
+        finally:
+            self.cleanup(options['symbol'])
+
+    async def run_mode(self, mode, options):
+        symbol = options['symbol']
+        layer = get_channel_layer()
+        channel = await layer.new_channel()
+        group = group_name('bars', symbol, '1s')
+        await layer.group_add(group, channel)
+
+        pipeline = TickPipeline() if mode == 'pipeline' else None
+        batcher = TickBatcher(
+            pipeline.submit if pipeline else ingest_tick_batch.delay, INGEST_QUEUE,
+            batch_size=options['batch_size'],
+            max_latency=options['max_latency_ms'] / 1000,
+            depth=pipeline.depth if pipeline else broker_queue_depth
+        )
+        background = [asyncio.create_task(batcher.run())]
+        if pipeline:
+            background.append(asyncio.create_task(pipeline.run()))
+
+        # Send times per bar second, in tick order; a bar with tick_count n
+        # delivers the first n ticks of its second
+        sent = {}
+        delivered = {}
+        latencies = []
+
+        async def receive():
+            while True:
+                message = await layer.receive(channel)
+                received = time.time()
+                for row in message['rows']:
+                    times = sent.get(row['timestamp'], [])
+                    done = delivered.get(row['timestamp'], 0)
+                    for sent_at in times[done:row['tick_count']]:
+                        latencies.append(received - sent_at)
+                    delivered[row['timestamp']] = max(done, min(row['tick_count'], len(times)))
+
+        receiver = asyncio.create_task(receive())
+        trade_id = int(time.time() * 1000)
+        interval = 1 / options['rate']
+        deadline = time.monotonic() + options['duration']
+        next_send = time.monotonic()
+        while time.monotonic() < deadline:
+            sent_at = time.time()
+            epoch_ms = int(sent_at * 1000)
+            trade_id += 1
+            sent.setdefault(from_epoch_seconds(epoch_ms // 1000).isoformat(), []).append(sent_at)
+            await batcher.add((
+                symbol, epoch_ms, f'{100 + random.uniform(-1, 1):.8f}', f'{random.uniform(0, 2):.8f}', trade_id
+            ))
+            next_send += interval
+            await asyncio.sleep(max(0, next_send - time.monotonic()))
+
+        # Give the last batches time to come through
+        total = sum(len(times) for times in sent.values())
+        settle = time.monotonic() + 30
+        while len(latencies) < total and time.monotonic() < settle:
+            await asyncio.sleep(0.1)
+
+        receiver.cancel()
+        for task in background:
+            task.cancel()
+        await asyncio.gather(receiver, *background, return_exceptions=True)
+        await layer.group_discard(group, channel)
+        return latencies, total - len(latencies)
+
+    def report(self, mode, latencies, missing):
+        if not latencies:
+            self.stdout.write(f'{mode:>9}: no bars observed ({missing} ticks sent)')
+            return
+        latencies = sorted(latencies)
+        ms = lambda q: latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000
+        self.stdout.write(
+            f'{mode:>9}: {len(latencies)} ticks, p50 {ms(0.5):.1f}ms, p95 {ms(0.95):.1f}ms, '
+            f'p99 {ms(0.99):.1f}ms, max {latencies[-1] * 1000:.1f}ms, '
+            f'mean {statistics.mean(latencies) * 1000:.1f}ms, {missing} not observed'
+        )
+
+    def cleanup(self, symbol):
+        RawTick.objects.filter(symbol=symbol).delete()
+        ProcessedBar.objects.filter(symbol=symbol).delete()
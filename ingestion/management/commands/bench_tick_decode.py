@@ -0,0 +1,113 @@
+from django.core.management.base import BaseCommand
+from datetime import datetime
+from decimal import Decimal
+import json
+import random
+import time
+from ingestion import ticks
+from ingestion.tasks import parse_ticks
+
+class Command(BaseCommand):
+    help = (
+        'Single-core microbenchmark of trade message handling: decoding in the producer, then '
+        'turning the batch into raw_ticks rows in the worker. Compares the former ISO-string/float '
+        'tick dicts with compact ticks, using the stdlib json and (if installed) orjson.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--messages', type=int, default=200000, help='Synthetic trade messages to decode')
+        parser.add_argument('--repeat', type=int, default=3, help='Runs per path; the fastest is reported')
+
+    def handle(self, *args, **options):
+        messages = self.make_messages(options['messages'])
+        # (label, decoder, row conversion, JSON module used by ingestion.ticks)
+        paths = [
+            ('dict (json, iso, float)', self.legacy_decode, self.legacy_rows, None),
+            ('compact (json)', self.compact_decode, self.compact_rows, None),
+        ]
+        installed = ticks.orjson
+        if installed is not None:
+            paths.append(('compact (orjson)', self.compact_decode, self.compact_rows, installed))
+
+        results = []
+        try:
+            for label, decode, to_rows, decoder in paths:
+                ticks.orjson = decoder
+                decode_s = self.fastest(lambda: decode(messages), options['repeat'])
+                decoded = decode(messages)
+                rows_s = self.fastest(lambda: to_rows(decoded), options['repeat'])
+                results.append((label, decode_s, rows_s))
+        finally:
+            ticks.orjson = installed
+
+        count = len(messages)
+        for label, decode_s, rows_s in results:
+            self.stdout.write(
+                f'{label:>24}: decode {count / decode_s:>11,.0f} msg/s, to rows {count / rows_s:>11,.0f} msg/s, '
+                f'end to end {count / (decode_s + rows_s):>11,.0f} msg/s'
+            )
+        if installed is None:
+            self.stdout.write('orjson is not installed; pip install orjson to compare it')
+
+        changed = sum(
+            1 for message in messages
+            for value in (json.loads(message)['p'], json.loads(message)['q'])
+            if Decimal(str(float(value))) != Decimal(value)
+        )
+        self.stdout.write(f'Prices/sizes altered by the float round trip: {changed} of {count * 2}')
+
+    def make_messages(self, count):
+        trade_time = int(time.time() * 1000)
+        price = 43000.0
+        messages = []
+        for i in range(count):
+            trade_time += random.randint(0, 5)
+            price += random.uniform(-1, 1)
+            messages.append(json.dumps({
+                'e': 'trade', 'E': trade_time + 3, 'T': trade_time, 's': 'BTCUSDT', 't': 1000000 + i,
+                'p': f'{price:.8f}', 'q': f'{random.uniform(0, 3):.8f}', 'X': 'MARKET', 'm': random.random() < 0.5
+            }))
+        return messages
+
+    def fastest(self, run, repeat):
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            run()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return best
+
+    def legacy_decode(self, messages):
+        decoded = []
+        for message in messages:
+            data = json.loads(message)
+            if data.get('e') == 'trade':
+                decoded.append({
+                    'symbol': data['s'],
+                    'ts': datetime.fromtimestamp(data['T'] / 1000).isoformat() + 'Z',
+                    'price': float(data['p']),
+                    'size': float(data['q']),
+                    'trade_id': data['t']
+                })
+        return decoded
+
+    def legacy_rows(self, decoded):
+        return [
+            (symbol, ts, Decimal(str(price)), Decimal(str(size)), trade_id)
+            for symbol, ts, price, size, trade_id in parse_ticks(decoded)
+        ]
+
+    def compact_decode(self, messages):
+        decoded = []
+        for message in messages:
+            tick = ticks.decode_trade(message)
+            if tick is not None:
+                decoded.append(tick)
+        return decoded
+
+    def compact_rows(self, decoded):
+        return [
+            (symbol, ts, Decimal(price), Decimal(size), trade_id)
+            for symbol, ts, price, size, trade_id in parse_ticks(decoded)
+        ]
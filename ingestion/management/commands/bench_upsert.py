@@ -0,0 +1,74 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from datetime import timedelta
+from decimal import Decimal
+import random
+import time
+from ingestion.models import ProcessedBar
+from ingestion.tasks import save_bars
+
+class Command(BaseCommand):
+    help = 'Benchmark per-row update_or_create against the bulk upsert path for ProcessedBar'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000, help='Number of bars to write')
+        parser.add_argument('--symbol', type=str, default='BENCHUSDT', help='Throwaway symbol for benchmark rows')
+
+    def handle(self, *args, **options):
+        rows = options['rows']
+        symbol = options['symbol']
+        bars = self.make_bars(rows)
+
+        ProcessedBar.objects.filter(symbol=symbol).delete()
+        try:
+            # Each path runs twice: once inserting into an empty range, once updating it
+            for label, writer in [('update_or_create', self.write_per_row), ('bulk_upsert', self.write_bulk)]:
+                for phase in ('insert', 'update'):
+                    start = time.perf_counter()
+                    writer(symbol, bars)
+                    elapsed = time.perf_counter() - start
+                    self.stdout.write(
+                        f'{label:>16} {phase:>6}: {rows} rows in {elapsed:.3f}s '
+                        f'({rows / elapsed:,.0f} rows/sec)'
+                    )
+                ProcessedBar.objects.filter(symbol=symbol).delete()
+        finally:
+            ProcessedBar.objects.filter(symbol=symbol).delete()
+
+    def make_bars(self, rows):
+        start = timezone.now().replace(microsecond=0) - timedelta(seconds=rows)
+        bars = []
+        price = 100.0
+        for i in range(rows):
+            price += random.uniform(-0.5, 0.5)
+            bars.append({
+                'timestamp': start + timedelta(seconds=i),
+                'open': price,
+                'high': price + 0.25,
+                'low': price - 0.25,
+                'close': price + 0.1,
+                'volume': random.uniform(0, 10),
+                'tick_count': random.randint(1, 50)
+            })
+        return bars
+
+    def write_per_row(self, symbol, bars):
+        with transaction.atomic():
+            for bar in bars:
+                ProcessedBar.objects.update_or_create(
+                    symbol=symbol,
+                    timeframe='1s',
+                    timestamp=bar['timestamp'],
+                    defaults={
+                        'open': Decimal(str(bar['open'])),
+                        'high': Decimal(str(bar['high'])),
+                        'low': Decimal(str(bar['low'])),
+                        'close': Decimal(str(bar['close'])),
+                        'volume': Decimal(str(bar['volume'])),
+                        'tick_count': bar['tick_count']
+                    }
+                )
+
+    def write_bulk(self, symbol, bars):
+        save_bars(symbol, '1s', bars)
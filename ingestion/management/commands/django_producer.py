@@ -1,57 +1,105 @@
 from django.core.management.base import BaseCommand
 import asyncio
-import websockets
-import json
-from datetime import datetime
-from ingestion.tasks import ingest_tick_batch
+from config.celery import INGEST_QUEUE
+from ingestion.batcher import TickBatcher, broker_queue_depth, MAX_BATCH_SIZE, MAX_LATENCY_SECONDS
+from ingestion.pipeline import TickPipeline
+from ingestion.streams import StreamConsumer, shard_symbols, STREAM_URL
+from ingestion.ticks import SYMBOL, EPOCH_MS, TRADE_ID
+from ingestion.tasks import ingest_tick_batch, log_trade_gap
 
 class Command(BaseCommand):
-    help = 'Connect to Binance WebSocket and ingest ticks via Celery'
+    help = 'Connect to Binance combined trade streams and ingest ticks via Celery or the in-process pipeline'
 
     def add_arguments(self, parser):
         parser.add_argument('--symbols', type=str, default='btcusdt,ethusdt', help='Comma-separated symbols')
         parser.add_argument('--batch-size', type=int, default=100, help='Batch size for ingestion')
+        parser.add_argument('--max-batch-size', type=int, default=MAX_BATCH_SIZE,
+                            help='Largest batch the size target grows to while the ingest queue is backed up')
+        parser.add_argument('--max-latency-ms', type=int, default=int(MAX_LATENCY_SECONDS * 1000),
+                            help='Dispatch a partial batch once its oldest tick has waited this long')
+        parser.add_argument('--mode', choices=['celery', 'pipeline'], default='celery',
+                            help='celery: dispatch batches to ingest_tick_batch workers; '
+                                 'pipeline: write ticks and build bars in this process')
+        parser.add_argument('--connections', type=int, default=1,
+                            help='WebSocket connections to spread the symbols over (more are opened past 200 symbols each)')
+        parser.add_argument('--stream-url', type=str, default=STREAM_URL,
+                            help='Combined-stream endpoint, e.g. ws://127.0.0.1:9443 for replay_trades')
+        parser.add_argument('--stats-every', type=int, default=30, help='Seconds between per-connection stats lines')
+        parser.add_argument('--record', type=str, default=None,
+                            help='Append every raw stream message to this NDJSON file (replayable with replay_trades)')
 
     def handle(self, *args, **options):
         symbols = options['symbols'].split(',')
-        batch_size = options['batch_size']
+        if options['mode'] == 'pipeline':
+            self.pipeline = TickPipeline()
+            dispatch, depth = self.submit, self.pipeline.depth
+        else:
+            self.pipeline = None
+            dispatch, depth = self.dispatch, broker_queue_depth
+        batcher = TickBatcher(
+            dispatch, INGEST_QUEUE,
+            batch_size=options['batch_size'],
+            max_batch_size=options['max_batch_size'],
+            max_latency=options['max_latency_ms'] / 1000,
+            depth=depth
+        )
+        self.batcher = batcher
+        self.options = options
         
-        self.stdout.write(f'Starting producer for symbols: {symbols}')
-        asyncio.run(self.start_producer(symbols, batch_size))
+        self.stdout.write(f"Starting producer for symbols: {symbols} ({options['mode']} mode)")
+        asyncio.run(self.start_producer(symbols, batcher))
 
-    async def start_producer(self, symbols, batch_size):
-        tasks = [self.consume_symbol(symbol, batch_size) for symbol in symbols]
-        await asyncio.gather(*tasks)
+    async def start_producer(self, symbols, batcher):
+        record = open(self.options['record'], 'a') if self.options['record'] else None
+        try:
+            consumers = [
+                StreamConsumer(f'conn-{i}', shard, batcher.add, self.options['stream_url'], record, self.log_gap)
+                for i, shard in enumerate(shard_symbols(symbols, self.options['connections']))
+            ]
+            self.stdout.write(f'Streaming {len(symbols)} symbols over {len(consumers)} connections')
+            tasks = [consumer.run() for consumer in consumers]
+            tasks.append(self.report_streams(consumers))
+            if self.pipeline is not None:
+                tasks.append(self.pipeline.run())
+            await asyncio.gather(batcher.run(), *tasks)
+        finally:
+            if record is not None:
+                record.close()
 
-    async def consume_symbol(self, symbol, batch_size):
-        symbol = symbol.strip().lower()
-        url = f'wss://fstream.binance.com/ws/{symbol}@trade'
-        
-        batch = []
-        
-        async for websocket in websockets.connect(url):
-            try:
-                self.stdout.write(f'Connected to {symbol}')
-                async for message in websocket:
-                    data = json.loads(message)
-                    
-                    if data.get('e') == 'trade':
-                        tick = {
-                            'symbol': data['s'],
-                            'ts': datetime.fromtimestamp(data['T'] / 1000).isoformat() + 'Z',
-                            'price': float(data['p']),
-                            'size': float(data['q'])
-                        }
-                        batch.append(tick)
-                        
-                        if len(batch) >= batch_size:
-                            ingest_tick_batch.delay(batch.copy())
-                            self.stdout.write(f'Dispatched batch of {len(batch)} ticks for {symbol}')
-                            batch.clear()
-                            
-            except websockets.ConnectionClosed:
-                self.stdout.write(f'Connection closed for {symbol}, reconnecting...')
-                await asyncio.sleep(1)
-            except Exception as e:
-                self.stdout.write(f'Error for {symbol}: {e}')
-                await asyncio.sleep(1)
\ No newline at end of file
+    async def report_streams(self, consumers):
+        while True:
+            await asyncio.sleep(self.options['stats_every'])
+            for consumer in consumers:
+                stats = consumer.stats.snapshot()
+                self.stdout.write(
+                    f"{consumer.name}: {stats['messages_per_sec']:.1f} msg/s, {stats['ticks']} ticks, "
+                    f"{stats['gaps']} gaps ({stats['missing_trades']} trades missed), "
+                    f"longest silence {stats['longest_silence']:.1f}s, {stats['disconnects']} reconnects"
+                )
+
+    async def log_gap(self, tick, last_trade_id, last_epoch_ms):
+        # Gaps are logged and recovered by Celery workers in both modes
+        if last_trade_id is not None:
+            self.stdout.write(f"{tick[SYMBOL]}: {tick[TRADE_ID] - last_trade_id - 1} trades missed, logging gap")
+        loop = asyncio.get_running_loop()
+        try:
+            await loop.run_in_executor(None, lambda: log_trade_gap.delay(
+                tick[SYMBOL], tick[TRADE_ID], tick[EPOCH_MS], last_trade_id, last_epoch_ms
+            ))
+        except Exception as e:
+            self.stdout.write(f"Could not log trade gap for {tick[SYMBOL]}: {e}")
+
+    def dispatch(self, batch):
+        ingest_tick_batch.delay(batch)
+        self.report(batch)
+
+    async def submit(self, batch):
+        await self.pipeline.submit(batch)
+        self.report(batch)
+
+    def report(self, batch):
+        stats = self.batcher.stats()
+        self.stdout.write(
+            f"Dispatched batch of {len(batch)} ticks across {len({tick[SYMBOL] for tick in batch})} symbols "
+            f"(batch size {stats['batch_size']}, queue depth {stats['queue_depth']})"
+        )
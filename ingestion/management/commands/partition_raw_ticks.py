@@ -0,0 +1,202 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+import re
+import time
+from ingestion.models import RawTick
+from ingestion.partitions import (
+    PARTITION_KEY, is_partitioned, ensure_partitions, premake_partitions, drop_expired_partitions
+)
+
+class Command(BaseCommand):
+    help = (
+        'Convert raw_ticks into a table range-partitioned by day. Rows are copied in '
+        'batches while the old table stays live; only the final catch-up and rename '
+        'run under a table lock. Safe to re-run: an interrupted copy resumes.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50000, help='Rows copied per transaction')
+        parser.add_argument('--days-ahead', type=int, default=settings.RAW_TICK_PARTITION_DAYS_AHEAD,
+                            help='Daily partitions to create past today')
+        parser.add_argument('--lock-timeout', type=int, default=5,
+                            help='Seconds to wait for a table lock (before the copy and for the swap) before giving up')
+        parser.add_argument('--drop-old', action='store_true', help='Drop the unpartitioned table after the swap')
+        parser.add_argument('--apply-retention', action='store_true',
+                            help='Drop partitions older than RAW_TICK_RETENTION_DAYS once partitioned')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('Partitioning requires PostgreSQL')
+
+        table = RawTick._meta.db_table
+        new_table = f'{table}_partitioned'
+        old_table = f'{table}_old'
+
+        if is_partitioned(table, refresh=True):
+            self.stdout.write(f'{table} is already partitioned')
+        else:
+            if self.relation_exists(old_table):
+                raise CommandError(f'{old_table} already exists; drop or rename it first')
+
+            if self.relation_exists(new_table):
+                self.stdout.write(f'Resuming copy into existing {new_table}')
+                renames = self.pending_renames(table, new_table)
+            else:
+                renames = self.create_parent(table, new_table)
+
+            last_id = self.copy_rows(table, new_table, options['batch_size'], options['days_ahead'], options['lock_timeout'])
+            self.swap(table, new_table, old_table, renames, last_id, options['lock_timeout'])
+            is_partitioned(table, refresh=True)
+            self.stdout.write(self.style.SUCCESS(f'{table} is now partitioned by day; previous table kept as {old_table}'))
+
+            if options['drop_old']:
+                with connection.cursor() as cursor:
+                    cursor.execute(f'DROP TABLE {old_table}')
+                self.stdout.write(f'Dropped {old_table}')
+
+        created = premake_partitions(table, options['days_ahead'])
+        self.stdout.write(f'Created {len(created)} partitions ahead of time')
+
+        if options['apply_retention']:
+            dropped = drop_expired_partitions(table)
+            self.stdout.write(f"Dropped {len(dropped)} expired partitions: {', '.join(dropped) or 'none'}")
+
+    def relation_exists(self, name):
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT to_regclass(%s)', [name])
+            return cursor.fetchone()[0] is not None
+
+    def create_parent(self, table, new_table):
+        """
+        Create the partitioned parent with the same columns, constraints and
+        indexes as ``table``. Unique constraints and the primary key gain the
+        partition key, which PostgreSQL requires. Objects are created with a
+        ``_p`` suffix and take over the original names at swap time.
+        """
+        renames = []
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                f'CREATE TABLE {new_table} (LIKE {table} INCLUDING DEFAULTS) '
+                f'PARTITION BY RANGE ({PARTITION_KEY})'
+            )
+            # LIKE does not copy identity columns, so ids come from a sequence
+            # that is moved past the copied ids during the swap
+            cursor.execute(f'CREATE SEQUENCE {new_table}_id_seq OWNED BY {new_table}.id')
+            cursor.execute(f"ALTER TABLE {new_table} ALTER COLUMN id SET DEFAULT nextval('{new_table}_id_seq')")
+
+            cursor.execute(
+                "SELECT conname, contype, array(SELECT attname FROM unnest(conkey) k "
+                "JOIN pg_attribute a ON a.attrelid = conrelid AND a.attnum = k) "
+                "FROM pg_constraint WHERE conrelid = %s::regclass AND contype IN ('p', 'u')",
+                [table]
+            )
+            for name, kind, columns in cursor.fetchall():
+                if PARTITION_KEY not in columns:
+                    columns.append(PARTITION_KEY)
+                constraint = 'PRIMARY KEY' if kind == 'p' else 'UNIQUE'
+                cursor.execute(
+                    f'ALTER TABLE {new_table} ADD CONSTRAINT {name}_p '
+                    f"{constraint} ({', '.join(connection.ops.quote_name(c) for c in columns)})"
+                )
+                renames.append(name)
+
+            cursor.execute(
+                "SELECT c.relname, pg_get_indexdef(i.indexrelid) FROM pg_index i "
+                "JOIN pg_class c ON c.oid = i.indexrelid "
+                "WHERE i.indrelid = %s::regclass "
+                "AND NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conindid = i.indexrelid)",
+                [table]
+            )
+            for name, definition in cursor.fetchall():
+                definition = re.sub(r'^CREATE (UNIQUE )?INDEX \S+ ON (ONLY )?\S+ ',
+                                    rf'CREATE \1INDEX {name}_p ON {new_table} ', definition)
+                cursor.execute(definition)
+                renames.append(name)
+
+        self.stdout.write(f'Created {new_table} with {len(renames)} constraints and indexes')
+        return renames
+
+    def pending_renames(self, table, new_table):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT c.relname FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+                "WHERE i.indrelid = %s::regclass",
+                [new_table]
+            )
+            return [name[:-2] for (name,) in cursor.fetchall() if name.endswith('_p')]
+
+    def copy_rows(self, table, new_table, batch_size, days_ahead, lock_timeout):
+        with transaction.atomic(), connection.cursor() as cursor:
+            # Ids are handed out when a row is inserted, not when it commits, so
+            # a row below max(id) can still be uncommitted. Inserting holds ROW
+            # EXCLUSIVE on the table until commit; SHARE waits those inserts out,
+            # after which every id up to max(id) is committed and visible to the
+            # batches below. Writers are blocked only while this runs.
+            cursor.execute(f"SET LOCAL lock_timeout = '{int(lock_timeout)}s'")
+            cursor.execute(f'LOCK TABLE {table} IN SHARE MODE')
+            cursor.execute(f'SELECT min({PARTITION_KEY}), max({PARTITION_KEY}), max(id) FROM {table}')
+            first_ts, last_ts, max_id = cursor.fetchone()
+            cursor.execute(f'SELECT coalesce(max(id), 0) FROM {new_table}')
+            last_id = cursor.fetchone()[0]
+
+        if first_ts is not None:
+            ensure_partitions(new_table, first_ts, last_ts)
+        premake_partitions(new_table, days_ahead)
+
+        columns = ', '.join(connection.ops.quote_name(f.column) for f in RawTick._meta.concrete_fields)
+        started = time.perf_counter()
+        copied = 0
+        # Every id up to max_id is committed, so id ranges make resumable
+        # batches that never hold more than one batch's worth of locks
+        while max_id is not None and last_id < max_id:
+            upper = min(last_id + batch_size, max_id)
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute(
+                    f'INSERT INTO {new_table} ({columns}) SELECT {columns} FROM {table} '
+                    f'WHERE id > %s AND id <= %s',
+                    [last_id, upper]
+                )
+                copied += cursor.rowcount
+            last_id = upper
+            elapsed = time.perf_counter() - started
+            self.stdout.write(f'Copied {copied} rows up to id {last_id} of {max_id} ({copied / max(elapsed, 1e-9):,.0f} rows/sec)')
+
+        return last_id
+
+    def swap(self, table, new_table, old_table, renames, last_id, lock_timeout):
+        columns = ', '.join(connection.ops.quote_name(f.column) for f in RawTick._meta.concrete_fields)
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(f"SET LOCAL lock_timeout = '{int(lock_timeout)}s'")
+            cursor.execute(f'LOCK TABLE {table} IN ACCESS EXCLUSIVE MODE')
+
+            # Catch up on ticks inserted since the barrier in copy_rows(). The
+            # lock has waited out every writer, so this re-scan sees all of
+            # them; rows already copied are skipped on their unique keys
+            cursor.execute(f'SELECT min({PARTITION_KEY}), max({PARTITION_KEY}) FROM {table} WHERE id > %s', [last_id])
+            first_ts, last_ts = cursor.fetchone()
+            if first_ts is not None:
+                ensure_partitions(new_table, first_ts, last_ts)
+                cursor.execute(
+                    f'INSERT INTO {new_table} ({columns}) SELECT {columns} FROM {table} WHERE id > %s '
+                    f'ON CONFLICT DO NOTHING',
+                    [last_id]
+                )
+                self.stdout.write(f'Caught up {cursor.rowcount} rows under lock')
+
+            for name in renames:
+                cursor.execute(f'ALTER INDEX {name} RENAME TO {name}_old')
+                cursor.execute(f'ALTER INDEX {name}_p RENAME TO {name}')
+
+            cursor.execute(
+                "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+                "WHERE i.inhparent = %s::regclass",
+                [new_table]
+            )
+            for (name,) in cursor.fetchall():
+                if name.startswith(f'{new_table}_p'):
+                    cursor.execute(f'ALTER TABLE {name} RENAME TO {table}{name[len(new_table):]}')
+
+            cursor.execute(f'ALTER TABLE {table} RENAME TO {old_table}')
+            cursor.execute(f'ALTER TABLE {new_table} RENAME TO {table}')
+            cursor.execute(f"SELECT setval('{new_table}_id_seq', coalesce((SELECT max(id) FROM {table}), 0) + 1, false)")
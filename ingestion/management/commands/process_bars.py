@@ -6,7 +6,7 @@ class Command(BaseCommand):
 
     def add_arguments(self, parser):
         parser.add_argument('--symbol', type=str, default='BTCUSDT', help='Symbol to process')
-        parser.add_argument('--timeframe', type=str, default='1s', help='Timeframe (1s, 1m, 5m)')
+        parser.add_argument('--timeframe', type=str, default='1s', help='Timeframe (1s, 1m, 5m, 15m, 1h, 1d)')
         parser.add_argument('--lookback', type=int, default=10, help='Lookback minutes')
 
     def handle(self, *args, **options):
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from ingestion.models import TradeGap
+from ingestion.tasks import recover_trade_gap
+
+class Command(BaseCommand):
+    help = (
+        'Retry recovery of logged trade gaps, e.g. after more history was added to the archive. '
+        'Reopens partial and unrecoverable gaps with a fresh attempt budget.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--symbol', type=str, default=None, help='Only gaps of this symbol')
+        parser.add_argument('--status', type=str, default='open,partial,unrecoverable',
+                            help='Comma-separated statuses of the gaps to retry')
+        parser.add_argument('--sync', action='store_true', help='Recover in this process instead of on a worker')
+
+    def handle(self, *args, **options):
+        gaps = TradeGap.objects.filter(status__in=options['status'].split(','))
+        if options['symbol']:
+            gaps = gaps.filter(symbol=options['symbol'])
+        gap_ids = list(gaps.order_by('start_time').values_list('id', flat=True))
+
+        TradeGap.objects.filter(id__in=gap_ids).update(status='open', attempts=0)
+        for gap_id in gap_ids:
+            if options['sync']:
+                recover_trade_gap(gap_id)
+            else:
+                recover_trade_gap.delay(gap_id)
+
+        self.stdout.write(f"{'Recovered' if options['sync'] else 'Queued recovery of'} {len(gap_ids)} gaps")
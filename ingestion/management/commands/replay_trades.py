@@ -0,0 +1,99 @@
+from django.core.management.base import BaseCommand, CommandError
+from urllib.parse import urlsplit, parse_qs
+import asyncio
+import json
+import os
+import random
+import time
+import websockets
+from ingestion.ticks import loads
+
+class Command(BaseCommand):
+    help = (
+        'Local stand-in for the Binance combined-stream endpoint. Replays recorded trade events '
+        '(NDJSON written by django_producer --record, or plain trade events) to clients of '
+        'ws://HOST:PORT/stream?streams=a@trade/b@trade, paced by their trade times.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('file', help='NDJSON file of recorded trade events')
+        parser.add_argument('--host', type=str, default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=9443)
+        parser.add_argument('--speed', type=float, default=1.0, help='Replay speed multiplier; 0 sends as fast as possible')
+        parser.add_argument('--loop', action='store_true',
+                            help='Start over at the end, shifting trade times and ids so they keep increasing')
+        parser.add_argument('--disconnect-after', type=int, default=0,
+                            help='Close each connection after this many messages to exercise reconnects')
+        parser.add_argument('--drop-rate', type=float, default=0.0,
+                            help='Fraction of trades silently skipped to exercise gap tracking')
+
+    def handle(self, *args, **options):
+        if not os.path.exists(options['file']):
+            raise CommandError(f"File not found: {options['file']}")
+        self.options = options
+        asyncio.run(self.serve())
+
+    async def serve(self):
+        async with websockets.serve(self.handle_connection, self.options['host'], self.options['port']):
+            self.stdout.write(f"Replaying {self.options['file']} on ws://{self.options['host']}:{self.options['port']}/stream")
+            await asyncio.Future()
+
+    async def handle_connection(self, websocket, path=None):
+        # websockets 13+ exposes the path on the request, older versions pass it in
+        path = path or getattr(websocket, 'path', None) or websocket.request.path
+        url = urlsplit(path)
+        streams = parse_qs(url.query).get('streams', [''])[0].split('/')
+        symbols = {stream.split('@')[0].upper() for stream in streams if stream.endswith('@trade')}
+        if url.path != '/stream' or not symbols:
+            await websocket.close(code=1008, reason='expected /stream?streams=<symbol>@trade/...')
+            return
+
+        self.stdout.write(f"Client connected for {', '.join(sorted(symbols))}")
+        sent = 0
+        try:
+            async for event in self.events(symbols):
+                await websocket.send(json.dumps({'stream': f"{event['s'].lower()}@trade", 'data': event}))
+                sent += 1
+                if self.options['disconnect_after'] and sent >= self.options['disconnect_after']:
+                    self.stdout.write(f'Dropping client after {sent} messages')
+                    break
+        except websockets.ConnectionClosed:
+            pass
+        self.stdout.write(f'Client done after {sent} messages')
+
+    async def events(self, symbols):
+        speed = self.options['speed']
+        time_shift = 0
+        id_shift = 0
+        while True:
+            started = time.monotonic()
+            first_time = None
+            last_time = None
+            max_id = 0
+            with open(self.options['file']) as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    event = loads(line)
+                    event = event.get('data', event)
+                    if event.get('e') != 'trade' or event['s'] not in symbols:
+                        continue
+                    first_time = event['T'] if first_time is None else first_time
+                    last_time = event['T']
+                    max_id = max(max_id, event['t'])
+                    if self.options['drop_rate'] and random.random() < self.options['drop_rate']:
+                        continue
+
+                    if speed > 0:
+                        due = started + (event['T'] - first_time) / 1000 / speed
+                        await asyncio.sleep(max(0, due - time.monotonic()))
+                    else:
+                        # Yield so other connections are served too
+                        await asyncio.sleep(0)
+                    yield dict(event, T=event['T'] + time_shift, E=event.get('E', event['T']) + time_shift,
+                               t=event['t'] + id_shift)
+
+            if not self.options['loop'] or first_time is None:
+                return
+            time_shift += last_time - first_time + 1
+            id_shift += max_id + 1
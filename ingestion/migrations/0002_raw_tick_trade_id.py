@@ -0,0 +1,22 @@
+# Generated by Django 4.2.7 on 2026-10-18 20:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ingestion", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="rawtick",
+            name="trade_id",
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AlterUniqueTogether(
+            name="rawtick",
+            unique_together={("symbol", "trade_id")},
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-18 20:48
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ingestion", "0002_raw_tick_trade_id"),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name="rawtick",
+            unique_together={("symbol", "trade_id", "timestamp")},
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.7 on 2026-10-18 20:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ingestion", "0003_raw_tick_unique_with_timestamp"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="processedbar",
+            name="timeframe",
+            field=models.CharField(
+                choices=[
+                    ("1s", "1 Second"),
+                    ("1m", "1 Minute"),
+                    ("5m", "5 Minutes"),
+                    ("15m", "15 Minutes"),
+                    ("1h", "1 Hour"),
+                    ("1d", "1 Day"),
+                ],
+                max_length=3,
+            ),
+        ),
+    ]
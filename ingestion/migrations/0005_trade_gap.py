@@ -0,0 +1,61 @@
+# Generated by Django 4.2.7 on 2026-10-18 21:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ingestion", "0004_processed_bar_rollup_timeframes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TradeGap",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("symbol", models.CharField(db_index=True, max_length=20)),
+                ("first_trade_id", models.BigIntegerField()),
+                ("last_trade_id", models.BigIntegerField()),
+                ("start_time", models.DateTimeField()),
+                ("end_time", models.DateTimeField()),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("open", "Open"),
+                            ("recovered", "Recovered"),
+                            ("partial", "Partially Recovered"),
+                            ("unrecoverable", "Unrecoverable"),
+                        ],
+                        db_index=True,
+                        default="open",
+                        max_length=15,
+                    ),
+                ),
+                ("recovered_count", models.IntegerField(default=0)),
+                ("attempts", models.IntegerField(default=0)),
+                ("detected_at", models.DateTimeField(auto_now_add=True)),
+                ("recovered_at", models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                "db_table": "trade_gaps",
+                "ordering": ["-start_time"],
+                "indexes": [
+                    models.Index(
+                        fields=["symbol", "start_time"],
+                        name="trade_gaps_symbol_baa7a8_idx",
+                    )
+                ],
+                "unique_together": {("symbol", "first_trade_id")},
+            },
+        ),
+    ]
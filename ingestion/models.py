@@ -5,11 +5,14 @@ class RawTick(models.Model):
     timestamp = models.DateTimeField(db_index=True)
     price = models.DecimalField(max_digits=20, decimal_places=8)
     size = models.DecimalField(max_digits=20, decimal_places=8)
+    trade_id = models.BigIntegerField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         db_table = 'raw_ticks'
         ordering = ['-timestamp']
+        # Partitioned tables need the partition key (timestamp) in every unique constraint
+        unique_together = [['symbol', 'trade_id', 'timestamp']]
         indexes = [
             models.Index(fields=['symbol', 'timestamp']),
         ]
@@ -19,6 +22,9 @@ class ProcessedBar(models.Model):
         ('1s', '1 Second'),
         ('1m', '1 Minute'),
         ('5m', '5 Minutes'),
+        ('15m', '15 Minutes'),
+        ('1h', '1 Hour'),
+        ('1d', '1 Day'),
     ]
     
     symbol = models.CharField(max_length=20, db_index=True)
@@ -38,4 +44,40 @@ class ProcessedBar(models.Model):
         unique_together = [['symbol', 'timeframe', 'timestamp']]
         indexes = [
             models.Index(fields=['symbol', 'timeframe', 'timestamp']),
-        ]
\ No newline at end of file
+        ]
+
+class TradeGap(models.Model):
+    """
+    Trades a producer never received, found by a jump in a symbol's trade
+    ids. Ids first_trade_id..last_trade_id are missing; start_time and
+    end_time are the trade times of the ticks on either side of the gap.
+    """
+    STATUS_CHOICES = [
+        ('open', 'Open'),
+        ('recovered', 'Recovered'),
+        ('partial', 'Partially Recovered'),
+        ('unrecoverable', 'Unrecoverable'),
+    ]
+
+    symbol = models.CharField(max_length=20, db_index=True)
+    first_trade_id = models.BigIntegerField()
+    last_trade_id = models.BigIntegerField()
+    start_time = models.DateTimeField()
+    end_time = models.DateTimeField()
+    status = models.CharField(max_length=15, choices=STATUS_CHOICES, default='open', db_index=True)
+    recovered_count = models.IntegerField(default=0)
+    attempts = models.IntegerField(default=0)
+    detected_at = models.DateTimeField(auto_now_add=True)
+    recovered_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'trade_gaps'
+        ordering = ['-start_time']
+        unique_together = [['symbol', 'first_trade_id']]
+        indexes = [
+            models.Index(fields=['symbol', 'start_time']),
+        ]
+
+    @property
+    def missing_count(self):
+        return self.last_trade_id - self.first_trade_id + 1
@@ -0,0 +1,86 @@
+from datetime import datetime
+import os
+from .ticks import loads
+
+NDJSON_BATCH_SIZE = 1000
+
+
+class ParseProgress:
+    __slots__ = ('lines_parsed', 'batches_dispatched', 'parse_errors')
+
+    def __init__(self):
+        self.lines_parsed = 0
+        self.batches_dispatched = 0
+        self.parse_errors = 0
+
+    def to_dict(self):
+        return {
+            'lines_parsed': self.lines_parsed,
+            'batches_dispatched': self.batches_dispatched,
+            'parse_errors': self.parse_errors,
+        }
+
+
+def check_tick(tick):
+    """Raise KeyError, TypeError or ValueError unless ``tick`` is a tick dict parse_ticks() takes."""
+    if not isinstance(tick['symbol'], str) or not isinstance(tick['ts'], str):
+        raise TypeError('symbol and ts must be strings')
+    datetime.fromisoformat(tick['ts'].replace('Z', '+00:00'))
+    float(tick['price'])
+    float(tick['size'])
+
+
+def iter_ndjson_batches(lines, batch_size=NDJSON_BATCH_SIZE, progress=None):
+    """
+    Parse NDJSON lines lazily and yield lists of at most ``batch_size`` ticks,
+    so only one batch is held in memory at a time. Lines that are not valid
+    JSON or not a tick are counted on ``progress`` and skipped.
+    """
+    progress = progress or ParseProgress()
+    batch = []
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            tick = loads(line)
+            check_tick(tick)
+        except (KeyError, TypeError, ValueError):
+            progress.parse_errors += 1
+            continue
+        batch.append(tick)
+        progress.lines_parsed += 1
+
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+
+    if batch:
+        yield batch
+
+
+def shard_offsets(path, shards):
+    """
+    Split a file into at most ``shards`` byte ranges that start and end on
+    line boundaries. A line belongs to the range its first byte falls in.
+    """
+    size = os.path.getsize(path)
+    bounds = [0]
+    with open(path, 'rb') as f:
+        for i in range(1, shards):
+            f.seek(size * i // shards)
+            f.readline()
+            bounds.append(max(f.tell(), bounds[-1]))
+    bounds.append(size)
+    return [(start, end) for start, end in zip(bounds, bounds[1:]) if end > start]
+
+
+def iter_shard_lines(path, start, end):
+    with open(path, 'rb') as f:
+        f.seek(start)
+        pos = start
+        while pos < end:
+            line = f.readline()
+            if not line:
+                break
+            pos += len(line)
+            yield line
@@ -0,0 +1,100 @@
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+import base64
+import json
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+class PaginationError(ValueError):
+    pass
+
+
+def encode_cursor(timestamp, row_id, order):
+    # row_id may be None for series keyed uniquely by timestamp (e.g. rows
+    # served from the latest-value cache), in which case the timestamp alone
+    # positions the cursor
+    if not isinstance(timestamp, str):
+        timestamp = timestamp.isoformat()
+    payload = json.dumps({'ts': timestamp, 'id': row_id, 'order': order})
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        ts = parse_datetime(payload['ts'])
+        if ts is None or payload['order'] not in ('asc', 'desc'):
+            raise ValueError
+        row_id = None if payload['id'] is None else int(payload['id'])
+        return ts, row_id, payload['order']
+    except (ValueError, KeyError, TypeError):
+        raise PaginationError('Invalid cursor')
+
+
+def parse_time(request, name):
+    value = request.GET.get(name)
+    if not value:
+        return None
+    try:
+        # None when malformed; ValueError when well-formed but out of range (month 13)
+        ts = parse_datetime(value)
+    except ValueError:
+        ts = None
+    if ts is None:
+        raise PaginationError(f'Invalid {name}: expected an ISO 8601 datetime')
+    if timezone.is_naive(ts):
+        ts = timezone.make_aware(ts, timezone.utc)
+    return ts
+
+
+def paginate(queryset, request):
+    """
+    Keyset pagination on (timestamp, id) for a queryset already filtered to
+    one symbol/timeframe, so it walks the composite index instead of using
+    OFFSET. Reads ``start``/``end`` (ISO datetimes, end exclusive),
+    ``cursor`` and ``limit`` (capped at MAX_PAGE_SIZE) from the request.
+
+    Pages run oldest-first when ``start`` is given and newest-first
+    otherwise; ``order`` overrides this. Returns (rows, next_cursor, order).
+    """
+    try:
+        limit = int(request.GET.get('limit', DEFAULT_PAGE_SIZE))
+    except ValueError:
+        raise PaginationError('Invalid limit')
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+
+    start = parse_time(request, 'start')
+    end = parse_time(request, 'end')
+    order = request.GET.get('order') or ('asc' if start else 'desc')
+    if order not in ('asc', 'desc'):
+        raise PaginationError('order must be asc or desc')
+
+    cursor = request.GET.get('cursor')
+    if cursor:
+        cursor_ts, cursor_id, order = decode_cursor(cursor)
+        if cursor_id is None:
+            queryset = queryset.filter(**{'timestamp__gt' if order == 'asc' else 'timestamp__lt': cursor_ts})
+        elif order == 'asc':
+            queryset = queryset.filter(Q(timestamp__gt=cursor_ts) | Q(timestamp=cursor_ts, id__gt=cursor_id))
+        else:
+            queryset = queryset.filter(Q(timestamp__lt=cursor_ts) | Q(timestamp=cursor_ts, id__lt=cursor_id))
+
+    if start:
+        queryset = queryset.filter(timestamp__gte=start)
+    if end:
+        queryset = queryset.filter(timestamp__lt=end)
+
+    if order == 'asc':
+        queryset = queryset.order_by('timestamp', 'id')
+    else:
+        queryset = queryset.order_by('-timestamp', '-id')
+
+    rows = list(queryset[:limit + 1])
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].timestamp, rows[-1].id, order)
+    return rows, next_cursor, order
@@ -0,0 +1,134 @@
+from django.conf import settings
+from django.db import connection, transaction, DatabaseError
+from django.utils import timezone
+from datetime import datetime, timedelta, timezone as dt_timezone
+import re
+
+PARTITION_KEY = 'timestamp'
+PARTITION_SUFFIX = re.compile(r'_p(\d{8})$')
+
+# Days this process has already ensured a partition for, per parent table
+_known_days = {}
+_partitioned = {}
+
+
+def partitioning_available():
+    return connection.vendor == 'postgresql'
+
+
+def is_partitioned(table, refresh=False):
+    # Memoized per process; workers pick up a freshly migrated table on restart
+    if not partitioning_available():
+        return False
+    if refresh or table not in _partitioned:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s)", [table])
+            _partitioned[table] = cursor.fetchone() is not None
+    return _partitioned[table]
+
+
+def day_floor(ts):
+    return datetime(ts.year, ts.month, ts.day, tzinfo=dt_timezone.utc)
+
+
+def partition_name(table, day):
+    return f'{table}_p{day:%Y%m%d}'
+
+
+def list_partitions(table):
+    """Return {day: partition_name} for the daily partitions attached to ``table``."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = to_regclass(%s)",
+            [table]
+        )
+        names = [row[0] for row in cursor.fetchall()]
+
+    partitions = {}
+    for name in names:
+        match = PARTITION_SUFFIX.search(name)
+        if match:
+            day = datetime.strptime(match.group(1), '%Y%m%d').replace(tzinfo=dt_timezone.utc)
+            partitions[day] = name
+    return partitions
+
+
+def _known_days_for(table):
+    if table not in _known_days:
+        _known_days[table] = set(list_partitions(table))
+    return _known_days[table]
+
+
+def create_partition(table, day):
+    name = partition_name(table, day)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'CREATE TABLE IF NOT EXISTS {name} PARTITION OF {table} '
+            f'FOR VALUES FROM (%s) TO (%s)',
+            [day, day + timedelta(days=1)]
+        )
+    return name
+
+
+def ensure_partitions(table, start, end):
+    """Create the daily partitions covering [start, end] that do not exist yet."""
+    known = _known_days_for(table)
+    day = day_floor(start)
+    created = []
+    while day <= end:
+        if day not in known:
+            try:
+                with transaction.atomic():
+                    create_partition(table, day)
+            except DatabaseError as e:
+                # Another worker created it between our check and ours
+                if partition_name(table, day) not in list_partitions(table).values():
+                    raise
+                print(f"Partition {partition_name(table, day)} created concurrently: {e}")
+            known.add(day)
+            created.append(day)
+        day += timedelta(days=1)
+    return created
+
+
+def ensure_partitions_for(table, timestamps):
+    """Make sure every day touched by ``timestamps`` has a partition before an insert."""
+    days = {day_floor(ts) for ts in timestamps}
+    known = _known_days_for(table)
+    for day in sorted(days - known):
+        ensure_partitions(table, day, day)
+
+
+def premake_partitions(table, days_ahead=None):
+    if days_ahead is None:
+        days_ahead = settings.RAW_TICK_PARTITION_DAYS_AHEAD
+    today = day_floor(timezone.now())
+    return ensure_partitions(table, today, today + timedelta(days=days_ahead))
+
+
+def drop_expired_partitions(table, retention_days=None):
+    """
+    Enforce retention by dropping whole daily partitions whose range ends
+    before the cutoff. Rows are never deleted one by one.
+    """
+    if retention_days is None:
+        retention_days = settings.RAW_TICK_RETENTION_DAYS
+    if not retention_days:
+        return []
+
+    cutoff = day_floor(timezone.now()) - timedelta(days=retention_days)
+    # DETACH ... CONCURRENTLY (PostgreSQL 14+) avoids blocking inserts into the
+    # parent; it cannot run inside a transaction block
+    concurrently = connection.pg_version >= 140000 and connection.get_autocommit()
+    dropped = []
+    for day, name in sorted(list_partitions(table).items()):
+        if day + timedelta(days=1) > cutoff:
+            continue
+        with connection.cursor() as cursor:
+            if concurrently:
+                cursor.execute(f'ALTER TABLE {table} DETACH PARTITION {name} CONCURRENTLY')
+            cursor.execute(f'DROP TABLE {name}')
+        _known_days.get(table, set()).discard(day)
+        dropped.append(name)
+    return dropped
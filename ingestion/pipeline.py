@@ -0,0 +1,126 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.db import connection
+from .latest import add_symbols
+from .tickstore import write_ticks
+from .tasks import parse_ticks, bar_lock, bar_keys, cold_start_builder, emit_bars
+
+# Batches held between stages before the stage in front has to wait
+PIPELINE_QUEUE_SIZE = 32
+PIPELINE_RETRY_SECONDS = 1
+
+
+class TickPipeline:
+    """
+    In-process live path used by ``django_producer --mode=pipeline``. Batches
+    go through two stages joined by bounded in-memory queues instead of a
+    Celery broker:
+
+    1. the tick writer stores the batch in raw_ticks, keeping only new ticks;
+    2. the bar builder folds those ticks into IncrementalBarBuilders that
+       live in this process, then writes and publishes the changed bars.
+
+    Each stage runs its database work on its own thread, so writing one
+    batch's ticks overlaps building the previous batch's bars. Rollups,
+    analytics and late-tick rebuilds are still scheduled through Celery.
+    The pipeline owns the open bars of the symbols it is fed; those symbols
+    must not also be ingested through ``ingest_tick_batch`` at the same time.
+    """
+
+    def __init__(self, timeframe='1s', queue_size=PIPELINE_QUEUE_SIZE):
+        self.timeframe = timeframe
+        self.pending_ticks = asyncio.Queue(queue_size)
+        self.pending_bars = asyncio.Queue(queue_size)
+        self.builders = {}
+        self.tick_executor = ThreadPoolExecutor(max_workers=1)
+        self.bar_executor = ThreadPoolExecutor(max_workers=1)
+        self.ticks_written = 0
+        self.bars_written = 0
+
+    async def submit(self, batch):
+        """TickBatcher dispatch target; waits while the tick writer is behind."""
+        await self.pending_ticks.put(parse_ticks(batch))
+
+    def depth(self, queue=None):
+        return self.pending_ticks.qsize()
+
+    async def run(self):
+        try:
+            await asyncio.gather(self.write_ticks_stage(), self.build_bars_stage())
+        finally:
+            self.tick_executor.shutdown(wait=True)
+            self.bar_executor.shutdown(wait=True)
+
+    async def write_ticks_stage(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            rows = await self.pending_ticks.get()
+            inserted = await loop.run_in_executor(self.tick_executor, _retry, write_ticks, rows)
+            self.ticks_written += len(inserted)
+            if inserted:
+                await self.pending_bars.put(inserted)
+
+    async def build_bars_stage(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            inserted = await self.pending_bars.get()
+            ticks_by_symbol = {}
+            first_trade_ids = {}
+            for symbol, ts, price, size, trade_id in inserted:
+                ticks_by_symbol.setdefault(symbol, []).append((ts, price, size))
+                if trade_id is not None:
+                    first_trade_ids[symbol] = min(trade_id, first_trade_ids.get(symbol, trade_id))
+            self.bars_written += await loop.run_in_executor(
+                self.bar_executor, self.build_bars, ticks_by_symbol, first_trade_ids
+            )
+
+    def build_bars(self, ticks_by_symbol, first_trade_ids=None):
+        _retry(add_symbols, ticks_by_symbol)
+        first_trade_ids = first_trade_ids or {}
+        return sum(
+            _retry(self.build_symbol, symbol, ticks, first_trade_ids.get(symbol))
+            for symbol, ticks in ticks_by_symbol.items()
+        )
+
+    def build_symbol(self, symbol, ticks, first_trade_id=None):
+        builder = self.builders.pop(symbol, None)
+        if builder is None:
+            previous_watermark = None
+            # The tick writer runs ahead of this stage, so later batches may
+            # already be stored; a symbol's trades are written in trade id
+            # order, so the seed stops at this batch's first trade
+            builder, changed, late = cold_start_builder(symbol, self.timeframe, ticks, first_trade_id)
+        else:
+            previous_watermark = builder.watermark
+            changed, late = builder.add_ticks(ticks)
+        # The lock only keeps late ranges consistent with rebuild_bars. If it
+        # cannot be had, BarLockTimeout fails this attempt and the retry
+        # reseeds the open bars
+        with bar_lock(symbol, self.timeframe):
+            emit_bars(symbol, self.timeframe, bar_keys(symbol, self.timeframe),
+                      builder, previous_watermark, changed, late)
+        # Put back only once written: after a failure the retry reseeds the
+        # open bars from the database instead of folding the ticks twice
+        self.builders[symbol] = builder
+        return len(changed)
+
+    def stats(self):
+        return {
+            'ticks_written': self.ticks_written,
+            'bars_written': self.bars_written,
+            'pending_tick_batches': self.pending_ticks.qsize(),
+            'pending_bar_batches': self.pending_bars.qsize(),
+        }
+
+
+def _retry(func, *args):
+    # A stage never drops a batch; while the database is unavailable the
+    # queues fill up and the producer's readers slow down instead
+    while True:
+        try:
+            return func(*args)
+        except Exception as e:
+            print(f"Pipeline {func.__name__} failed, retrying in {PIPELINE_RETRY_SECONDS}s: {e}")
+            connection.close()
+            time.sleep(PIPELINE_RETRY_SECONDS)
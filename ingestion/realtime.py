@@ -0,0 +1,47 @@
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from datetime import datetime
+from decimal import Decimal
+
+
+def group_name(kind, *parts):
+    """
+    Channels group for a stream, e.g. bars.BTCUSDT.1s, spread.BTCUSDT_ETHUSDT.1s
+    or alerts. Group names only allow [a-zA-Z0-9_.-], so parts are joined by dots.
+    """
+    return '.'.join((kind,) + tuple(parts))
+
+
+def _serialize(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    if hasattr(value, 'item'):
+        return value.item()
+    return value
+
+
+def serialize_rows(rows):
+    return [{key: _serialize(value) for key, value in row.items()} for row in rows]
+
+
+def publish(group, kind, rows):
+    """
+    Push new or changed rows to everyone subscribed to ``group``. Realtime
+    delivery is best effort, so a missing or unreachable channel layer never
+    fails the producing task.
+    """
+    if not rows:
+        return
+    channel_layer = get_channel_layer()
+    if channel_layer is None:
+        return
+    try:
+        async_to_sync(channel_layer.group_send)(group, {
+            'type': 'stream.rows',
+            'kind': kind,
+            'rows': serialize_rows(rows),
+        })
+    except Exception as e:
+        print(f"Failed to publish {kind} update to {group}: {e}")
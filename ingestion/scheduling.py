@@ -0,0 +1,62 @@
+from celery import shared_task, current_app
+from django.core.cache import cache
+from django.dispatch import Signal
+
+# Sent when bars of ``timeframe`` have closed for ``symbol``; downstream
+# stages (rollups, stats, spreads) subscribe and call trigger()
+bars_closed = Signal()
+
+TRIGGER_PENDING_KEY = 'trigger:pending:{key}'
+TRIGGER_METRIC_KEY = 'trigger:{metric}:{task}'
+TRIGGER_TASKS_KEY = 'trigger:tasks'
+# The pending marker outlives the countdown so a slow broker cannot let a duplicate through
+TRIGGER_PENDING_GRACE = 30
+
+
+def record_metric(metric, task_name, amount=1):
+    """Add to a triggered/coalesced counter reported by trigger_metrics()."""
+    tasks = cache.get(TRIGGER_TASKS_KEY) or []
+    if task_name not in tasks:
+        cache.set(TRIGGER_TASKS_KEY, tasks + [task_name], None)
+    key = TRIGGER_METRIC_KEY.format(metric=metric, task=task_name)
+    cache.add(key, 0, None)
+    try:
+        cache.incr(key, amount)
+    except ValueError:
+        # Evicted between add and incr
+        cache.set(key, amount, None)
+
+
+def trigger(task, args=(), delay=1):
+    """
+    Schedule ``task(*args)`` to run ``delay`` seconds from now unless a run
+    for the same task and arguments is already pending, in which case this
+    trigger is coalesced into it. The pending marker is cleared just before
+    the task runs, so triggers that arrive during a run schedule the next one.
+    Returns True if a run was scheduled.
+    """
+    key = f"{task.name}:{':'.join(str(arg) for arg in args)}"
+    if not cache.add(TRIGGER_PENDING_KEY.format(key=key), 1, delay + TRIGGER_PENDING_GRACE):
+        record_metric('coalesced', task.name)
+        return False
+
+    record_metric('triggered', task.name)
+    run_triggered.apply_async((key, task.name, list(args)), countdown=delay)
+    return True
+
+
+@shared_task(acks_late=True)
+def run_triggered(key, task_name, args):
+    cache.delete(TRIGGER_PENDING_KEY.format(key=key))
+    return current_app.tasks[task_name](*args)
+
+
+def trigger_metrics():
+    """{task name: {'triggered': runs scheduled, 'coalesced': triggers folded into a pending run}}"""
+    metrics = {}
+    for task_name in cache.get(TRIGGER_TASKS_KEY) or []:
+        metrics[task_name] = {
+            metric: cache.get(TRIGGER_METRIC_KEY.format(metric=metric, task=task_name), 0)
+            for metric in ('triggered', 'coalesced')
+        }
+    return metrics
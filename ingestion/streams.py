@@ -0,0 +1,172 @@
+import asyncio
+import random
+import time
+import websockets
+from .ticks import decode_trade, SYMBOL, EPOCH_MS, TRADE_ID
+
+STREAM_URL = 'wss://fstream.binance.com'
+# Binance accepts at most this many streams on one combined-stream connection
+MAX_STREAMS_PER_CONNECTION = 200
+BACKOFF_BASE_SECONDS = 0.5
+BACKOFF_MAX_SECONDS = 30
+# A connection that stayed up this long starts the backoff over
+BACKOFF_RESET_SECONDS = 60
+
+
+def shard_symbols(symbols, connections):
+    """
+    Spread symbols round-robin over ``connections`` shards. More shards are
+    used if one would otherwise exceed MAX_STREAMS_PER_CONNECTION.
+    """
+    symbols = sorted({symbol.strip().lower() for symbol in symbols if symbol.strip()})
+    if not symbols:
+        return []
+    count = max(connections, -(-len(symbols) // MAX_STREAMS_PER_CONNECTION))
+    count = min(count, len(symbols))
+    return [symbols[i::count] for i in range(count)]
+
+
+def combined_stream_url(base_url, symbols):
+    streams = '/'.join(f'{symbol}@trade' for symbol in symbols)
+    return f"{base_url.rstrip('/')}/stream?streams={streams}"
+
+
+class Backoff:
+    """Exponential backoff with full jitter: retry n waits uniform(0, min(cap, base * 2**n))."""
+
+    def __init__(self, base=BACKOFF_BASE_SECONDS, cap=BACKOFF_MAX_SECONDS):
+        self.base = base
+        self.cap = cap
+        self.attempt = 0
+
+    def next_delay(self):
+        delay = random.uniform(0, min(self.cap, self.base * 2 ** min(self.attempt, 32)))
+        self.attempt += 1
+        return delay
+
+    def reset(self):
+        self.attempt = 0
+
+
+class ConnectionStats:
+    """
+    Counters for one combined-stream connection. Trade ids are consecutive
+    per symbol, so a jump means trades were missed (typically across a
+    reconnect); the last id is kept across reconnects for that reason.
+    """
+    __slots__ = ('messages', 'ticks', 'connects', 'disconnects', 'gaps', 'missing_trades',
+                 'last_trade_ids', 'last_trade_times', 'last_message', 'longest_silence', 'window_start', 'window_messages')
+
+    def __init__(self):
+        self.messages = 0
+        self.ticks = 0
+        self.connects = 0
+        self.disconnects = 0
+        self.gaps = 0
+        self.missing_trades = 0
+        self.last_trade_ids = {}
+        self.last_trade_times = {}
+        self.last_message = None
+        self.longest_silence = 0.0
+        self.window_start = time.monotonic()
+        self.window_messages = 0
+
+    def record_message(self, now):
+        if self.last_message is not None:
+            self.longest_silence = max(self.longest_silence, now - self.last_message)
+        self.last_message = now
+        self.messages += 1
+        self.window_messages += 1
+
+    def record_tick(self, tick):
+        """
+        Count a tick. Returns the (trade id, epoch_ms) of the symbol's previous
+        trade when trades were skipped since it, (None, None) for the first
+        trade of a symbol, and None otherwise.
+        """
+        self.ticks += 1
+        symbol, trade_id = tick[SYMBOL], tick[TRADE_ID]
+        last = self.last_trade_ids.get(symbol)
+        gap = None
+        if last is None:
+            gap = (None, None)
+        elif trade_id > last + 1:
+            self.gaps += 1
+            self.missing_trades += trade_id - last - 1
+            gap = (last, self.last_trade_times[symbol])
+        if last is None or trade_id > last:
+            self.last_trade_ids[symbol] = trade_id
+            self.last_trade_times[symbol] = tick[EPOCH_MS]
+        return gap
+
+    def snapshot(self):
+        """Totals plus the message rate since the previous snapshot."""
+        now = time.monotonic()
+        rate = self.window_messages / max(now - self.window_start, 1e-9)
+        self.window_start = now
+        self.window_messages = 0
+        return {
+            'messages': self.messages,
+            'ticks': self.ticks,
+            'messages_per_sec': rate,
+            'connects': self.connects,
+            'disconnects': self.disconnects,
+            'gaps': self.gaps,
+            'missing_trades': self.missing_trades,
+            'longest_silence': self.longest_silence,
+        }
+
+
+class StreamConsumer:
+    """
+    One combined-stream connection carrying the trade streams of ``symbols``.
+    Every decoded tick is awaited through ``on_tick``; raw messages are
+    appended to ``record`` (an open text file) when given, in the format the
+    replay_trades command serves. Reconnects with jittered exponential backoff.
+
+    ``on_gap(tick, last_trade_id, last_epoch_ms)`` is awaited when trades
+    were skipped before ``tick``, and with Nones for the first trade of each
+    symbol, whose predecessor only the database knows.
+    """
+
+    def __init__(self, name, symbols, on_tick, base_url=STREAM_URL, record=None, on_gap=None):
+        self.name = name
+        self.symbols = symbols
+        self.on_tick = on_tick
+        self.on_gap = on_gap
+        self.url = combined_stream_url(base_url, symbols)
+        self.record = record
+        self.stats = ConnectionStats()
+        self.backoff = Backoff()
+
+    async def run(self):
+        while True:
+            connected_at = None
+            try:
+                async with websockets.connect(self.url) as websocket:
+                    connected_at = time.monotonic()
+                    self.stats.connects += 1
+                    print(f'{self.name}: connected with {len(self.symbols)} streams')
+                    async for message in websocket:
+                        self.stats.record_message(time.monotonic())
+                        if self.record is not None:
+                            self.record.write(message if isinstance(message, str) else message.decode())
+                            self.record.write('\n')
+                        tick = decode_trade(message)
+                        if tick is not None:
+                            gap = self.stats.record_tick(tick)
+                            if gap is not None and self.on_gap is not None:
+                                await self.on_gap(tick, *gap)
+                            await self.on_tick(tick)
+                print(f'{self.name}: connection closed by server')
+            except websockets.ConnectionClosed as e:
+                print(f'{self.name}: connection closed: {e}')
+            except Exception as e:
+                print(f'{self.name}: {type(e).__name__}: {e}')
+
+            self.stats.disconnects += 1
+            if connected_at is not None and time.monotonic() - connected_at >= BACKOFF_RESET_SECONDS:
+                self.backoff.reset()
+            delay = self.backoff.next_delay()
+            print(f'{self.name}: reconnecting in {delay:.2f}s')
+            await asyncio.sleep(delay)
@@ -1,100 +1,430 @@
 from celery import shared_task
+from django.core.cache import cache
+from django.db.models import Q
+from django.dispatch import receiver
 from django.utils import timezone
 from datetime import datetime
-import json
-from .models import RawTick, ProcessedBar
-from django.db import transaction
-import pandas as pd
-from decimal import Decimal
+from contextlib import contextmanager
+import secrets
+import time
+from .models import RawTick, ProcessedBar, TradeGap
+from .upsert import bulk_upsert
+from .tickstore import write_ticks
+from .ndjson import iter_ndjson_batches, ParseProgress, NDJSON_BATCH_SIZE
+from .barstore import store_enabled, get_store
+from .realtime import publish, group_name
+from .latest import cache_latest, add_symbols, remove_symbols, known_symbols
+from .partitions import is_partitioned, premake_partitions, drop_expired_partitions
+from .scheduling import bars_closed, trigger, record_metric
+from .history import get_history_source
+from .backfill import iter_rebuild_windows
+from config.celery import BACKFILL_QUEUE
+from .bars import (
+    IncrementalBarBuilder, resample_ticks, aggregate_bars, bucket_start, to_epoch_ms, from_epoch_seconds, from_epoch_ms,
+    TIMEFRAME_SECONDS, ROLLUP_SOURCE, ROLLUP_TIMEFRAMES
+)
 
-@shared_task
+BAR_STATE_KEY = 'bars:state:{symbol}:{timeframe}'
+BAR_LOCK_KEY = 'bars:lock:{symbol}:{timeframe}'
+BAR_SEQ_KEY = 'bars:seq:{symbol}:{timeframe}'
+BAR_DRAINED_KEY = 'bars:drained:{symbol}:{timeframe}'
+BAR_PENDING_KEY = 'bars:pending:{symbol}:{timeframe}:{seq}'
+BAR_REBUILD_KEY = 'bars:rebuild:{symbol}:{timeframe}'
+BAR_STATE_TIMEOUT = 15 * 60
+BAR_LOCK_TIMEOUT = 10
+# Queued batches folded per lock hold, well inside BAR_LOCK_TIMEOUT
+BAR_DRAIN_BATCHES = 200
+# A queued batch missing this long is given up on and its range rebuilt from the database
+BAR_PENDING_GAP_SECONDS = 5
+BAR_REBUILD_DELAY_SECONDS = 2
+# Late-tick windows closer together than this are rebuilt as one
+BAR_REBUILD_MERGE_SECONDS = 60
+BAR_BUILD_METRIC = 'ingestion.tasks.update_bars_incremental'
+NDJSON_PROGRESS_EVERY = 10
+# Source bars this recent may still receive ticks, so their bucket is not rolled up yet
+ROLLUP_SETTLE_SECONDS = 2
+# The last bucket already written is recomputed each run in case source bars were late
+ROLLUP_REVISIT_BUCKETS = 1
+ROLLUP_LOOKBACK_BUCKETS = 10
+# Recovery waits until a gap is older than the open bars a live builder keeps
+# (IncrementalBarBuilder.max_bars seconds), so no builder rewrites its bars after
+GAP_RECOVERY_DELAY_SECONDS = 180
+GAP_RETRY_SECONDS = 300
+GAP_MAX_ATTEMPTS = 5
+# How far back a restarted producer looks for the last trade it stored
+GAP_RESUME_LOOKBACK_SECONDS = 6 * 3600
+
+@shared_task(acks_late=True)
 def ingest_tick_batch(tick_data_list):
-    ticks_to_create = []
-    symbols = set()
+    inserted = write_ticks(parse_ticks(tick_data_list))
+    
+    # Only ticks that were new get folded into bars, so replays leave bars untouched
+    ticks_by_symbol = {}
+    for symbol, ts, price, size, _ in inserted:
+        ticks_by_symbol.setdefault(symbol, []).append((ts, price, size))
+    
+    add_symbols(ticks_by_symbol)
+    for symbol, ticks in ticks_by_symbol.items():
+        update_bars_incremental(symbol, ticks)
+    
+    return len(inserted)
+
+def parse_ticks(tick_data_list):
+    """
+    Producer ticks (compact tuples, see ingestion/ticks.py) or API/NDJSON tick
+    dicts to the (symbol, timestamp, price, size, trade_id) rows write_ticks() takes.
+    """
+    rows = []
     for tick in tick_data_list:
-        ts = datetime.fromisoformat(tick['ts'].replace('Z', '+00:00'))
-        ticks_to_create.append(RawTick(
-            symbol=tick['symbol'],
-            timestamp=ts,
-            price=Decimal(str(tick['price'])),
-            size=Decimal(str(tick['size']))
-        ))
-        symbols.add(tick['symbol'])
+        if isinstance(tick, dict):
+            ts = datetime.fromisoformat(tick['ts'].replace('Z', '+00:00'))
+            rows.append((tick['symbol'], ts, tick['price'], tick['size'], tick.get('trade_id')))
+        else:
+            symbol, epoch_ms, price, size, trade_id = tick
+            rows.append((symbol, from_epoch_ms(epoch_ms), price, size, trade_id))
+    return rows
+
+class BarLockTimeout(RuntimeError):
+    pass
+
+# Deletes the lock only while it still holds the caller's token
+RELEASE_LOCK_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+def acquire_lock(key, timeout=BAR_LOCK_TIMEOUT):
+    """
+    Try once to take the lock at ``key``. Returns the owner token to pass to
+    release_lock(), or None if someone else holds it. The lock expires on
+    its own, so a crashed holder only delays others.
+    """
+    # An int is stored unpickled by the Redis cache, so the release script
+    # can compare it
+    token = secrets.randbits(62) + 1
+    return token if cache.add(key, token, timeout) else None
+
+def release_lock(key, token):
+    """Release a lock we hold; one that expired and was retaken is left alone."""
+    client = getattr(cache, '_cache', None)
+    if hasattr(client, 'get_client'):
+        # Django's Redis cache: compare and delete atomically
+        key = cache.make_and_validate_key(key)
+        client.get_client(key, write=True).eval(RELEASE_LOCK_SCRIPT, 1, key, token)
+    elif cache.get(key) == token:
+        cache.delete(key)
+
+@contextmanager
+def bar_lock(symbol, timeframe):
+    """
+    Hold the build lock of a symbol/timeframe, waiting up to twice its
+    timeout for it. Raises BarLockTimeout rather than building unlocked.
+    """
+    key = BAR_LOCK_KEY.format(symbol=symbol, timeframe=timeframe)
+    deadline = time.monotonic() + BAR_LOCK_TIMEOUT * 2
+    token = acquire_lock(key)
+    while token is None:
+        if time.monotonic() > deadline:
+            raise BarLockTimeout(f'Timed out waiting for the bar lock of {symbol} {timeframe}')
+        time.sleep(0.01)
+        token = acquire_lock(key)
+    try:
+        yield
+    finally:
+        release_lock(key, token)
+
+def update_bars_incremental(symbol, ticks, timeframe='1s'):
+    """
+    Hand freshly ingested (timestamp, price, size) ticks to the bar builder
+    for a symbol. Builds are single-flight per (symbol, timeframe): if one is
+    already running the ticks are queued for it and this returns at once,
+    otherwise this call folds them together with everything queued since.
+    Returns the number of bars written by this call.
+    """
+    keys = bar_keys(symbol, timeframe)
+    cache.add(keys['seq'], 0, None)
+    seq = cache.incr(keys['seq'])
+    cache.set(keys['pending'].format(seq=seq), ticks, BAR_STATE_TIMEOUT)
+    
+    return _build_pending(symbol, timeframe, keys)
+
+def _build_pending(symbol, timeframe, keys):
+    written = 0
+    while True:
+        token = acquire_lock(keys['lock'])
+        if token is None:
+            # The running build drains the queue before it lets go of the lock
+            record_metric('coalesced', BAR_BUILD_METRIC)
+            return written
+        try:
+            written += _drain_pending_ticks(symbol, timeframe, keys)
+        finally:
+            release_lock(keys['lock'], token)
+        # A batch queued after the drain's last look saw the lock still held
+        # and left its ticks to us
+        if cache.get(keys['pending'].format(seq=cache.get(keys['drained'], 0) + 1)) is None:
+            return written
+
+def bar_keys(symbol, timeframe):
+    return {
+        name: key.format(symbol=symbol, timeframe=timeframe, seq='{seq}')
+        for name, key in (
+            ('state', BAR_STATE_KEY), ('lock', BAR_LOCK_KEY), ('seq', BAR_SEQ_KEY),
+            ('drained', BAR_DRAINED_KEY), ('pending', BAR_PENDING_KEY), ('rebuild', BAR_REBUILD_KEY),
+        )
+    }
+
+def _take_pending_ticks(keys, first, last):
+    """
+    Collect the queued batches first..last in order, stopping at the first
+    one that has not landed yet. A batch still missing after
+    BAR_PENDING_GAP_SECONDS (its worker died between the sequence number and
+    the write, or the cache evicted it) is skipped. Returns (ticks, last seq
+    taken, whether anything was skipped).
+    """
+    if last < first:
+        return [], first - 1, False
+    names = [keys['pending'].format(seq=seq) for seq in range(first, last + 1)]
+    batches = cache.get_many(names)
+    ticks = []
+    taken = first - 1
+    skipped = False
+    for seq, name in zip(range(first, last + 1), names):
+        if name in batches:
+            ticks.extend(batches[name])
+        else:
+            missing_since = keys['pending'].format(seq=f'{seq}:missing')
+            cache.add(missing_since, time.time(), BAR_STATE_TIMEOUT)
+            if time.time() - cache.get(missing_since, time.time()) < BAR_PENDING_GAP_SECONDS:
+                break
+            skipped = True
+        taken = seq
+    cache.delete_many(names[:taken - first + 1])
+    return ticks, taken, skipped
+
+def _drain_pending_ticks(symbol, timeframe, keys):
+    """
+    Fold queued tick batches into the cached open bars and write only the
+    bars they touched. Runs with the build lock held; takes at most
+    BAR_DRAIN_BATCHES batches so the lock cannot expire mid-build.
+    """
+    last_seq = cache.get(keys['seq'], 0)
+    drained = cache.get(keys['drained'])
+    state = cache.get(keys['state'])
+    heal_from = None
+    
+    if state is None or drained is None:
+        # Cold start: the queued ticks are folded on top of what the database
+        # holds before them (see cold_start_builder())
+        first = drained + 1 if drained is not None else max(0, last_seq - BAR_DRAIN_BATCHES) + 1
+        ticks, taken, skipped = _take_pending_ticks(keys, first, min(last_seq, first + BAR_DRAIN_BATCHES - 1))
+        if state is not None:
+            # The drained marker was evicted, so batches may have been lost
+            heal_from = IncrementalBarBuilder.from_state(state).floor
+        if not ticks:
+            if taken >= first:
+                cache.set(keys['drained'], taken, None)
+            return 0
+        previous_watermark = None
+        builder, changed, late = cold_start_builder(symbol, timeframe, ticks)
+        if skipped and heal_from is None:
+            heal_from = builder.floor
+    else:
+        builder = IncrementalBarBuilder.from_state(state)
+        previous_watermark = builder.watermark
+        ticks, taken, skipped = _take_pending_ticks(keys, drained + 1, min(last_seq, drained + BAR_DRAIN_BATCHES))
+        if skipped:
+            heal_from = builder.floor
+        elif not ticks:
+            return 0
+        changed, late = builder.add_ticks(ticks)
     
-    with transaction.atomic():
-        RawTick.objects.bulk_create(ticks_to_create, ignore_conflicts=True)
+    emit_bars(symbol, timeframe, keys, builder, previous_watermark, changed, late)
+    if heal_from is None:
+        cache.set(keys['state'], builder.to_state(), BAR_STATE_TIMEOUT)
+    else:
+        # The open bars are missing the lost ticks; the next drain reseeds
+        # them from the database
+        cache.delete(keys['state'])
+    cache.set(keys['drained'], taken, None)
+    if heal_from is not None:
+        print(f"Lost queued ticks for {symbol}, rebuilding from {from_epoch_seconds(heal_from)}")
+        _queue_rebuild(symbol, timeframe, keys, [(heal_from, None)])
+    
+    return len(changed)
+
+def emit_bars(symbol, timeframe, keys, builder, previous_watermark, changed, late):
+    """
+    Write and publish the bars a builder just changed, announce closed bars
+    and queue a rebuild for ticks that arrived behind the builder's floor.
+    Called with the build lock held.
+    """
+    save_bars(symbol, timeframe, changed)
+    publish(group_name('bars', symbol, timeframe), 'bars', changed)
     
-    for symbol in symbols:
-        process_ticks_to_bars.delay(symbol, '1s', lookback_minutes=2)
+    # A tick in a later bucket than any seen before closes the bars behind it
+    if builder.watermark is not None and (
+        previous_watermark is None
+        or bucket_start(builder.watermark, timeframe) > bucket_start(previous_watermark, timeframe)
+    ):
+        bars_closed.send(sender=None, symbol=symbol, timeframe=timeframe)
     
-    return len(ticks_to_create)
+    if late:
+        # Only the buckets the late ticks fall in are rebuilt, never the span
+        # between an old tick and the live bars
+        seconds = TIMEFRAME_SECONDS[timeframe]
+        buckets = {bucket_start(to_epoch_ms(ts), timeframe) for ts, _, _ in late}
+        windows = merge_windows([(bucket, bucket + seconds) for bucket in buckets])
+        print(f"{len(late)} late ticks for {symbol}, rebuilding {len(windows)} windows "
+              f"from {from_epoch_seconds(windows[0][0])}")
+        _queue_rebuild(symbol, timeframe, keys, windows)
 
-@shared_task
-def process_ticks_to_bars(symbol, timeframe='1s', lookback_minutes=5):
+def merge_windows(windows, slack=BAR_REBUILD_MERGE_SECONDS):
+    """
+    Sort (start, end) epoch-second windows and merge the ones that overlap
+    or are less than ``slack`` seconds apart. ``end`` None means up to now.
+    """
+    merged = []
+    for start, end in sorted(windows, key=lambda window: window[0]):
+        if merged and (merged[-1][1] is None or start <= merged[-1][1] + slack):
+            last_end = merged[-1][1]
+            merged[-1] = (merged[-1][0], None if last_end is None or end is None else max(last_end, end))
+        else:
+            merged.append((start, end))
+    return merged
+
+def _queue_rebuild(symbol, timeframe, keys, windows):
+    """
+    Add (start, end) epoch-second windows to the pending rebuild for a
+    symbol and trigger it, so a burst of late ticks costs one rebuild. The
+    pending windows stay disjoint. Called with the build lock held.
+    """
+    pending = cache.get(keys['rebuild']) or []
+    cache.set(keys['rebuild'], merge_windows(pending + list(windows)), None)
+    trigger(rebuild_bars, [symbol, timeframe], BAR_REBUILD_DELAY_SECONDS)
+
+@shared_task(acks_late=True)
+def rebuild_bars(symbol, timeframe='1s'):
+    """
+    Run the window rebuilds queued by _queue_rebuild(), if any. Each window
+    is resampled a day at a time, so a late tick from long ago never loads
+    more than a day of ticks at once.
+    """
+    keys = bar_keys(symbol, timeframe)
     try:
-        from_time = timezone.now() - timezone.timedelta(minutes=lookback_minutes)
+        with bar_lock(symbol, timeframe):
+            pending = cache.get(keys['rebuild'])
+            cache.delete(keys['rebuild'])
+    except BarLockTimeout as e:
+        # The windows are still queued; take them on a later run
+        print(f"{e}, retrying the rebuild later")
+        trigger(rebuild_bars, [symbol, timeframe], BAR_REBUILD_DELAY_SECONDS)
+        return 0
+    # Batches queued while we held the lock left their ticks to us
+    _build_pending(symbol, timeframe, keys)
+    saved = 0
+    for start, end in pending or []:
+        end_time = from_epoch_seconds(end) if end is not None else timezone.now()
+        # iter_rebuild_windows() takes an inclusive upper bound
+        high = end_time - timezone.timedelta(microseconds=1)
+        for chunk_start, chunk_end in iter_rebuild_windows(from_epoch_seconds(start), high, timeframe):
+            if chunk_end >= end_time:
+                # An open-ended window also takes ticks stored while it runs
+                chunk_end = end_time if end is not None else None
+            saved += process_ticks_to_bars(
+                symbol, timeframe,
+                start=chunk_start.isoformat(),
+                end=chunk_end.isoformat() if chunk_end is not None else None
+            )
+    return saved
+
+def cold_start_builder(symbol, timeframe, ticks, first_trade_id=None):
+    # Without cached state the first bucket of the batch may already hold
+    # ticks from earlier batches, so seed the builder from the database.
+    # Only ticks older than the batch are read and the batch is folded on
+    # top: a later batch may already be stored but not yet queued, and it
+    # is folded when it arrives. With the batch's first trade id, "older"
+    # means an earlier trade rather than an earlier timestamp.
+    first = min(ts for ts, _, _ in ticks)
+    floor = bucket_start(to_epoch_ms(first), timeframe)
+    builder = IncrementalBarBuilder(timeframe, floor=floor)
+    
+    if first_trade_id is None:
+        before_batch = Q(timestamp__lt=first)
+    else:
+        before_batch = Q(trade_id__lt=first_trade_id) | Q(trade_id__isnull=True, timestamp__lt=first)
+    db_ticks = RawTick.objects.filter(
+        before_batch,
+        symbol=symbol,
+        timestamp__gte=from_epoch_seconds(floor)
+    ).order_by('timestamp').values_list('timestamp', 'price', 'size')
+    
+    changed, late = builder.add_ticks(list(db_ticks) + list(ticks))
+    return builder, changed, late
+
+BAR_UNIQUE_FIELDS = ['symbol', 'timeframe', 'timestamp']
+BAR_UPDATE_FIELDS = ['open', 'high', 'low', 'close', 'volume', 'tick_count']
+
+def save_bars(symbol, timeframe, bars):
+    rows = [{
+        'symbol': symbol,
+        'timeframe': timeframe,
+        'timestamp': bar['timestamp'],
+        'open': float(bar['open']),
+        'high': float(bar['high']),
+        'low': float(bar['low']),
+        'close': float(bar['close']),
+        'volume': float(bar['volume']),
+        'tick_count': int(bar['tick_count'])
+    } for bar in bars]
+    saved = bulk_upsert(ProcessedBar, rows, BAR_UNIQUE_FIELDS, BAR_UPDATE_FIELDS)
+    cache_latest('bars', (symbol, timeframe), rows)
+    return saved
+
+@shared_task(acks_late=True)
+def process_ticks_to_bars(symbol, timeframe='1s', lookback_minutes=5, start=None, end=None, rollup=True):
+    try:
+        if start:
+            from_time = datetime.fromisoformat(start)
+        else:
+            from_time = timezone.now() - timezone.timedelta(minutes=lookback_minutes)
+        # Start on a bar boundary so the first bar is never rebuilt from a partial bucket
+        from_time = from_epoch_seconds(bucket_start(to_epoch_ms(from_time), timeframe))
         
         ticks = RawTick.objects.filter(
             symbol=symbol,
             timestamp__gte=from_time
-        ).values('timestamp', 'price', 'size').order_by('timestamp')
+        )
+        if end:
+            ticks = ticks.filter(timestamp__lt=datetime.fromisoformat(end))
+        if start and store_enabled():
+            # A range rebuild can rewrite bars the columnar store already holds
+            get_store(symbol, timeframe).truncate(int(from_time.timestamp()))
         
-        tick_list = list(ticks)
+        tick_list = list(ticks.values('timestamp', 'price', 'size').order_by('timestamp'))
         print(f"Found {len(tick_list)} ticks for {symbol} from {from_time}")
         
         if not tick_list:
             return 0
         
-        df = pd.DataFrame(tick_list)
-        df['timestamp'] = pd.to_datetime(df['timestamp'], utc=True)
-        df.set_index('timestamp', inplace=True)
-        df['price'] = df['price'].astype(float)
-        df['size'] = df['size'].astype(float)
-        
-        print(f"DataFrame shape: {df.shape}, index range: {df.index.min()} to {df.index.max()}")
-        
-        bars = df['price'].resample(timeframe).ohlc()
-        volume = df['size'].resample(timeframe).sum()
-        tick_count = df['price'].resample(timeframe).count()
-        
-        bars['volume'] = volume
-        bars['tick_count'] = tick_count
-        bars = bars.dropna()
-        
+        bars = resample_ticks(tick_list, timeframe)
         print(f"Created {len(bars)} bars after resampling")
         
-        bars_to_create = []
-        for ts, row in bars.iterrows():
-            bars_to_create.append(ProcessedBar(
-                symbol=symbol,
-                timeframe=timeframe,
-                timestamp=ts.to_pydatetime(),
-                open=Decimal(str(row['open'])),
-                high=Decimal(str(row['high'])),
-                low=Decimal(str(row['low'])),
-                close=Decimal(str(row['close'])),
-                volume=Decimal(str(row['volume'])),
-                tick_count=int(row['tick_count'])
-            ))
+        bar_records = [
+            {'timestamp': ts.to_pydatetime(), **row}
+            for ts, row in zip(bars.index, bars.to_dict('records'))
+        ]
+        saved = save_bars(symbol, timeframe, bar_records)
         
-        with transaction.atomic():
-            for bar in bars_to_create:
-                ProcessedBar.objects.update_or_create(
-                    symbol=bar.symbol,
-                    timeframe=bar.timeframe,
-                    timestamp=bar.timestamp,
-                    defaults={
-                        'open': bar.open,
-                        'high': bar.high,
-                        'low': bar.low,
-                        'close': bar.close,
-                        'volume': bar.volume,
-                        'tick_count': bar.tick_count
-                    }
-                )
+        print(f"Successfully saved {saved} bars to database")
         
-        print(f"Successfully saved {len(bars_to_create)} bars to database")
-        return len(bars_to_create)
+        if start and timeframe == '1s' and rollup:
+            # Higher timeframes were rolled up from the bars just rebuilt
+            rollup_bars.delay(symbol, start=from_time.isoformat(), end=end)
+        
+        return saved
         
     except Exception as e:
         print(f"ERROR in process_ticks_to_bars: {e}")
@@ -102,17 +432,195 @@ def process_ticks_to_bars(symbol, timeframe='1s', lookback_minutes=5):
         traceback.print_exc()
         raise
 
-@shared_task
-def process_ndjson_file(file_path):
-    ticks = []
+@shared_task(acks_late=True)
+def rollup_bars(symbol, timeframes=None, start=None, end=None):
+    """
+    Cascade closed bars up the timeframe ladder (1s -> 1m -> 5m -> 15m -> 1h
+    -> 1d), each stage reading the bars the previous stage just wrote. Only
+    buckets whose source bars have all closed are rolled up. Without
+    ``start`` each stage resumes after its latest stored bar; with it,
+    every stage is recomputed from that time up to the buckets containing
+    ``end`` (used after late-tick rebuilds).
+    """
+    start = datetime.fromisoformat(start) if start else None
+    end = datetime.fromisoformat(end) if end else None
+    now_s = int(timezone.now().timestamp()) - ROLLUP_SETTLE_SECONDS
+    
+    saved = {}
+    for timeframe in timeframes or ROLLUP_TIMEFRAMES:
+        saved[timeframe] = rollup_timeframe(symbol, timeframe, now_s, start, end)
+    return saved
+
+def rollup_timeframe(symbol, timeframe, now_s, start=None, end=None):
+    seconds = TIMEFRAME_SECONDS[timeframe]
+    # Start of the first bucket that is still open
+    cutoff = now_s - now_s % seconds
+    if end is not None:
+        cutoff = min(cutoff, bucket_start(to_epoch_ms(end) - 1, timeframe) + seconds)
+    
+    latest = None
+    if start is not None:
+        from_s = bucket_start(to_epoch_ms(start), timeframe)
+    else:
+        latest = ProcessedBar.objects.filter(
+            symbol=symbol,
+            timeframe=timeframe
+        ).order_by('-timestamp').values_list('timestamp', flat=True).first()
+        if latest is None:
+            from_s = cutoff - ROLLUP_LOOKBACK_BUCKETS * seconds
+        else:
+            from_s = int(latest.timestamp()) + seconds - ROLLUP_REVISIT_BUCKETS * seconds
+    
+    if from_s >= cutoff:
+        return 0
+    
+    source = ProcessedBar.objects.filter(
+        symbol=symbol,
+        timeframe=ROLLUP_SOURCE[timeframe],
+        timestamp__gte=from_epoch_seconds(from_s),
+        timestamp__lt=from_epoch_seconds(cutoff)
+    ).order_by('timestamp').values('timestamp', 'open', 'high', 'low', 'close', 'volume', 'tick_count')
+    
+    bars = aggregate_bars(source.iterator(chunk_size=10000), timeframe)
+    if not bars:
+        return 0
+    
+    if start is not None and store_enabled():
+        get_store(symbol, timeframe).truncate(from_s)
+    saved = save_bars(symbol, timeframe, bars)
+    publish(group_name('bars', symbol, timeframe), 'bars', bars)
+    
+    if start is not None or latest is None or bars[-1]['timestamp'] > latest:
+        bars_closed.send(sender=None, symbol=symbol, timeframe=timeframe)
+    return saved
+
+@receiver(bars_closed)
+def schedule_rollup(sender, symbol, timeframe, **kwargs):
+    """
+    Closed 1s bars schedule one rollup for when the current minute completes;
+    every other 1s close during that minute is coalesced into it.
+    """
+    if timeframe != '1s':
+        return
+    seconds = TIMEFRAME_SECONDS[ROLLUP_TIMEFRAMES[0]]
+    now = time.time()
+    delay = seconds - now % seconds + ROLLUP_SETTLE_SECONDS
+    trigger(rollup_bars, [symbol], delay)
+
+@shared_task(bind=True)
+def process_ndjson_file(self, file_path, batch_size=NDJSON_BATCH_SIZE, queue=BACKFILL_QUEUE):
+    progress = ParseProgress()
+    
     with open(file_path, 'r') as f:
-        for line in f:
-            if line.strip():
-                ticks.append(json.loads(line))
+        for batch in iter_ndjson_batches(f, batch_size, progress):
+            # Uploaded history is ingested on the backfill queue, behind live ticks
+            ingest_tick_batch.apply_async((batch,), queue=queue)
+            progress.batches_dispatched += 1
+            
+            if progress.batches_dispatched % NDJSON_PROGRESS_EVERY == 0:
+                self.update_state(state='PROGRESS', meta=progress.to_dict())
+    
+    return progress.to_dict()
+
+@shared_task(acks_late=True)
+def maintain_tick_partitions():
+    """Create upcoming daily raw_ticks partitions and drop the ones past retention."""
+    table = RawTick._meta.db_table
+    if not is_partitioned(table, refresh=True):
+        return {'created': 0, 'dropped': []}
+    
+    created = premake_partitions(table)
+    dropped = drop_expired_partitions(table)
+    if created or dropped:
+        print(f"{table}: created {len(created)} partitions, dropped {', '.join(dropped) or 'none'}")
+    if dropped:
+        # Symbols whose ticks all went with the dropped days leave the symbol set
+        remove_symbols([
+            symbol for symbol in known_symbols() if not RawTick.objects.filter(symbol=symbol).exists()
+        ])
+    
+    return {'created': len(created), 'dropped': dropped}
+
+@shared_task(acks_late=True)
+def log_trade_gap(symbol, trade_id, epoch_ms, last_trade_id=None, last_epoch_ms=None):
+    """
+    Log the trades of ``symbol`` between last_trade_id and ``trade_id`` (the
+    first trade received after them, traded at epoch_ms) as missing and
+    schedule their recovery. Without last_trade_id, i.e. for the producer's
+    first trade of the symbol, the latest stored trade takes its place so
+    trades missed while the producer was down are found too.
+    """
+    end_time = from_epoch_ms(epoch_ms)
+    if last_trade_id is None:
+        previous = RawTick.objects.filter(
+            symbol=symbol,
+            trade_id__lt=trade_id,
+            timestamp__gte=end_time - timezone.timedelta(seconds=GAP_RESUME_LOOKBACK_SECONDS),
+            timestamp__lte=end_time
+        ).order_by('-timestamp', '-trade_id').values_list('trade_id', 'timestamp').first()
+        if previous is None:
+            return None
+        last_trade_id, start_time = previous
+    else:
+        start_time = from_epoch_ms(last_epoch_ms)
+    if trade_id <= last_trade_id + 1:
+        return None
+    
+    gap, created = TradeGap.objects.get_or_create(
+        symbol=symbol,
+        first_trade_id=last_trade_id + 1,
+        defaults={'last_trade_id': trade_id - 1, 'start_time': start_time, 'end_time': end_time}
+    )
+    if created:
+        print(f"{gap.missing_count} trades missing for {symbol} between {start_time} and {end_time}")
+        delay = GAP_RECOVERY_DELAY_SECONDS - (timezone.now() - end_time).total_seconds()
+        recover_trade_gap.apply_async((gap.id,), countdown=max(0, delay))
+    return gap.id
+
+@shared_task(acks_late=True)
+def recover_trade_gap(gap_id):
+    """
+    Fill a logged gap from the trade history source and rebuild the 1s bars
+    (and, through the rollup, the higher timeframes) of just the seconds the
+    recovered trades fall in. A gap still incomplete is retried with backoff
+    up to GAP_MAX_ATTEMPTS times, then closed as partial or unrecoverable.
+    """
+    gap = TradeGap.objects.filter(id=gap_id, status='open').first()
+    if gap is None:
+        return 0
+    
+    ticks = get_history_source().fetch(
+        gap.symbol, gap.first_trade_id, gap.last_trade_id, gap.start_time, gap.end_time
+    )
+    inserted = write_ticks(parse_ticks(ticks))
+    if inserted:
+        first = bucket_start(min(to_epoch_ms(ts) for _, ts, _, _, _ in inserted), '1s')
+        last = bucket_start(max(to_epoch_ms(ts) for _, ts, _, _, _ in inserted), '1s')
+        process_ticks_to_bars.delay(
+            gap.symbol, '1s',
+            start=from_epoch_seconds(first).isoformat(),
+            end=from_epoch_seconds(last + 1).isoformat()
+        )
     
-    batch_size = 1000
-    for i in range(0, len(ticks), batch_size):
-        batch = ticks[i:i+batch_size]
-        ingest_tick_batch.delay(batch)
+    # Count what is stored rather than what was inserted: missing trades may
+    # also have come in another way, such as an NDJSON upload
+    gap.recovered_count = RawTick.objects.filter(
+        symbol=gap.symbol,
+        trade_id__gte=gap.first_trade_id,
+        trade_id__lte=gap.last_trade_id,
+        timestamp__gte=gap.start_time,
+        timestamp__lte=gap.end_time
+    ).count()
+    gap.attempts += 1
+    if gap.recovered_count >= gap.missing_count:
+        gap.status = 'recovered'
+        gap.recovered_at = timezone.now()
+    elif gap.attempts >= GAP_MAX_ATTEMPTS:
+        gap.status = 'partial' if gap.recovered_count else 'unrecoverable'
+    gap.save(update_fields=['recovered_count', 'attempts', 'status', 'recovered_at'])
     
-    return len(ticks)
\ No newline at end of file
+    print(f"Recovered {len(inserted)} trades for {gap.symbol} gap {gap.id}: "
+          f"{gap.recovered_count}/{gap.missing_count} present, {gap.status}")
+    if gap.status == 'open':
+        recover_trade_gap.apply_async((gap.id,), countdown=GAP_RETRY_SECONDS * 2 ** (gap.attempts - 1))
+    return len(inserted)
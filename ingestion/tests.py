@@ -1,3 +1,486 @@
-from django.test import TestCase
+from celery import current_app
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+import asyncio
+import json
+import pickle
+import random
+import tempfile
+import os
+from .bars import IncrementalBarBuilder, resample_ticks, aggregate_bars, from_epoch_ms, from_epoch_seconds
+from .batcher import TickBatcher, DEPTH_HIGH, DEPTH_LOW
+from .latest import add_symbols, remove_symbols, known_symbols
+from .models import RawTick, ProcessedBar, TradeGap
+from .ndjson import iter_ndjson_batches, ParseProgress
+from .pipeline import TickPipeline
+from .scheduling import trigger, run_triggered, trigger_metrics
+from .streams import shard_symbols, Backoff, ConnectionStats, MAX_STREAMS_PER_CONNECTION
+from .tasks import (
+    update_bars_incremental, rollup_bars, rollup_timeframe, merge_windows, bar_keys, acquire_lock, release_lock,
+    log_trade_gap, recover_trade_gap, BAR_UNIQUE_FIELDS, BAR_UPDATE_FIELDS, BAR_BUILD_METRIC
+)
+from .tickstore import write_ticks
+from .upsert import bulk_upsert
 
-# Create your tests here.
+START_MS = 1_760_000_000_000
+
+
+def make_ticks(count, seed=1):
+    rng = random.Random(seed)
+    epoch_ms = START_MS
+    price = 100.0
+    ticks = []
+    for _ in range(count):
+        # Strictly increasing times keep open/close unambiguous for the resample
+        epoch_ms += rng.randint(1, 400)
+        price += rng.uniform(-0.5, 0.5)
+        ticks.append((from_epoch_ms(epoch_ms), Decimal(f'{price:.8f}'), Decimal(f'{rng.uniform(0, 2):.8f}')))
+    return ticks
+
+
+class IncrementalBarBuilderTests(TestCase):
+    def assert_matches_resample(self, bars, ticks, timeframe):
+        expected = resample_ticks(
+            [{'timestamp': ts, 'price': price, 'size': size} for ts, price, size in ticks], timeframe
+        )
+        self.assertEqual(sorted(bars), [ts.to_pydatetime() for ts in expected.index])
+        for ts, row in zip(expected.index, expected.to_dict('records')):
+            bar = bars[ts.to_pydatetime()]
+            for field in ('open', 'high', 'low', 'close', 'volume'):
+                self.assertAlmostEqual(float(bar[field]), row[field], places=6, msg=f'{field} at {ts}')
+            self.assertEqual(bar['tick_count'], row['tick_count'])
+
+    def test_batches_with_state_round_trip_match_resample(self):
+        for timeframe in ('1s', '1m'):
+            ticks = make_ticks(3000)
+            rng = random.Random(2)
+            builder = IncrementalBarBuilder(timeframe, max_bars=10_000)
+            bars = {}
+            position = 0
+            while position < len(ticks):
+                size = rng.randint(1, 200)
+                batch = ticks[position:position + size]
+                # Ticks within a batch may arrive out of order
+                rng.shuffle(batch)
+                position += size
+                changed, late = builder.add_ticks(batch)
+                self.assertEqual(late, [])
+                for bar in changed:
+                    bars[bar['timestamp']] = bar
+                # Between batches the state lives in the cache
+                builder = IncrementalBarBuilder.from_state(pickle.loads(pickle.dumps(builder.to_state())))
+            self.assert_matches_resample(bars, ticks, timeframe)
+
+    def test_ticks_behind_evicted_bars_are_late(self):
+        ticks = make_ticks(500)
+        builder = IncrementalBarBuilder('1s', max_bars=5)
+        builder.add_ticks(ticks)
+        changed, late = builder.add_ticks(ticks[:10])
+        self.assertEqual(changed, [])
+        self.assertEqual(len(late), 10)
+
+
+class ColdStartTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_batch_stored_but_not_yet_queued_is_counted_once(self):
+        a = ('BTCUSDT', from_epoch_ms(START_MS), '100', '1', 1)
+        b = ('BTCUSDT', from_epoch_ms(START_MS + 200), '101', '2', 2)
+        # A is stored and queued, B is stored before A's build runs
+        write_ticks([a])
+        write_ticks([b])
+        update_bars_incremental('BTCUSDT', [a[1:4]])
+        update_bars_incremental('BTCUSDT', [b[1:4]])
+        bar = ProcessedBar.objects.get(symbol='BTCUSDT', timeframe='1s')
+        self.assertEqual((bar.tick_count, bar.volume, bar.close), (2, 3.0, 101.0))
+
+    def test_cold_start_seeds_earlier_ticks_of_the_bucket(self):
+        write_ticks([('BTCUSDT', from_epoch_ms(START_MS), '100', '1', 1)])
+        later = ('BTCUSDT', from_epoch_ms(START_MS + 300), '99', '1', 2)
+        write_ticks([later])
+        update_bars_incremental('BTCUSDT', [later[1:4]])
+        bar = ProcessedBar.objects.get(symbol='BTCUSDT', timeframe='1s')
+        self.assertEqual((bar.tick_count, bar.open, bar.close), (2, 100.0, 99.0))
+
+
+class TickPipelineTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def build(self, pipeline, rows):
+        return pipeline.build_bars({'BTCUSDT': [row[1:4] for row in rows]}, {'BTCUSDT': min(row[4] for row in rows)})
+
+    def test_builder_behind_the_writer_counts_each_tick_once(self):
+        pipeline = TickPipeline()
+        a = [('BTCUSDT', from_epoch_ms(START_MS + 500), '100', '1', 1)]
+        # Exchange times are not strictly ordered, trade ids are
+        b = [('BTCUSDT', from_epoch_ms(START_MS + 100), '101', '2', 2)]
+        write_ticks(a)
+        write_ticks(b)
+        self.build(pipeline, a)
+        self.build(pipeline, b)
+        bar = ProcessedBar.objects.get(symbol='BTCUSDT', timeframe='1s')
+        self.assertEqual((bar.tick_count, bar.volume), (2, 3.0))
+
+
+class ExportTests(TestCase):
+    def setUp(self):
+        ProcessedBar.objects.bulk_create([
+            ProcessedBar(symbol='BTCUSDT', timeframe='1s', timestamp=from_epoch_ms(START_MS + i * 1000),
+                         open=i, high=i, low=i, close=i, volume=1, tick_count=1)
+            for i in range(7)
+        ])
+        self.params = {'symbol': 'BTCUSDT', 'format': 'ndjson', 'fields': 'timestamp,close'}
+
+    def rows(self, content):
+        return [json.loads(line)['close'] for line in content.decode().splitlines()]
+
+    @mock.patch('ingestion.export.EXPORT_CHUNK_SIZE', 3)
+    def test_ndjson_streams_every_row_in_order(self):
+        response = self.client.get('/api/ingestion/bars/export/', self.params)
+        self.assertTrue(response.streaming)
+        self.assertEqual(self.rows(b''.join(response.streaming_content)), [float(i) for i in range(7)])
+
+    @mock.patch('ingestion.export.EXPORT_CHUNK_SIZE', 3)
+    async def test_asgi_requests_get_an_async_stream(self):
+        response = await self.async_client.get('/api/ingestion/bars/export/', self.params)
+        self.assertTrue(response.is_async)
+        content = b''.join([part async for part in response.streaming_content])
+        self.assertEqual(self.rows(content), [float(i) for i in range(7)])
+
+    def test_csv_has_a_header_and_unknown_fields_are_rejected(self):
+        response = self.client.get('/api/ingestion/bars/export/', dict(self.params, format='csv'))
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual((lines[0], len(lines)), ('timestamp,close', 8))
+        response = self.client.get('/api/ingestion/bars/export/', dict(self.params, fields='nope'))
+        self.assertEqual(response.status_code, 400)
+
+
+class KnownSymbolsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_first_add_seeds_the_set_from_stored_ticks(self):
+        write_ticks([('BTCUSDT', from_epoch_ms(START_MS + i), '100', '1', i) for i in range(20)]
+                    + [('ETHUSDT', from_epoch_ms(START_MS), '10', '1', 1)])
+        add_symbols({'ETHUSDT': []})
+        add_symbols(['SOLUSDT', 'ETHUSDT'])
+        with self.assertNumQueries(0):
+            self.assertEqual(known_symbols(), ['BTCUSDT', 'ETHUSDT', 'SOLUSDT'])
+
+    def test_removed_symbols_leave_the_set(self):
+        add_symbols(['BTCUSDT', 'ETHUSDT'])
+        remove_symbols(['ETHUSDT'])
+        self.assertEqual(known_symbols(), ['BTCUSDT'])
+
+
+class NDJSONParseTests(TestCase):
+    def test_lines_that_are_not_ticks_count_as_parse_errors(self):
+        tick = {'symbol': 'BTCUSDT', 'ts': '2026-01-01T00:00:00Z', 'price': '100.5', 'size': 0.1}
+        lines = [json.dumps(tick), '{"symbol": "BTCUSDT"', '', json.dumps({k: v for k, v in tick.items() if k != 'ts'}),
+                 '[1, 2]', '"tick"', json.dumps(dict(tick, ts=1700000000)), json.dumps(dict(tick, price='abc')),
+                 json.dumps(dict(tick, ts='2026-13-01T00:00:00')), json.dumps(dict(tick, trade_id=5))]
+        progress = ParseProgress()
+        batches = list(iter_ndjson_batches(lines, 1, progress))
+        self.assertEqual(batches, [[tick], [dict(tick, trade_id=5)]])
+        self.assertEqual((progress.lines_parsed, progress.parse_errors), (2, 7))
+
+
+class BulkUpsertTests(TestCase):
+    def bar(self, second, close):
+        return {'symbol': 'BTCUSDT', 'timeframe': '1s', 'timestamp': from_epoch_ms(START_MS + second * 1000),
+                'open': 1, 'high': close, 'low': 1, 'close': close, 'volume': 1, 'tick_count': 1}
+
+    def test_existing_bars_are_updated_in_place(self):
+        self.assertEqual(bulk_upsert(ProcessedBar, [self.bar(0, 10), self.bar(1, 11)], BAR_UNIQUE_FIELDS,
+                                     BAR_UPDATE_FIELDS), 2)
+        first_id = ProcessedBar.objects.get(timestamp=from_epoch_ms(START_MS)).id
+        # The same key twice in one batch is written once, last row winning
+        rows = [self.bar(0, 20), self.bar(2, 12), self.bar(0, 30)]
+        self.assertEqual(bulk_upsert(ProcessedBar, rows, BAR_UNIQUE_FIELDS, BAR_UPDATE_FIELDS, batch_size=1), 2)
+        closes = dict(ProcessedBar.objects.values_list('timestamp', 'close'))
+        self.assertEqual(sorted(closes.values()), [11, 12, 30])
+        self.assertEqual(ProcessedBar.objects.get(timestamp=from_epoch_ms(START_MS)).id, first_id)
+
+    def test_empty_batch_writes_nothing(self):
+        with self.assertNumQueries(0):
+            self.assertEqual(bulk_upsert(ProcessedBar, [], BAR_UNIQUE_FIELDS, BAR_UPDATE_FIELDS), 0)
+
+
+class TradeIdDedupeTests(TestCase):
+    def test_replayed_ticks_are_skipped(self):
+        ts = from_epoch_ms(START_MS)
+        rows = [('BTCUSDT', ts, '100', '1', 1), ('BTCUSDT', ts, '100', '1', 2)]
+        self.assertEqual(len(write_ticks(rows)), 2)
+        self.assertEqual(write_ticks(rows), [])
+        # Duplicates within one batch are dropped too
+        self.assertEqual(len(write_ticks([('BTCUSDT', ts, '101', '1', 3)] * 2)), 1)
+        self.assertEqual(RawTick.objects.count(), 3)
+
+    def test_same_trade_id_with_another_timestamp_is_stored(self):
+        write_ticks([('BTCUSDT', from_epoch_ms(START_MS), '100', '1', 1)])
+        inserted = write_ticks([('BTCUSDT', from_epoch_ms(START_MS + 1000), '100', '1', 1)])
+        self.assertEqual(len(inserted), 1)
+
+    def test_trade_ids_are_per_symbol(self):
+        ts = from_epoch_ms(START_MS)
+        inserted = write_ticks([('BTCUSDT', ts, '100', '1', 1), ('ETHUSDT', ts, '10', '1', 1)])
+        self.assertEqual(len(inserted), 2)
+
+
+class TickPaginationTests(TestCase):
+    def setUp(self):
+        # Runs of equal timestamps so page boundaries fall inside them
+        self.ticks = [
+            RawTick(symbol='BTCUSDT', timestamp=from_epoch_ms(START_MS + (i // 4) * 1000),
+                    price=Decimal(i), size=Decimal(1), trade_id=i)
+            for i in range(23)
+        ]
+        RawTick.objects.bulk_create(self.ticks)
+
+    def walk(self, params):
+        prices = []
+        cursor = None
+        while True:
+            query = dict(params, **({'cursor': cursor} if cursor else {}))
+            response = self.client.get('/api/ingestion/ticks/', query)
+            self.assertEqual(response.status_code, 200)
+            body = response.json()
+            self.assertLessEqual(body['count'], int(params['limit']))
+            prices.extend(tick['price'] for tick in body['ticks'])
+            cursor = body['next_cursor']
+            if cursor is None:
+                return prices
+
+    def test_ascending_pages_visit_every_tick_once_in_order(self):
+        start = from_epoch_ms(START_MS).isoformat()
+        prices = self.walk({'symbol': 'BTCUSDT', 'limit': '3', 'start': start})
+        self.assertEqual(prices, [float(i) for i in range(23)])
+
+    def test_descending_pages_visit_every_tick_once(self):
+        prices = self.walk({'symbol': 'BTCUSDT', 'limit': '4'})
+        self.assertEqual(sorted(prices), [float(i) for i in range(23)])
+        self.assertEqual(len(prices), 23)
+
+    def test_end_is_exclusive(self):
+        start = from_epoch_ms(START_MS).isoformat()
+        end = from_epoch_ms(START_MS + 2000).isoformat()
+        prices = self.walk({'symbol': 'BTCUSDT', 'limit': '5', 'start': start, 'end': end})
+        self.assertEqual(prices, [float(i) for i in range(8)])
+
+    def test_invalid_parameters_are_rejected(self):
+        for params in ({'start': '2026-13-01T00:00:00'}, {'start': 'yesterday'}, {'cursor': 'garbage'},
+                       {'limit': 'ten'}):
+            response = self.client.get('/api/ingestion/ticks/', params)
+            self.assertEqual(response.status_code, 400, params)
+
+
+class RollupTests(TestCase):
+    def test_aggregated_bars_match_resampled_ticks(self):
+        ticks = make_ticks(3000)
+        rows = [{'timestamp': ts, 'price': price, 'size': size} for ts, price, size in ticks]
+        seconds = resample_ticks(rows, '1s')
+        bars = [dict(row, timestamp=ts.to_pydatetime()) for ts, row in zip(seconds.index, seconds.to_dict('records'))]
+        minutes = resample_ticks(rows, '1m')
+        rolled = aggregate_bars(bars, '1m')
+        self.assertEqual([bar['timestamp'] for bar in rolled], [ts.to_pydatetime() for ts in minutes.index])
+        for bar, row in zip(rolled, minutes.to_dict('records')):
+            for field in ('open', 'high', 'low', 'close', 'volume', 'tick_count'):
+                self.assertAlmostEqual(bar[field], row[field], places=6, msg=field)
+
+    @mock.patch('ingestion.tasks.bars_closed')
+    def test_only_closed_buckets_are_rolled_up(self, bars_closed):
+        minute = (START_MS // 60000 + 1) * 60
+        ProcessedBar.objects.bulk_create([
+            ProcessedBar(symbol='BTCUSDT', timeframe='1s', timestamp=from_epoch_seconds(minute + s),
+                         open=s, high=s, low=s, close=s, volume=1, tick_count=1)
+            for s in range(151)
+        ])
+        self.assertEqual(rollup_timeframe('BTCUSDT', '1m', minute + 150), 2)
+        self.assertEqual(list(ProcessedBar.objects.filter(timeframe='1m').order_by('timestamp').values_list(
+            'close', 'tick_count')), [(59, 60), (119, 60)])
+        # The next run revisits the last bucket written and stops before the open one
+        self.assertEqual(rollup_timeframe('BTCUSDT', '1m', minute + 179), 1)
+        self.assertEqual(rollup_timeframe('BTCUSDT', '1m', minute + 180), 2)
+        self.assertEqual(ProcessedBar.objects.get(timeframe='1m', timestamp=from_epoch_seconds(minute + 120)).tick_count,
+                         31)
+        self.assertEqual(bars_closed.send.call_count, 2)
+
+
+class TriggerTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    @mock.patch('ingestion.scheduling.run_triggered.apply_async')
+    def test_triggers_coalesce_until_the_pending_run_starts(self, schedule):
+        self.assertTrue(trigger(rollup_bars, ['BTCUSDT'], 3))
+        self.assertFalse(trigger(rollup_bars, ['BTCUSDT'], 3))
+        self.assertTrue(trigger(rollup_bars, ['ETHUSDT'], 3))
+        self.assertEqual(schedule.call_count, 2)
+        key, task_name, args = schedule.call_args_list[0].args[0]
+        self.assertEqual(schedule.call_args_list[0].kwargs, {'countdown': 3})
+
+        # The run clears its marker first, so a trigger during it schedules the next run
+        with mock.patch.dict(current_app.tasks, {task_name: mock.Mock()}):
+            run_triggered(key, task_name, args)
+            current_app.tasks[task_name].assert_called_once_with('BTCUSDT')
+        self.assertTrue(trigger(rollup_bars, ['BTCUSDT'], 3))
+        self.assertEqual(trigger_metrics()[rollup_bars.name], {'triggered': 3, 'coalesced': 1})
+
+
+class MergeWindowsTests(TestCase):
+    def test_disjoint_windows_stay_apart(self):
+        self.assertEqual(merge_windows([(100, 101), (0, 1)], slack=0), [(0, 1), (100, 101)])
+
+    def test_overlapping_and_close_windows_merge(self):
+        self.assertEqual(merge_windows([(0, 10), (5, 20), (30, 40)], slack=10), [(0, 40)])
+
+    def test_open_ended_window_absorbs_later_ones(self):
+        self.assertEqual(merge_windows([(50, None), (60, 70), (0, 1)], slack=0), [(0, 1), (50, None)])
+
+
+class SingleFlightBuildTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_batches_queued_behind_a_running_build_are_folded_by_the_next(self):
+        rows = [('BTCUSDT', from_epoch_ms(START_MS + i * 100), str(100 + i), '1', i) for i in range(3)]
+        write_ticks(rows)
+        lock = bar_keys('BTCUSDT', '1s')['lock']
+        token = acquire_lock(lock)
+        # A build holds the lock: both batches are queued for it
+        self.assertEqual(update_bars_incremental('BTCUSDT', [rows[0][1:4]]), 0)
+        self.assertEqual(update_bars_incremental('BTCUSDT', [rows[1][1:4]]), 0)
+        self.assertFalse(ProcessedBar.objects.exists())
+        release_lock(lock, token)
+
+        self.assertEqual(update_bars_incremental('BTCUSDT', [rows[2][1:4]]), 1)
+        bar = ProcessedBar.objects.get(symbol='BTCUSDT', timeframe='1s')
+        self.assertEqual((bar.tick_count, bar.open, bar.close), (3, 100, 102))
+        self.assertEqual(trigger_metrics()[BAR_BUILD_METRIC]['coalesced'], 2)
+
+
+class TickBatcherTests(TestCase):
+    def batcher(self, depth=50, **kwargs):
+        self.batches = []
+
+        async def dispatch(batch):
+            self.batches.append(batch)
+        return TickBatcher(dispatch, 'ingest', depth=lambda queue: depth, **kwargs)
+
+    def test_batch_size_follows_the_queue_depth(self):
+        batcher = self.batcher(batch_size=100, max_batch_size=300)
+        for depth, size in ((DEPTH_HIGH + 1, 200), (DEPTH_HIGH + 1, 300), (DEPTH_HIGH, 300), (None, 300),
+                            (DEPTH_LOW - 1, 150), (DEPTH_LOW - 1, 100), (0, 100)):
+            batcher.resize(depth)
+            self.assertEqual(batcher.batch_size, size, depth)
+
+    async def test_full_batches_are_dispatched_and_grow_while_backed_up(self):
+        batcher = self.batcher(batch_size=2, max_batch_size=8)
+        for tick in range(7):
+            await batcher.add(tick)
+        # The first flush saw a deep queue and doubled the size target
+        self.assertEqual(self.batches, [[0, 1], [2, 3, 4, 5]])
+        self.assertEqual(batcher.stats(), {'batches': 2, 'ticks': 6, 'batch_size': 4, 'queue_depth': 50})
+
+    async def test_partial_batch_is_flushed_after_max_latency(self):
+        batcher = self.batcher(depth=0, batch_size=100, max_latency=0.05)
+        runner = asyncio.ensure_future(batcher.run())
+        await batcher.add('a')
+        await asyncio.sleep(0.2)
+        self.assertEqual(self.batches, [['a']])
+        await batcher.add('b')
+        runner.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await runner
+        # Stopping flushes what is left
+        self.assertEqual(self.batches, [['a'], ['b']])
+
+
+class StreamShardingTests(TestCase):
+    def test_symbols_are_spread_round_robin_and_deduplicated(self):
+        shards = shard_symbols(['ETHUSDT', 'btcusdt', ' solusdt ', 'BTCUSDT', ''], 2)
+        self.assertEqual(shards, [['btcusdt', 'solusdt'], ['ethusdt']])
+        # Never more shards than symbols
+        self.assertEqual(shard_symbols(['btcusdt'], 4), [['btcusdt']])
+        self.assertEqual(shard_symbols([], 2), [])
+
+    def test_full_connections_add_shards(self):
+        symbols = [f'sym{i:04d}usdt' for i in range(MAX_STREAMS_PER_CONNECTION * 2 + 1)]
+        shards = shard_symbols(symbols, 1)
+        self.assertEqual(len(shards), 3)
+        self.assertTrue(all(len(shard) <= MAX_STREAMS_PER_CONNECTION for shard in shards))
+        self.assertEqual(sorted(sum(shards, [])), symbols)
+
+    def test_backoff_is_jittered_below_a_growing_capped_bound(self):
+        backoff = Backoff(base=1, cap=10)
+        with mock.patch('ingestion.streams.random.uniform', side_effect=lambda low, high: high) as uniform:
+            self.assertEqual([backoff.next_delay() for _ in range(6)], [1, 2, 4, 8, 10, 10])
+            self.assertTrue(all(call.args[0] == 0 for call in uniform.call_args_list))
+        backoff.reset()
+        self.assertLessEqual(backoff.next_delay(), 1)
+
+
+class GapDetectionTests(TestCase):
+    def test_connection_stats_report_trade_id_jumps(self):
+        stats = ConnectionStats()
+        self.assertEqual(stats.record_tick(('BTCUSDT', 1000, '1', '1', 10)), (None, None))
+        self.assertIsNone(stats.record_tick(('BTCUSDT', 1001, '1', '1', 11)))
+        self.assertEqual(stats.record_tick(('BTCUSDT', 1500, '1', '1', 15)), (11, 1001))
+        # A repeated or older trade is not a gap
+        self.assertIsNone(stats.record_tick(('BTCUSDT', 1400, '1', '1', 14)))
+        self.assertEqual(stats.record_tick(('ETHUSDT', 1000, '1', '1', 99)), (None, None))
+        self.assertEqual((stats.gaps, stats.missing_trades), (1, 3))
+
+    @mock.patch('ingestion.tasks.recover_trade_gap.apply_async')
+    def test_first_trade_after_restart_is_compared_with_stored_trades(self, schedule):
+        write_ticks([('BTCUSDT', from_epoch_ms(START_MS), '100', '1', 100)])
+        gap_id = log_trade_gap('BTCUSDT', 105, START_MS + 5000)
+        gap = TradeGap.objects.get(id=gap_id)
+        self.assertEqual((gap.first_trade_id, gap.last_trade_id, gap.missing_count), (101, 104, 4))
+        self.assertEqual(gap.start_time, from_epoch_ms(START_MS))
+        schedule.assert_called_once()
+        # No gap when the next trade follows on, and a gap is logged only once
+        self.assertIsNone(log_trade_gap('BTCUSDT', 101, START_MS + 5000))
+        self.assertEqual(log_trade_gap('BTCUSDT', 105, START_MS + 5000, 100, START_MS), gap_id)
+        self.assertEqual(TradeGap.objects.count(), 1)
+
+    @mock.patch('ingestion.tasks.process_ticks_to_bars.delay')
+    @mock.patch('ingestion.tasks.recover_trade_gap.apply_async')
+    def test_recovery_fills_gap_from_archive_and_rebuilds_its_seconds(self, schedule, rebuild):
+        with tempfile.TemporaryDirectory() as archive:
+            with open(os.path.join(archive, 'trades.ndjson'), 'w') as f:
+                for trade_id in range(100, 106):
+                    event = {'e': 'trade', 's': 'BTCUSDT', 't': trade_id, 'T': START_MS + (trade_id - 100) * 1000,
+                             'p': '100.5', 'q': '0.1'}
+                    f.write(json.dumps({'stream': 'btcusdt@trade', 'data': event}) + '\n')
+
+            write_ticks([('BTCUSDT', from_epoch_ms(START_MS), '100', '1', 100)])
+            with override_settings(TRADE_ARCHIVE_DIR=archive):
+                gap_id = log_trade_gap('BTCUSDT', 105, START_MS + 5000, 100, START_MS)
+                self.assertEqual(recover_trade_gap(gap_id), 4)
+
+        gap = TradeGap.objects.get(id=gap_id)
+        self.assertEqual((gap.status, gap.recovered_count, gap.attempts), ('recovered', 4, 1))
+        # Only the seconds holding the recovered trades are rebuilt
+        rebuild.assert_called_once_with(
+            'BTCUSDT', '1s',
+            start=from_epoch_ms(START_MS + 1000).isoformat(),
+            end=(from_epoch_ms(START_MS + 4000) + timedelta(seconds=1)).isoformat()
+        )
+
+    @mock.patch('ingestion.tasks.recover_trade_gap.apply_async')
+    def test_unfillable_gap_is_retried_then_closed(self, schedule):
+        with tempfile.TemporaryDirectory() as archive, override_settings(TRADE_ARCHIVE_DIR=archive):
+            gap_id = log_trade_gap('BTCUSDT', 105, START_MS + 5000, 100, START_MS)
+            schedule.reset_mock()
+            recover_trade_gap(gap_id)
+            self.assertEqual(TradeGap.objects.get(id=gap_id).status, 'open')
+            schedule.assert_called_once()
+            TradeGap.objects.filter(id=gap_id).update(attempts=4)
+            recover_trade_gap(gap_id)
+        self.assertEqual(TradeGap.objects.get(id=gap_id).status, 'unrecoverable')
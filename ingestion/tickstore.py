@@ -0,0 +1,121 @@
+from django.conf import settings
+from django.db import connection, transaction, DatabaseError
+from django.utils import timezone
+from decimal import Decimal
+import io
+from .models import RawTick
+from .partitions import is_partitioned, ensure_partitions_for
+
+RAW_TICK_COLUMNS = ('symbol', 'timestamp', 'price', 'size', 'trade_id')
+STAGING_TABLE = 'raw_ticks_staging'
+
+
+def copy_available():
+    return connection.vendor == 'postgresql' and getattr(settings, 'INGEST_USE_COPY', True)
+
+
+def write_ticks(rows):
+    """
+    Persist (symbol, timestamp, price, size, trade_id) tuples to raw_ticks and
+    return the rows that were actually new. Ticks whose (symbol, trade_id,
+    timestamp) is already stored are skipped, so replaying a batch is a no-op.
+
+    Streams through COPY FROM STDIN on PostgreSQL and falls back to
+    bulk_create when COPY is unavailable or fails.
+    """
+    rows = _dedupe(rows)
+    if not rows:
+        return []
+
+    table = RawTick._meta.db_table
+    if is_partitioned(table):
+        # Outside the insert transaction, so the DDL lock on the parent is brief
+        ensure_partitions_for(table, (row[1] for row in rows))
+
+    if copy_available():
+        try:
+            with transaction.atomic():
+                return copy_ticks(rows)
+        except DatabaseError as e:
+            print(f"COPY into raw_ticks failed, falling back to ORM insert: {e}")
+
+    return orm_insert_ticks(rows)
+
+
+def _dedupe(rows):
+    seen = set()
+    unique_rows = []
+    for row in rows:
+        trade_id = row[4]
+        if trade_id is not None:
+            key = (row[0], trade_id)
+            if key in seen:
+                continue
+            seen.add(key)
+        unique_rows.append(row)
+    return unique_rows
+
+
+def copy_ticks(rows):
+    # COPY cannot skip conflicts itself, so load a staging table and move the
+    # rows over with ON CONFLICT DO NOTHING in one statement.
+    buffer = io.StringIO()
+    for symbol, ts, price, size, trade_id in rows:
+        trade_id = r'\N' if trade_id is None else trade_id
+        buffer.write(f'{symbol}\t{ts.isoformat()}\t{price}\t{size}\t{trade_id}\n')
+    buffer.seek(0)
+
+    columns = ', '.join(RAW_TICK_COLUMNS)
+    table = RawTick._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'CREATE TEMP TABLE IF NOT EXISTS {STAGING_TABLE} ('
+            'symbol varchar(20), timestamp timestamptz, price numeric(20, 8), '
+            'size numeric(20, 8), trade_id bigint) ON COMMIT DROP'
+        )
+        cursor.cursor.copy_expert(f'COPY {STAGING_TABLE} ({columns}) FROM STDIN', buffer)
+        cursor.execute(
+            f'INSERT INTO {table} ({columns}, created_at) '
+            f'SELECT {columns}, %s FROM {STAGING_TABLE} '
+            f'ON CONFLICT (symbol, trade_id, timestamp) DO NOTHING '
+            f'RETURNING {columns}',
+            [timezone.now()]
+        )
+        inserted = cursor.fetchall()
+        # ON COMMIT DROP only fires at the outermost commit
+        cursor.execute(f'TRUNCATE {STAGING_TABLE}')
+    return inserted
+
+
+def orm_insert_ticks(rows):
+    trade_ids = {}
+    for symbol, _, _, _, trade_id in rows:
+        if trade_id is not None:
+            trade_ids.setdefault(symbol, []).append(trade_id)
+
+    # The timestamp bounds let a partitioned raw_ticks prune to the batch's days
+    first = min(row[1] for row in rows)
+    last = max(row[1] for row in rows)
+    existing = set()
+    for symbol, ids in trade_ids.items():
+        stored = RawTick.objects.filter(
+            symbol=symbol,
+            trade_id__in=ids,
+            timestamp__range=(first, last)
+        ).values_list('trade_id', flat=True)
+        existing.update((symbol, trade_id) for trade_id in stored)
+
+    new_rows = [row for row in rows if row[4] is None or (row[0], row[4]) not in existing]
+    ticks = [
+        RawTick(
+            symbol=symbol,
+            timestamp=ts,
+            price=Decimal(str(price)),
+            size=Decimal(str(size)),
+            trade_id=trade_id
+        )
+        for symbol, ts, price, size, trade_id in new_rows
+    ]
+    with transaction.atomic():
+        RawTick.objects.bulk_create(ticks, ignore_conflicts=True)
+    return new_rows
@@ -0,0 +1,64 @@
+from django.db import connection, transaction
+from django.utils import timezone
+
+BULK_UPSERT_BATCH_SIZE = 5000
+
+
+def bulk_upsert(model, rows, unique_fields, update_fields, batch_size=BULK_UPSERT_BATCH_SIZE):
+    """
+    Insert or update ``rows`` (dicts keyed by field name) in one statement per
+    batch. On PostgreSQL this is INSERT ... ON CONFLICT (unique_fields) DO
+    UPDATE; other backends go through bulk_create(update_conflicts=True).
+    """
+    rows = _dedupe(rows, unique_fields)
+    if not rows:
+        return 0
+
+    with transaction.atomic():
+        if connection.vendor == 'postgresql':
+            _pg_upsert(model, rows, unique_fields, update_fields, batch_size)
+        else:
+            model.objects.bulk_create(
+                [model(**row) for row in rows],
+                update_conflicts=True,
+                unique_fields=unique_fields,
+                update_fields=update_fields,
+                batch_size=batch_size
+            )
+    return len(rows)
+
+
+def _dedupe(rows, unique_fields):
+    # ON CONFLICT cannot touch the same row twice in one statement; last write wins
+    by_key = {}
+    for row in rows:
+        by_key[tuple(row[f] for f in unique_fields)] = row
+    return list(by_key.values())
+
+
+def _pg_upsert(model, rows, unique_fields, update_fields, batch_size):
+    from psycopg2.extras import execute_values
+
+    meta = model._meta
+    fields = list(unique_fields) + [f for f in update_fields if f not in unique_fields]
+    has_created_at = any(f.name == 'created_at' for f in meta.concrete_fields)
+
+    columns = [meta.get_field(f).column for f in fields]
+    if has_created_at:
+        columns.append('created_at')
+    conflict = ', '.join(meta.get_field(f).column for f in unique_fields)
+    updates = ', '.join(
+        f'{meta.get_field(f).column} = EXCLUDED.{meta.get_field(f).column}' for f in update_fields
+    )
+    sql = (
+        f'INSERT INTO {meta.db_table} ({", ".join(columns)}) VALUES %s '
+        f'ON CONFLICT ({conflict}) DO UPDATE SET {updates}'
+    )
+
+    now = timezone.now()
+    with connection.cursor() as cursor:
+        for i in range(0, len(rows), batch_size):
+            chunk = rows[i:i + batch_size]
+            values = [tuple(row[f] for f in fields) + ((now,) if has_created_at else ()) for row in chunk]
+            # page_size covers the whole chunk so each chunk is a single statement
+            execute_values(cursor.cursor, sql, values, page_size=len(values))
@@ -4,8 +4,11 @@ from . import views
 urlpatterns = [
     path('ingest/', views.ingest_ticks, name='ingest_ticks'),
     path('upload/', views.upload_ndjson, name='upload_ndjson'),
+    path('upload/<str:task_id>/status/', views.upload_status, name='upload_status'),
     path('process-bars/', views.trigger_bar_processing, name='trigger_bar_processing'),
     path('ticks/', views.get_ticks, name='get_ticks'),
     path('bars/', views.get_bars, name='get_bars'),
+    path('bars/export/', views.export_bars, name='export_bars'),
     path('stats/', views.stats, name='stats'),
+    path('gaps/', views.get_gaps, name='get_gaps'),
 ]
\ No newline at end of file
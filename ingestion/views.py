@@ -3,9 +3,13 @@ from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 import json
 from .tasks import ingest_tick_batch, process_ticks_to_bars, process_ndjson_file
-from .models import RawTick, ProcessedBar
+from .models import RawTick, ProcessedBar, TradeGap
+from .pagination import paginate, encode_cursor, PaginationError
+from .latest import wants_latest, get_latest, known_symbols, estimated_count
+from .scheduling import trigger_metrics
+from .export import export_request, ExportError
 from django.core.files.storage import default_storage
-from django.core.files.base import ContentFile
+from celery.result import AsyncResult
 import os
 
 @csrf_exempt
@@ -35,7 +39,8 @@ def upload_ndjson(request):
             return JsonResponse({'error': 'No file provided'}, status=400)
         
         file = request.FILES['file']
-        file_path = default_storage.save(f'uploads/{file.name}', ContentFile(file.read()))
+        # Storage writes the upload chunk by chunk instead of reading it into memory
+        file_path = default_storage.save(f'uploads/{file.name}', file)
         full_path = os.path.join(default_storage.location, file_path)
         
         task = process_ndjson_file.delay(full_path)
@@ -48,6 +53,23 @@ def upload_ndjson(request):
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=500)
 
+@require_http_methods(["GET"])
+def upload_status(request, task_id):
+    result = AsyncResult(task_id)
+    
+    if result.state == 'PROGRESS':
+        progress = result.info
+    elif result.successful():
+        progress = result.result
+    else:
+        progress = None
+    
+    return JsonResponse({
+        'task_id': task_id,
+        'state': result.state,
+        'progress': progress
+    })
+
 @require_http_methods(["POST"])
 def trigger_bar_processing(request):
     try:
@@ -72,13 +94,15 @@ def trigger_bar_processing(request):
 @require_http_methods(["GET"])
 def get_ticks(request):
     symbol = request.GET.get('symbol')
-    limit = int(request.GET.get('limit', 100))
     
     query = RawTick.objects.all()
     if symbol:
         query = query.filter(symbol=symbol)
     
-    ticks = query[:limit]
+    try:
+        ticks, next_cursor, order = paginate(query, request)
+    except PaginationError as e:
+        return JsonResponse({'error': str(e)}, status=400)
     
     data = [{
         'symbol': t.symbol,
@@ -87,20 +111,31 @@ def get_ticks(request):
         'size': float(t.size)
     } for t in ticks]
     
-    return JsonResponse({'ticks': data, 'count': len(data)})
+    return JsonResponse({'ticks': data, 'count': len(data), 'next_cursor': next_cursor})
 
 @require_http_methods(["GET"])
 def get_bars(request):
     symbol = request.GET.get('symbol')
     timeframe = request.GET.get('timeframe', '1s')
-    limit = int(request.GET.get('limit', 100))
+    
+    if symbol and wants_latest(request):
+        latest = get_latest('bars', symbol, timeframe)
+        if latest is not None:
+            return JsonResponse({
+                'bars': [latest],
+                'count': 1,
+                'next_cursor': encode_cursor(latest['timestamp'], None, 'desc')
+            })
     
     query = ProcessedBar.objects.all()
     if symbol:
         query = query.filter(symbol=symbol)
     query = query.filter(timeframe=timeframe)
     
-    bars = query[:limit]
+    try:
+        bars, next_cursor, order = paginate(query, request)
+    except PaginationError as e:
+        return JsonResponse({'error': str(e)}, status=400)
     
     data = [{
         'symbol': b.symbol,
@@ -114,16 +149,61 @@ def get_bars(request):
         'tick_count': b.tick_count
     } for b in bars]
     
-    return JsonResponse({'bars': data, 'count': len(data)})
+    return JsonResponse({'bars': data, 'count': len(data), 'next_cursor': next_cursor})
 
 @require_http_methods(["GET"])
-def stats(request):
-    tick_count = RawTick.objects.count()
-    bar_count = ProcessedBar.objects.count()
-    symbols = list(RawTick.objects.values_list('symbol', flat=True).distinct())
+def export_bars(request):
+    symbol = request.GET.get('symbol')
+    timeframe = request.GET.get('timeframe', '1s')
+    
+    if not symbol:
+        return JsonResponse({'error': 'Symbol required'}, status=400)
     
+    query = ProcessedBar.objects.filter(symbol=symbol, timeframe=timeframe)
+    try:
+        return export_request(request, query, f'bars_{symbol}_{timeframe}')
+    except (ExportError, PaginationError) as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+@require_http_methods(["GET"])
+def stats(request):
+    # Planner estimates and the cached symbol set instead of full-table scans
     return JsonResponse({
-        'tick_count': tick_count,
-        'bar_count': bar_count,
-        'symbols': symbols
-    })
\ No newline at end of file
+        'tick_count': estimated_count(RawTick),
+        'bar_count': estimated_count(ProcessedBar),
+        'symbols': known_symbols(),
+        'estimated': True,
+        'open_gaps': TradeGap.objects.filter(status='open').count(),
+        'triggers': trigger_metrics()
+    })
+
+@require_http_methods(["GET"])
+def get_gaps(request):
+    status = request.GET.get('status')
+    symbol = request.GET.get('symbol')
+    
+    gaps = TradeGap.objects.all()
+    
+    if status:
+        gaps = gaps.filter(status=status)
+    if symbol:
+        gaps = gaps.filter(symbol=symbol)
+    
+    gaps = gaps.order_by('-start_time')[:50]
+    
+    data = [{
+        'id': g.id,
+        'symbol': g.symbol,
+        'first_trade_id': g.first_trade_id,
+        'last_trade_id': g.last_trade_id,
+        'start_time': g.start_time.isoformat(),
+        'end_time': g.end_time.isoformat(),
+        'missing_count': g.missing_count,
+        'recovered_count': g.recovered_count,
+        'status': g.status,
+        'attempts': g.attempts,
+        'detected_at': g.detected_at.isoformat(),
+        'recovered_at': g.recovered_at.isoformat() if g.recovered_at else None
+    } for g in gaps]
+    
+    return JsonResponse({'gaps': data, 'count': len(data)})
\ No newline at end of file
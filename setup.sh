@@ -18,7 +18,7 @@ echo "Setup complete!"
 echo ""
 echo "To start the application:"
 echo "1. Terminal 1: redis-server"
-echo "2. Terminal 2: celery -A config worker -l info"
+echo "2. Terminal 2: celery -A config worker -l info -Q ingest,bars,analytics,alerts,backfill,celery"
 echo "3. Terminal 3: celery -A config beat -l info"
 echo "4. Terminal 4: python manage.py django_producer --symbols=btcusdt,ethusdt"
 echo "5. Terminal 5: python manage.py runserver"
\ No newline at end of file